@@ -0,0 +1,146 @@
+"""
+调试文件（页面 HTML / 截图）
+页面内容在事件循环中取出后交给后台写入任务：HTML 用 gzip 压缩，写盘和清理都在线程中进行，
+队列满时丢弃新的调试文件而不阻塞签到流程。
+按 level 决定保存内容：
+    none        不保存
+    on-failure  仅在步骤失败时保存 HTML + 截图（默认，正常运行不产生任何开销）
+    html-only   每步保存 HTML，不截图
+    full        每步保存 HTML + 截图
+写入结束后按文件数、保存天数、总大小清理旧文件。
+"""
+
+import asyncio
+import gzip
+import time
+from pathlib import Path
+
+LEVELS = ("none", "on-failure", "html-only", "full")
+
+
+class ArtifactWriter:
+    def __init__(self, directory: Path, level: str = "on-failure", max_files: int = 200,
+                 max_age_days: float = 7, max_bytes: int = 100 * 1024 * 1024, queue_size: int = 16):
+        if level not in LEVELS:
+            print(f"[DEBUG] 未知的 DEBUG_ARTIFACTS={level}，使用 on-failure")
+            level = "on-failure"
+        self.directory = directory
+        self.level = level
+        self.max_files = max_files
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+
+    def _wants(self, failed: bool) -> tuple[bool, bool]:
+        """返回 (保存 HTML, 保存截图)"""
+        if self.level == "none":
+            return False, False
+        if self.level == "on-failure":
+            return failed, failed
+        if self.level == "html-only":
+            return True, False
+        return True, True
+
+    async def capture(self, page, step_name: str, failed: bool = False, screenshot_path: Path | None = None,
+                      screenshot_quality: int | None = None) -> str | None:
+        """
+        按 level 采集当前页面并排队写盘。
+        screenshot_path: 无论 level 如何都需要的截图（例如结果邮件附件），直接由浏览器写到该路径后返回；
+        否则返回 None（调试截图在后台写入，调用方不应依赖其存在）。
+        screenshot_quality: 给定时按 CSS 像素截取（高 DPI 屏幕不放大）并编码为该质量的 JPEG
+        """
+        want_html, want_png = self._wants(failed)
+        stem = f"{time.strftime('%H%M%S')}_{step_name}"
+        if want_html:
+            try:
+                self._enqueue(self.directory / f"{stem}.html.gz", (await page.content()).encode("utf-8"), True)
+            except Exception as e:
+                print(f"[DEBUG] HTML 采集失败: {e}")
+
+        if screenshot_path is not None:
+            try:
+                screenshot_path.parent.mkdir(parents=True, exist_ok=True)
+                options = {} if screenshot_quality is None else {"type": "jpeg", "quality": screenshot_quality, "scale": "css"}
+                await page.screenshot(path=str(screenshot_path), full_page=False, **options)
+                self.written += 1  # 同样落在调试目录中，需要计入保留策略
+                return str(screenshot_path)
+            except Exception as e:
+                print(f"[DEBUG] 截图保存失败: {e}")
+                return None
+
+        if want_png:
+            try:
+                self._enqueue(self.directory / f"{stem}.png", await page.screenshot(full_page=False), False)
+            except Exception as e:
+                print(f"[DEBUG] 截图采集失败: {e}")
+        return None
+
+    def _enqueue(self, path: Path, data: bytes, compress: bool):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        try:
+            self._queue.put_nowait((path, data, compress))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"[DEBUG] 写入队列已满，丢弃: {path.name}")
+
+    async def _run(self):
+        while True:
+            path, data, compress = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._write, path, data, compress)
+            except Exception as e:
+                print(f"[DEBUG] 调试文件写入失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path: Path, data: bytes, compress: bool):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(gzip.compress(data, compresslevel=6) if compress else data)
+        self.written += 1
+        print(f"[DEBUG] 已保存: {path}")
+
+    async def close(self):
+        """等待队列写完，然后执行保留策略"""
+        if self._queue is not None:
+            await self._queue.join()
+            self._worker.cancel()
+            self._queue, self._worker = None, None
+        if self.written:
+            await asyncio.to_thread(self.enforce_retention)
+
+    def enforce_retention(self):
+        """删除超过保存天数的文件，再从最旧的开始删除，直到文件数和总大小都不超过上限（0 表示不限制）"""
+        if not self.directory.exists():
+            return
+        files = []
+        for p in self.directory.iterdir():
+            if p.is_file():
+                st = p.stat()
+                files.append((st.st_mtime, st.st_size, p))
+        files.sort()  # 旧 → 新
+
+        now = time.time()
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        while files:
+            mtime, size, p = files[0]
+            too_old = self.max_age_days > 0 and now - mtime > self.max_age_days * 86400
+            too_many = self.max_files > 0 and len(files) > self.max_files
+            too_big = self.max_bytes > 0 and total > self.max_bytes
+            if not (too_old or too_many or too_big):
+                break
+            try:
+                p.unlink()
+            except OSError:
+                pass
+            files.pop(0)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"[DEBUG] 已清理 {removed} 个旧调试文件，保留 {len(files)} 个 ({total / 1024 / 1024:.1f}MB)")
@@ -0,0 +1,30 @@
+"""
+后台任务
+把不影响下一步的阻塞工作（写调试文件、发送 SMTP 通知、关闭邮箱连接）放到线程中执行，
+事件循环继续推进浏览器流程；退出前调用 drain() 等待全部完成。
+"""
+
+import asyncio
+
+
+class BackgroundTasks:
+    """在线程中执行同步函数的任务集合"""
+
+    def __init__(self):
+        self._tasks: set[asyncio.Task] = set()
+
+    def spawn(self, func, *args, **kwargs) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(func, *args, **kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Background] 后台任务失败: {task.exception()}")
+
+    async def drain(self):
+        """等待所有已提交（包括等待期间新提交）的后台任务完成"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
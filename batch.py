@@ -0,0 +1,233 @@
+"""
+CordCloud 多账号批量签到
+所有账号在同一个事件循环中运行，共享同一个 CloakBrowser 进程，每个账号使用独立的 BrowserContext，
+会话状态（cookies / localStorage）保存在 PERSISTENT_PROFILE_DIR/<账号>/state.json
+"""
+
+import json
+import re
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+from main import (
+    Account, run_checkin, try_http_checkin, account_session_path, notify_result, finish_run, publish_report, _env,
+    already_checked_in, new_resource_filter, new_response_cache, new_window, start_profiler,
+    CORDCLOUD_EMAIL, CORDCLOUD_PASSWORD, PROFILE_DIR, HEADLESS, HTTP_FAST_PATH,
+)
+from scheduler import Window
+from timing import start_report, set_account, step
+
+# ── 配置 ────────────────────────────────────────────
+# 账号列表 JSON：[{"email": ..., "password": ..., "pop3_username": ..., "pop3_password": ...}, ...]
+ACCOUNTS_FILE = Path(_env("ACCOUNTS_FILE", "./accounts.json"))
+# 同时进行中的账号数
+BATCH_CONCURRENCY = max(1, int(_env("BATCH_CONCURRENCY", "1")))
+
+
+def load_accounts(path: Path = ACCOUNTS_FILE) -> list[Account]:
+    """读取账号列表；文件不存在时退回 .env 中的单账号配置"""
+    if not path.exists():
+        if CORDCLOUD_EMAIL and CORDCLOUD_PASSWORD:
+            print(f"[Batch] 未找到 {path}，使用 .env 中的单账号")
+            return [Account(CORDCLOUD_EMAIL, CORDCLOUD_PASSWORD)]
+        return []
+
+    accounts = []
+    for i, item in enumerate(json.loads(path.read_text(encoding="utf-8"))):
+        if not item.get("email") or not item.get("password"):
+            print(f"[Batch] ⚠️ 第 {i + 1} 个账号缺少 email/password，已跳过")
+            continue
+        accounts.append(Account(
+            email=item["email"],
+            password=item["password"],
+            pop3_username=item.get("pop3_username", ""),
+            pop3_password=item.get("pop3_password", ""),
+            tag=account_slug(item["email"]),
+        ))
+    return accounts
+
+
+def account_slug(email_addr: str) -> str:
+    """账号邮箱转为可用作目录名/文件名前缀的字符串"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", email_addr)
+
+
+def account_state_path(account: Account) -> Path:
+    """账号的会话状态文件：PERSISTENT_PROFILE_DIR/<账号>/state.json"""
+    return PROFILE_DIR / account_slug(account.email) / "state.json"
+
+
+async def open_context(browser, account: Account):
+    """为账号新建浏览器上下文，载入上次保存的会话状态"""
+    state_path = account_state_path(account)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with step("context_open"):
+        return await browser.new_context(
+            viewport={"width": 1280, "height": 800},
+            storage_state=str(state_path) if state_path.exists() else None,
+        )
+
+
+async def run_in_context(context, account: Account) -> dict:
+    """在给定上下文的新页面中执行签到并保存会话，返回运行记录；上下文由调用方管理"""
+    set_account(account.email)
+    start = time.perf_counter()
+    results = []
+    ok = False
+    page = None
+    checkin_screenshot = None
+    cached = new_response_cache()
+    resources = new_resource_filter()
+    try:
+        page = await context.new_page()
+        await cached.install(page)
+        await resources.install(page)
+        ok, checkin_screenshot = await run_checkin(page, account, results)
+        # 保存会话，下次运行可跳过登录
+        with step("save_session"):
+            from http_checkin import save_session
+            await context.storage_state(path=str(account_state_path(account)))
+            if ok:
+                await save_session(context, page, account_session_path(account))
+    except Exception as e:
+        print(f"\n[Batch] ❌ {account.email}: {e}")
+        results.append(f"[ERROR] {e}")
+    finally:
+        resources.publish()
+        cached.publish()
+        if page is not None:
+            await page.close()
+
+    notify_result(account, ok, results, checkin_screenshot, to_addr=account.email)
+    return {
+        "email": account.email,
+        "ok": ok,
+        "seconds": time.perf_counter() - start,
+        "results": results,
+        "screenshot": checkin_screenshot,
+    }
+
+
+async def run_account(browser, account: Account) -> dict:
+    """在共享浏览器中为单个账号新建独立上下文并执行签到，返回运行记录"""
+    set_account(account.email)
+    context = await open_context(browser, account)
+    try:
+        return await run_in_context(context, account)
+    finally:
+        await context.close()
+
+
+async def try_fast_path(account: Account) -> dict | None:
+    """用已保存的会话直接 HTTP 签到，成功返回运行记录，需要浏览器时返回 None"""
+    set_account(account.email)
+    start = time.perf_counter()
+    results = []
+    if not await try_http_checkin(account, results):
+        return None
+    notify_result(account, True, results, to_addr=account.email)
+    return {"email": account.email, "ok": True, "seconds": time.perf_counter() - start, "results": results}
+
+
+async def run_batch(accounts: list[Account], concurrency: int = BATCH_CONCURRENCY, on_record=None,
+                    window: Window | None = None) -> list[dict]:
+    """
+    批量执行签到，最多 concurrency 个账号同时使用浏览器；浏览器在第一个需要它的账号时才启动，
+    全部走 HTTP 快速签到时不启动浏览器。
+    window 不为空时每个账号等到自己的签到时段才开始（快速签到和浏览器流程都在时段之后）。
+    on_record(record) 在每个账号完成时调用（分片子进程用它逐条落盘）
+    """
+    records = []
+    slots = asyncio.Semaphore(concurrency)
+    launching = asyncio.Lock()
+    browser = None
+
+    async def get_browser():
+        nonlocal browser
+        async with launching:
+            if browser is None:
+                from cloakbrowser import launch_async
+                with step("browser_launch"):
+                    browser = await launch_async(headless=HEADLESS, humanize=True)
+        return browser
+
+    async def run_one(account: Account):
+        set_account(account.email)
+        if window is not None:
+            await window.wait_turn(account.email)
+        record = await try_fast_path(account) if HTTP_FAST_PATH else None
+        if record is None:
+            async with slots:
+                record = await run_account(await get_browser(), account)
+        records.append(record)
+        if on_record:
+            on_record(record)
+
+    if window is not None:
+        accounts = sorted(accounts, key=lambda a: window.offset(a.email))
+    try:
+        await asyncio.gather(*(run_one(a) for a in accounts))
+    finally:
+        if browser is not None:
+            with step("browser_close"):
+                await browser.close()
+    return records
+
+
+def print_report(records: list[dict], total_seconds: float):
+    """打印每个账号的耗时与总耗时"""
+    print("\n" + "=" * 60)
+    print(f"{'账号':<36}{'结果':<8}{'耗时(s)':>10}")
+    print("-" * 60)
+    for r in records:
+        status = "✅" if r["ok"] else "❌"
+        print(f"{r['email']:<36}{status:<8}{r['seconds']:>10.1f}")
+    print("-" * 60)
+    ok_count = sum(1 for r in records if r["ok"])
+    print(f"共 {len(records)} 个账号，成功 {ok_count}，总耗时 {total_seconds:.1f}s")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CordCloud 多账号批量签到")
+    parser.add_argument("--force", action="store_true", help="忽略签到台账，今天已签到的账号也照常运行")
+    parser.add_argument("--no-wait", action="store_true", help="忽略签到时段（CHECKIN_WINDOW_MINUTES），立即开始")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CordCloud Batch Check-in")
+    print("=" * 60)
+
+    accounts = load_accounts()
+    if not accounts:
+        print(f"[ERROR] 请在 {ACCOUNTS_FILE} 中配置账号列表，或在 .env 中配置 CORDCLOUD_EMAIL/CORDCLOUD_PASSWORD")
+        return
+    if not args.force:
+        accounts = [a for a in accounts if not already_checked_in(a)]
+        if not accounts:
+            print("[Batch] 所有账号今日均已签到")
+            return
+
+    print(f"[Batch] 共 {len(accounts)} 个账号，并发 {BATCH_CONCURRENCY}")
+    start = time.perf_counter()
+    records, within_budget = asyncio.run(_run(accounts, wait=not args.no_wait))
+    print_report(records, time.perf_counter() - start)
+    if not within_budget:
+        sys.exit(1)
+
+
+async def _run(accounts: list[Account], wait: bool = True) -> tuple[list[dict], bool]:
+    report = start_report()
+    start_profiler(report)
+    records = await run_batch(accounts, window=new_window() if wait else None)
+    await finish_run()
+    for r in records:
+        report.set_result(r["email"], r["ok"], r["results"])
+    return records, publish_report(report)
+
+
+if __name__ == "__main__":
+    main()
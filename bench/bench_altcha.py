@@ -0,0 +1,103 @@
+"""
+登录页缓存基准：本地假站点（bench/mock_site.py）+ 真实浏览器，测量从打开登录页到 ALtcha 验证完成的时间。
+
+    uv run python -m bench.bench_altcha [--rounds 5] [--latency-ms 80] [--altcha-max 5000] [--resource-blocking on]
+
+三组各跑 --rounds 轮，每轮一个新的浏览器上下文（与批量模式相同，浏览器自身没有缓存）：
+1. 不缓存：RESPONSE_CACHE=off
+2. 冷缓存：每轮清空缓存目录，脚本 / 样式完整下载并写入缓存
+3. 热缓存：缓存已有内容，脚本 / 样式通过 ETag 条件请求验证后（304）使用本地内容
+
+--fresh-seconds 大于 0 时热缓存组不发条件请求。每组报告时间分位数、站点发送的字节数和 304 次数。
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from bench.bench_e2e import configure_env, percentile
+from bench.fake_mail import FakeMailbox, FakeMailServer
+from bench.mock_site import MockCordCloud
+
+_VERIFIED = """() => {
+    const altcha = document.querySelector('.altcha');
+    return altcha && altcha.getAttribute('data-state') === 'verified';
+}"""
+
+
+async def time_to_verified(browser, cache_mode: str) -> float:
+    """新上下文中打开登录页，返回到 ALtcha 验证完成的秒数"""
+    import main
+    from response_cache import ResponseCache
+
+    context = await browser.new_context(viewport={"width": 1280, "height": 800})
+    try:
+        page = await context.new_page()
+        cache = ResponseCache(main.response_store, cache_mode, main.RESPONSE_CACHE_TYPES, main.RESPONSE_CACHE_FRESH_SECONDS)
+        await cache.install(page)
+        await main.new_resource_filter().install(page)
+        start = time.perf_counter()
+        await page.goto(main.LOGIN_URL, wait_until="networkidle", timeout=30000)
+        await page.wait_for_function(_VERIFIED, timeout=30000)
+        seconds = time.perf_counter() - start
+        cache.publish()
+        return seconds
+    finally:
+        await context.close()
+
+
+async def run(args, site: MockCordCloud):
+    import main
+    from cloakbrowser import launch_async
+
+    groups = [("不缓存", "off", False), ("冷缓存", "on", True), ("热缓存", "on", False)]
+    rows = []
+    browser = await launch_async(headless=True, humanize=True)
+    try:
+        await time_to_verified(browser, "off")  # 预热浏览器进程，不计入结果
+        for title, mode, clear in groups:
+            times = []
+            sent, not_modified = site.stats.bytes_sent, site.stats.not_modified
+            for i in range(args.rounds):
+                if clear:
+                    main.response_store.clear()
+                times.append(await time_to_verified(browser, mode))
+                print(f"[Bench] {title} 第 {i + 1}/{args.rounds} 轮: {times[-1]:.2f}s")
+            rows.append((title, times, (site.stats.bytes_sent - sent) / args.rounds,
+                         (site.stats.not_modified - not_modified) / args.rounds))
+    finally:
+        await browser.close()
+
+    print(f"\n{'':<8}{'p50(s)':>10}{'p90(s)':>10}{'max(s)':>10}{'站点发送(KB/轮)':>18}{'304(次/轮)':>12}")
+    for title, times, sent, not_modified in rows:
+        print(f"{title:<8}{percentile(times, 50):>10.2f}{percentile(times, 90):>10.2f}{max(times):>10.2f}"
+              f"{sent / 1024:>18.0f}{not_modified:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="每组测量轮数")
+    parser.add_argument("--latency-ms", type=float, default=80, help="假站点每个请求的模拟网络延迟")
+    parser.add_argument("--altcha-max", type=int, default=5000, help="假 ALtcha 的穷举上限")
+    parser.add_argument("--resource-blocking", choices=("on", "report", "off"), default="on")
+    parser.add_argument("--fresh-seconds", type=float, default=0, help="RESPONSE_CACHE_FRESH_SECONDS")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="cordcloud-bench-"))
+    mail = FakeMailServer(FakeMailbox()).start()
+    site = MockCordCloud(lambda email_addr, code: None, latency_ms=args.latency_ms, altcha_max=args.altcha_max).start()
+    try:
+        configure_env(site.url, mail, workdir, "pop3", args.resource_blocking)
+        os.environ["RESPONSE_CACHE_FRESH_SECONDS"] = str(args.fresh_seconds)
+        print(f"[Bench] 假站点 {site.url}，工作目录 {workdir}")
+        asyncio.run(run(args, site))
+    finally:
+        site.stop()
+        mail.stop()
+
+
+if __name__ == "__main__":
+    main()
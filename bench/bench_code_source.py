@@ -0,0 +1,82 @@
+"""
+验证码来源离线基准：在本地假邮件服务器上比较 POP3 轮询与 IMAP IDLE 的延迟与正确性。
+
+    uv run python -m bench.bench_code_source [--rounds 5] [--delay 1.0]
+
+每轮：登录触发时刻之前先投递一封历史验证码邮件（应被忽略），
+delay 秒后投递真正的验证码邮件，紧接着再投递一封无关邮件（不应遮住验证码）。
+延迟 = 从投递验证码邮件到 wait_for_code 返回的时间。
+除 --delay 外每个来源还跑一组 SUB_SECOND_DELAY 秒的投递：验证码邮件与触发时刻多半在同一秒，
+而 Date 头只精确到秒，用于检查这种邮件不会被当成历史邮件。
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from bench.fake_mail import FakeMailbox, FakeMailServer, make_email
+from code_source import Pop3CodeSource, ImapIdleCodeSource
+from code_extractor import extract_code_from_email
+from pop3_poller import Pop3Poller
+
+# 与真实站点相近的投递延迟（假站点在登录响应后 0.2 秒发信）
+SUB_SECOND_DELAY = 0.3
+
+
+def make_source(kind: str, server: FakeMailServer, poll_interval: float):
+    if kind == "imap":
+        return ImapIdleCodeSource("127.0.0.1", server.imap_port, "user", "pass",
+                                  extract_code_from_email, use_ssl=False)
+    poller = Pop3Poller("127.0.0.1", server.pop3_port, "user", "pass", use_ssl=False)
+    return Pop3CodeSource(poller, extract_code_from_email, poll_interval=poll_interval)
+
+
+def run_round(kind: str, server: FakeMailServer, mailbox: FakeMailbox, code: str,
+              delay: float, poll_interval: float) -> tuple[float, bool]:
+    """执行一轮，返回 (延迟秒数, 结果是否正确)"""
+    since_time = time.time()
+    mailbox.deliver(make_email("000000", date=since_time - 600))  # 历史验证码
+
+    delivered_at = {}
+
+    def deliver_later():
+        time.sleep(delay)
+        delivered_at["t"] = time.perf_counter()
+        mailbox.deliver(make_email(code))
+        mailbox.deliver(make_email(sender="news@example.com", subject="Newsletter"))
+
+    threading.Thread(target=deliver_later, daemon=True).start()
+    source = make_source(kind, server, poll_interval)
+    try:
+        source.open()
+        got, error = source.wait_for_code(since_time, delay + 30)
+    finally:
+        source.close()
+    latency = time.perf_counter() - delivered_at.get("t", time.perf_counter())
+    return latency, got == code and error is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=1.0, help="触发后多久投递验证码邮件（秒）")
+    parser.add_argument("--poll-interval", type=float, default=3.0, help="POP3 轮询间隔（秒）")
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox()
+    with FakeMailServer(mailbox) as server:
+        print(f"{'backend':<8}{'delay(s)':>10}{'correct':>10}{'mean(ms)':>12}{'p50(ms)':>12}{'max(ms)':>12}")
+        for kind in ("pop3", "imap"):
+            for delay in sorted({args.delay, SUB_SECOND_DELAY}):
+                latencies, correct = [], 0
+                for i in range(args.rounds):
+                    latency, ok = run_round(kind, server, mailbox, f"{100000 + i:06d}", delay, args.poll_interval)
+                    latencies.append(latency * 1000)
+                    correct += ok
+                print(f"{kind:<8}{delay:>10g}{f'{correct}/{args.rounds}':>10}{statistics.mean(latencies):>12.1f}"
+                      f"{statistics.median(latencies):>12.1f}{max(latencies):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
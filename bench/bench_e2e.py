@@ -0,0 +1,237 @@
+"""
+端到端离线基准：本地假站点（bench/mock_site.py）+ 假邮件服务器（POP3 / IMAP / SMTP），
+用真实浏览器跑完整签到流程，报告延迟分位数、峰值内存和吞吐量。
+
+    uv run python -m bench.bench_e2e [--rounds 5] [--accounts 4] [--concurrency 4]
+                                     [--latency-ms 30] [--altcha-max 5000] [--code-source pop3]
+                                     [--resource-blocking on]
+
+1. 场景检查：ret==1 直接登录、ret==2 二步验证、#msg 密码错误、今日已签到，各跑一次并校验结果
+2. 单账号：每轮清空站点会话，完整执行 启动浏览器 → 登录 → 2FA → 签到 → 发送结果邮件
+3. N 个账号：batch.run_batch 在一个浏览器中按 --concurrency 并发
+
+峰值内存为本进程及全部子进程（Playwright 驱动、浏览器）RSS 之和的最大采样值。
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bench.fake_mail import FakeMailbox, FakeMailServer, make_email
+from bench.mock_site import MockCordCloud
+from procstats import process_tree_rss
+
+PASSWORD = "bench-password"
+
+
+def percentile(values: list[float], p: float) -> float:
+    """最近秩分位数"""
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+class PeakRss:
+    """后台线程定期采样进程树 RSS，记录峰值"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if not self.peak:
+            import resource
+            # 退化为本进程自身的峰值（Linux 单位 KB）
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def configure_env(site_url: str, mail: FakeMailServer, workdir: Path, code_source: str, resource_blocking: str):
+    """在导入 main 之前设置配置；.env 中的同名配置不会覆盖这里的值"""
+    os.environ.update({
+        "CORDCLOUD_URL": site_url,
+        "CORDCLOUD_EMAIL": "bench0@example.com",
+        "CORDCLOUD_PASSWORD": PASSWORD,
+        "CODE_SOURCE": code_source,
+        "POP3_HOST": "127.0.0.1",
+        "POP3_PORT": str(mail.pop3_port),
+        "POP3_USE_SSL": "false",
+        "POP3_USERNAME": "bench0@example.com",
+        "POP3_PASSWORD": "x",
+        "POP3_FROM_FILTER": "",
+        "POP3_POLL_INTERVAL": "0.5",
+        "IMAP_HOST": "127.0.0.1",
+        "IMAP_PORT": str(mail.imap_port),
+        "IMAP_USE_SSL": "false",
+        "IMAP_USERNAME": "bench0@example.com",
+        "IMAP_PASSWORD": "x",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(mail.smtp_port),
+        "SMTP_USE_SSL": "false",
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "bench0@example.com",
+        "SMTP_PASSWORD": "x",
+        "USE_PERSISTENT_CONTEXT": "false",
+        "PERSISTENT_PROFILE_DIR": str(workdir / "profile"),
+        "HEADLESS": "true",
+        "KEEP_BROWSER_OPEN_SECONDS": "0",
+        "HTTP_FAST_PATH": "false",
+        "DEBUG_ARTIFACTS": "none",
+        "DEBUG_HTML_DIR": str(workdir / "debug_html"),
+        "RUN_REPORT": "false",
+        "RESOURCE_BLOCKING": resource_blocking,
+    })
+
+
+def make_account(email_addr: str, tag: str = ""):
+    from main import Account
+    return Account(email_addr, PASSWORD, pop3_username=email_addr, pop3_password="x", tag=tag)
+
+
+async def run_one(account) -> tuple[bool, float, list[str]]:
+    """执行单账号完整流程（包括后台发送结果邮件），返回 (是否走完, 秒数, 结果消息)"""
+    import main
+    results = []
+    start = time.perf_counter()
+    ok = await main.run_single(account, results)
+    await main.finish_run()
+    return ok, time.perf_counter() - start, results
+
+
+async def check_scenarios(site: MockCordCloud, mail: FakeMailServer) -> list[tuple[str, bool, str]]:
+    """逐个场景运行并校验站点侧状态"""
+    outcomes = []
+    scenarios = [
+        ("ret==1 直接登录", "direct@example.com", dict(two_fa=False), True, True),
+        ("ret==2 二步验证", "twofa@example.com", dict(two_fa=True), True, True),
+        ("#msg 密码错误", "wrongpw@example.com", dict(two_fa=False), False, False),
+        ("今日已签到", "already@example.com", dict(two_fa=False, checked_in=True), True, False),
+    ]
+    for name, email_addr, options, expect_ok, expect_checkin in scenarios:
+        user = site.add_user(email_addr, PASSWORD, **options)
+        if name == "#msg 密码错误":
+            user.password = "another-password"
+        mail.routes[email_addr] = FakeMailbox()
+        before = site.stats.checkins
+        sent_before = len(mail.sent)
+        ok, seconds, results = await run_one(make_account(email_addr))
+        checked = site.stats.checkins - before == (1 if expect_checkin else 0)
+        mailed = len(mail.sent) > sent_before
+        passed = ok == expect_ok and checked and (mailed or not expect_ok)
+        outcomes.append((name, passed, f"{seconds:.1f}s, ok={ok}, 新签到={checked and expect_checkin}, 邮件={mailed}"))
+    site.logout_all()
+    return outcomes
+
+
+async def bench_single(site: MockCordCloud, mail: FakeMailServer, rounds: int) -> tuple[list[float], int]:
+    email_addr = "bench0@example.com"
+    site.add_user(email_addr, PASSWORD, two_fa=True)
+    mail.routes[email_addr] = FakeMailbox()
+    latencies, successes = [], 0
+    for i in range(rounds):
+        site.logout_all()
+        site.users[email_addr].last_checkin = None
+        ok, seconds, _ = await run_one(make_account(email_addr))
+        latencies.append(seconds)
+        successes += ok
+        print(f"[Bench] 单账号第 {i + 1}/{rounds} 轮: {seconds:.2f}s {'✅' if ok else '❌'}")
+    return latencies, successes
+
+
+async def bench_batch(site: MockCordCloud, mail: FakeMailServer, count: int, concurrency: int):
+    import batch
+    import main
+    accounts = []
+    for i in range(count):
+        email_addr = f"batch{i}@example.com"
+        site.add_user(email_addr, PASSWORD, two_fa=True)
+        mail.routes[email_addr] = FakeMailbox()
+        accounts.append(make_account(email_addr, tag=batch.account_slug(email_addr)))
+    site.logout_all()
+    start = time.perf_counter()
+    records = await batch.run_batch(accounts, concurrency)
+    await main.finish_run()
+    return records, time.perf_counter() - start
+
+
+def print_latency(title: str, latencies: list[float], ok: int, total: int, wall: float, peak_rss: int):
+    print(f"\n{title}")
+    print(f"{'成功':>8}{'p50(s)':>10}{'p90(s)':>10}{'p99(s)':>10}{'max(s)':>10}{'账号/分钟':>12}{'峰值RSS(MB)':>14}")
+    print(f"{f'{ok}/{total}':>8}{percentile(latencies, 50):>10.2f}{percentile(latencies, 90):>10.2f}"
+          f"{percentile(latencies, 99):>10.2f}{max(latencies):>10.2f}{total / wall * 60:>12.1f}"
+          f"{peak_rss / 1024 / 1024:>14.0f}")
+
+
+async def run(args, site: MockCordCloud, mail: FakeMailServer):
+    import main
+    from timing import start_report
+    report = start_report()
+
+    print("\n[Bench] 场景检查")
+    for name, passed, detail in await check_scenarios(site, mail):
+        print(f"  {'✅' if passed else '❌'} {name}: {detail}")
+
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        latencies, ok = await bench_single(site, mail, args.rounds)
+        wall = time.perf_counter() - start
+    print_latency("单账号（每轮启动浏览器）", latencies, ok, args.rounds, wall, rss.peak)
+
+    with PeakRss() as rss:
+        records, wall = await bench_batch(site, mail, args.accounts, args.concurrency)
+    print_latency(f"{args.accounts} 个账号（并发 {args.concurrency}，共享浏览器）",
+                  [r["seconds"] for r in records], sum(r["ok"] for r in records), len(records), wall, rss.peak)
+
+    print(f"\n站点请求 {site.stats.requests} 次，发送 {site.stats.bytes_sent / 1024:.0f}KB，"
+          f"304 {site.stats.not_modified} 次；SMTP 收到 {len(mail.sent)} 封，建立连接 {main.get_notifier().connects} 次")
+    print("\n" + report.summary_table())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="单账号测量轮数")
+    parser.add_argument("--accounts", type=int, default=4, help="批量测量的账号数")
+    parser.add_argument("--concurrency", type=int, default=4, help="批量测量的并发数")
+    parser.add_argument("--latency-ms", type=float, default=30, help="假站点每个请求的模拟网络延迟")
+    parser.add_argument("--altcha-max", type=int, default=5000, help="假 ALtcha 的穷举上限")
+    parser.add_argument("--code-source", choices=("pop3", "imap"), default="pop3")
+    parser.add_argument("--resource-blocking", choices=("on", "report", "off"), default="on",
+                        help="资源拦截模式；分别用 on / off 运行可对比加载时间和站点发送的字节数")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="cordcloud-bench-"))
+    mail = FakeMailServer(FakeMailbox()).start()
+    # 验证码邮件投递到对应用户的邮箱（POP3/IMAP 按登录用户名路由）
+    site = MockCordCloud(
+        lambda email_addr, code: mail.routes.setdefault(email_addr, FakeMailbox()).deliver(make_email(code)),
+        latency_ms=args.latency_ms, altcha_max=args.altcha_max,
+    ).start()
+    try:
+        configure_env(site.url, mail, workdir, args.code_source, args.resource_blocking)
+        print(f"[Bench] 假站点 {site.url}，工作目录 {workdir}")
+        asyncio.run(run(args, site, mail))
+    finally:
+        site.stop()
+        mail.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+验证码提取基准：在 bench/corpus.py 语料上比较 code_extractor 与旧实现的吞吐量和准确率。
+
+    uv run python -m bench.bench_extractor [--seconds 2]
+
+旧实现（legacy）按原 fetch_latest_verification_code 的逻辑保留在本文件中作为对照：
+每次调用重建模式列表，逐个 re.search，先搜纯文本再搜 "纯文本 + 原始 HTML"。
+message_tree 与 code_extractor 的扫描逻辑相同，但先用 email.message_from_bytes 解析完整的对象树、
+解码全部文本部分，用于单独衡量按需解析（只解析头部、跳过非文本部分、找到即停止）的收益。
+内存峰值用 tracemalloc 测量，为单封邮件处理期间的最大值。
+"""
+
+import argparse
+import email
+import re
+import time
+import tracemalloc
+
+from bench.corpus import build_corpus
+from code_extractor import extract_code_from_email, find_code, html_to_text
+
+
+def legacy_extract(raw_email: bytes) -> str | None:
+    msg = email.message_from_bytes(raw_email)
+    text_parts, html_parts = [], []
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            if content_type not in ("text/plain", "text/html"):
+                continue
+            payload = part.get_payload(decode=True)
+            if payload:
+                decoded = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+                (text_parts if content_type == "text/plain" else html_parts).append(decoded)
+    else:
+        payload = msg.get_payload(decode=True)
+        if payload:
+            text_parts.append(payload.decode(msg.get_content_charset() or "utf-8", errors="replace"))
+
+    plain_body = "\n".join(text_parts)
+    full_body = plain_body + "\n" + "\n".join(html_parts)
+    return legacy_scan(plain_body) or legacy_scan(full_body)
+
+
+def tree_extract(raw_email: bytes) -> str | None:
+    msg = email.message_from_bytes(raw_email)
+    text_parts, html_parts = [], []
+    for part in msg.walk():
+        if part.get_content_type() in ("text/plain", "text/html"):
+            payload = part.get_payload(decode=True)
+            if payload:
+                decoded = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+                (text_parts if part.get_content_type() == "text/plain" else html_parts).append(decoded)
+    found = find_code("\n".join(text_parts))
+    if found is None and html_parts:
+        found = find_code(html_to_text("\n".join(html_parts)))
+    return found[0] if found else None
+
+
+def legacy_scan(body: str) -> str | None:
+    patterns = [
+        r"验证码[：:\s]*(?:是|为)?[：:\s]*(\d{6})",
+        r"(?:code|Code|CODE)[：:\s]*(\d{6})",
+        r"(?<!\d)(\d{6})(?!\d)",
+        r"验证码[：:\s]*(?:是|为)?[：:\s]*([A-Za-z0-9]{4,8})",
+        r"(?:code|Code|CODE)[：:\s]*([A-Za-z0-9]{4,8})",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, body)
+        if match:
+            return match.group(1)
+    return None
+
+
+def new_scan(body: str) -> str | None:
+    found = find_code(body)
+    return found[0] if found else None
+
+
+def decoded_bodies(corpus) -> list[tuple[str, str, str | None]]:
+    """把语料预先解码为纯文本（HTML 已转文本），用于单独测量正文扫描的开销"""
+    bodies = []
+    for name, raw, expected in corpus:
+        parts = []
+        for part in email.message_from_bytes(raw).walk():
+            if part.get_content_type() in ("text/plain", "text/html"):
+                text = part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8", errors="replace")
+                parts.append(html_to_text(text) if part.get_content_type() == "text/html" else text)
+        bodies.append((name, "\n".join(parts), expected))
+    return bodies
+
+
+def measure(extract, corpus, seconds: float) -> tuple[int, list[str], float]:
+    """返回 (正确数, 错误样本名, 每秒处理条数)"""
+    wrong = [name for name, raw, expected in corpus if extract(raw) != expected]
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _, raw, _ in corpus:
+            extract(raw)
+        count += len(corpus)
+    return len(corpus) - len(wrong), wrong, count / (time.perf_counter() - start)
+
+
+def peak_kb(extract, corpus) -> float:
+    """处理单封邮件期间的最大内存分配（KB），不含邮件本身"""
+    peak = 0
+    for _, raw, _ in corpus:
+        tracemalloc.start()
+        extract(raw)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="每个实现的计时时长")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    candidates = [
+        ("legacy", legacy_extract),
+        ("message_tree", tree_extract),
+        ("code_extractor", lambda raw: extract_code_from_email(raw, verbose=False)),
+    ]
+    large = [item for item in corpus if item[0].startswith("large_")]
+    print(f"语料 {len(corpus)} 封邮件（其中大型营销邮件 {len(large)} 封）\n")
+    print("完整邮件（解析 + 解码 + 提取）")
+    print(f"{'extractor':<16}{'accuracy':>10}{'emails/s':>12}{'large/s':>10}{'peak KB':>10}  wrong")
+    for name, extract in candidates:
+        correct, wrong, rate = measure(extract, corpus, args.seconds)
+        _, _, large_rate = measure(extract, large, args.seconds)
+        print(f"{name:<16}{f'{correct}/{len(corpus)}':>10}{rate:>12.0f}{large_rate:>10.0f}"
+              f"{peak_kb(extract, corpus):>10.0f}  {', '.join(wrong) or '-'}")
+
+    bodies = decoded_bodies(corpus)
+    print("\n仅正文扫描（已解码文本）")
+    print(f"{'scanner':<16}{'accuracy':>10}{'bodies/s':>12}  wrong")
+    for name, scan in (("legacy", legacy_scan), ("find_code", new_scan)):
+        correct, wrong, rate = measure(scan, bodies, args.seconds)
+        print(f"{name:<16}{f'{correct}/{len(bodies)}':>10}{rate:>12.0f}  {', '.join(wrong) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+启动 / 导入耗时基准：在全新的子进程中导入各命令需要的模块，测量耗时并检查是否误加载了重模块。
+
+    uv run python -m bench.bench_startup [--runs 7] [--budget-ms 30]
+
+每个场景在子进程内只计时导入语句本身（不含解释器启动），报告多次运行的中位数和最小值。
+同时在另一个子进程里只导入该场景加载的标准库 / 第三方模块（基准），两者最小值之差是本项目代码自身的导入开销。
+轻量场景（config / cli / notify / doctor）加载了禁止的模块（CloakBrowser、asyncio、邮箱客户端……）
+或自身开销超过 --budget-ms 时退出码为 1，可放进 CI 防止回归。
+预算只约束自身开销：smtplib、email 包这类依赖在慢机器上可能要上百毫秒，不应让预算随机器变化。
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ("cloakbrowser", "playwright", "asyncio", "poplib", "imaplib", "smtplib", "urllib.request", "email.mime.text")
+
+# (名称, 导入语句, 允许加载的重模块；None 表示不检查、不设预算)
+SCENARIOS = [
+    ("config", "import config", ()),
+    ("cli", "import cli", ()),
+    ("cli notify", "import cli, config, notifier", ("smtplib", "email.mime.text")),
+    ("cli doctor", "import cli, config, ledger, profile_tool", ()),
+    ("main", "import main", None),
+    ("cli fetch-code", "import cli, main, code_source, pop3_poller, code_extractor", None),
+    ("cli checkin", "import cli, main, cloakbrowser", None),
+]
+
+_PROBE = """
+import sys, time, json
+before = set(sys.modules)
+t = time.perf_counter()
+{imports}
+ms = (time.perf_counter() - t) * 1000
+root = {root!r}
+external = sorted(
+    name for name in set(sys.modules) - before
+    if "." not in name and not (getattr(sys.modules[name], "__file__", None) or "").startswith(root)
+)
+print(json.dumps({{"ms": ms, "modules": [m for m in {heavy!r} if m in sys.modules], "external": external}}))
+"""
+
+# 基准：只导入场景加载的外部（标准库 / 第三方）顶层模块
+_BASELINE = """
+import sys, time, json, importlib
+names = {names!r}
+t = time.perf_counter()
+for name in names:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+print(json.dumps({{"ms": (time.perf_counter() - t) * 1000}}))
+"""
+
+
+def _run(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def probe(imports: str) -> dict:
+    return _run(_PROBE.format(imports=imports, heavy=HEAVY, root=str(ROOT)))
+
+
+def baseline(names: list[str]) -> float:
+    return _run(_BASELINE.format(names=names))["ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=30, help="轻量场景自身导入开销的上限（已扣除外部模块）")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'场景':<18}{'中位数(ms)':>12}{'最小(ms)':>10}{'外部最小(ms)':>14}{'自身(ms)':>10}  加载的重模块")
+    print("-" * 90)
+    for name, imports, allowed in SCENARIOS:
+        try:
+            runs = [probe(imports) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<18}{'导入失败':>12}  {e.stderr.strip().splitlines()[-1] if e.stderr else ''}")
+            if allowed is not None:
+                failures.append(f"{name}: 导入失败")
+            continue
+        times = [r["ms"] for r in runs]
+        median = statistics.median(times)
+        # 自身开销取两边的最小值相减：导入耗时的噪声只会往大里偏，最小值最稳定
+        external = min(baseline(runs[-1]["external"]) for _ in range(args.runs))
+        own = max(0.0, min(times) - external)
+        loaded = runs[-1]["modules"]
+        print(f"{name:<18}{median:>12.1f}{min(times):>10.1f}{external:>14.1f}{own:>10.1f}  {', '.join(loaded) or '-'}")
+        if allowed is None:
+            continue
+        unexpected = [m for m in loaded if m not in allowed]
+        if unexpected:
+            failures.append(f"{name}: 不应加载 {', '.join(unexpected)}")
+        if own > args.budget_ms:
+            failures.append(f"{name}: 自身导入开销 {own:.1f}ms 超过预算 {args.budget_ms:g}ms")
+    print("-" * 90)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ 轻量路径未加载重模块，自身导入开销在预算内")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
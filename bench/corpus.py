@@ -0,0 +1,109 @@
+"""
+验证码邮件语料：按常见服务商邮件的真实结构构造（纯文本 / 仅 HTML / multipart、
+base64 / quoted-printable / GBK 编码、正文中夹杂订单号、日期、CSS 颜色值等干扰数字，
+以及带大段 HTML 和多张内联图片的营销邮件）。
+build_corpus() 返回 [(名称, 原始邮件字节, 期望验证码或 None)]。
+"""
+
+from email.charset import Charset, QP
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.image import MIMEImage
+from email.utils import formatdate
+
+
+def _headers(msg, subject: str, sender: str = "CordCloud <noreply@cordcloud.one>"):
+    msg["From"] = sender
+    msg["To"] = "user@example.com"
+    msg["Subject"] = subject
+    msg["Date"] = formatdate(1760000000)
+    return msg
+
+
+def _plain(body: str, subject: str, charset: str = "utf-8", **kw) -> bytes:
+    return _headers(MIMEText(body, "plain", charset), subject, **kw).as_bytes()
+
+
+def _html(body: str, subject: str, charset: str = "utf-8", **kw) -> bytes:
+    return _headers(MIMEText(body, "html", charset), subject, **kw).as_bytes()
+
+
+def _html_qp(body: str, subject: str, **kw) -> bytes:
+    charset = Charset("utf-8")
+    charset.body_encoding = QP
+    return _headers(MIMEText(body, "html", charset), subject, **kw).as_bytes()
+
+
+def _alternative(text: str, markup: str, subject: str, **kw) -> bytes:
+    msg = MIMEMultipart("alternative")
+    msg.attach(MIMEText(text, "plain", "utf-8"))
+    msg.attach(MIMEText(markup, "html", "utf-8"))
+    return _headers(msg, subject, **kw).as_bytes()
+
+
+_STYLED_HTML = """<html><head><style>
+body {{ color: #333333; background: #f5f5f5; }}
+.code {{ color: #1a73e8; font-size: 28px; letter-spacing: 4px; }}
+</style></head><body>
+<table width="600" cellpadding="0"><tr><td bgcolor="#ffffff">
+<p>尊敬的用户：</p>
+<p>您正在登录 CordCloud，本次操作的验证码为：</p>
+<p class="code"><strong>{code}</strong></p>
+<p>验证码 10 分钟内有效，请勿泄露给他人。</p>
+<p style="color:#999999">工单号 20261017 · 客服电话 400-800-1234</p>
+</td></tr></table></body></html>"""
+
+_NEWSLETTER_HTML = """<html><head><style>.btn {{ color: #ff6600; }}</style>
+<script>var trackingId = 884512;</script></head><body>
+<h1>本周精选</h1><p>订单 #{order} 已发货。</p>
+<img src="cid:banner" width="600" height="200"><p>优惠截止 2026-10-31。</p>
+</body></html>"""
+
+
+def build_corpus() -> list[tuple[str, bytes, str | None]]:
+    corpus = [
+        ("plain_cn", _plain("您的验证码为：482913，10 分钟内有效。", "CordCloud 登录验证码"), "482913"),
+        ("plain_cn_spaced", _plain("验证码 是 ：  705218\n请勿转发。", "登录验证"), "705218"),
+        ("plain_en", _plain("Your verification code: 319046\nIt expires in 10 minutes.", "Your code"), "319046"),
+        ("plain_en_sentence", _plain("Use CODE 660271 to sign in.", "Sign-in code"), "660271"),
+        ("plain_noise_first", _plain(
+            "订单 20261017 已于 2026-10-17 创建。\n您的验证码：154873\n如非本人操作请忽略。", "验证码通知"), "154873"),
+        ("plain_alnum", _plain("您的验证码为：A7K9Q2，请在页面中输入。", "验证码"), "A7K9Q2"),
+        ("plain_gbk", _plain("您的验证码为：920384，5 分钟内有效。", "验证码", charset="gbk"), "920384"),
+        ("html_only_styled", _html(_STYLED_HTML.format(code="538201"), "CordCloud 登录验证码"), "538201"),
+        ("html_only_qp", _html_qp(_STYLED_HTML.format(code="274610"), "CordCloud 登录验证码"), "274610"),
+        ("alternative", _alternative(
+            "您的验证码为：813377", _STYLED_HTML.format(code="813377"), "CordCloud 登录验证码"), "813377"),
+        ("alternative_html_richer", _alternative(
+            "请在 HTML 版本中查看验证码。", _STYLED_HTML.format(code="690045"), "CordCloud 登录验证码"), "690045"),
+        ("newsletter", _html(_NEWSLETTER_HTML.format(order="A10023"), "本周精选",
+                             sender="news@shop.example.com"), None),
+    ]
+
+    # 带大尺寸内联图片的 multipart/related（模拟营销邮件里的验证码）
+    related = MIMEMultipart("related")
+    related.attach(MIMEText(_STYLED_HTML.format(code="447120"), "html", "utf-8"))
+    image = MIMEImage(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 2048, _subtype="png")
+    image.add_header("Content-ID", "<banner>")
+    related.attach(image)
+    corpus.append(("related_inline_image", _headers(related, "CordCloud 登录验证码").as_bytes(), "447120"))
+
+    # 大型营销邮件：几百 KB 的 HTML 加多张内联图片，验证码在开头的纯文本部分 / 没有验证码
+    corpus.append(("large_newsletter_code", _large_newsletter("您的验证码为：305716"), "305716"))
+    corpus.append(("large_newsletter", _large_newsletter("本周精选，详见 HTML 版本。"), None))
+    return corpus
+
+
+def _large_newsletter(text: str, products: int = 1500, images: int = 4) -> bytes:
+    mixed = MIMEMultipart("mixed")
+    alternative = MIMEMultipart("alternative")
+    alternative.attach(MIMEText(text, "plain", "utf-8"))
+    items = "".join(f'<tr><td class="item">商品 {i} · 限时优惠 ¥{i % 900 + 99}</td></tr>' for i in range(products))
+    alternative.attach(MIMEText(_NEWSLETTER_HTML.format(order="A10023").replace("</body>", f"<table>{items}</table></body>"),
+                                "html", "utf-8"))
+    mixed.attach(alternative)
+    for i in range(images):
+        image = MIMEImage(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 256 * (i + 1), _subtype="png")
+        image.add_header("Content-ID", f"<banner{i}>")
+        mixed.attach(image)
+    return _headers(mixed, "本周精选", sender="news@shop.example.com").as_bytes()
@@ -0,0 +1,287 @@
+"""
+本地假邮件服务器（POP3 + IMAP + SMTP），用于离线测试验证码来源和结果通知。
+只实现本项目用到的命令子集，明文连接。默认所有会话共享同一个内存邮箱；
+server.routes[用户名] = FakeMailbox() 可以为指定登录用户名提供独立邮箱。
+SMTP 收到的邮件保存在 server.sent。
+
+    mailbox = FakeMailbox()
+    with FakeMailServer(mailbox) as server:
+        server.pop3_port / server.imap_port / server.smtp_port
+        mailbox.deliver(raw_bytes)
+"""
+
+import select
+import socket
+import socketserver
+import threading
+import time
+from email.header import Header
+from email.utils import formatdate
+
+
+class FakeMailbox:
+    """线程安全的内存邮箱，UID 从 1 递增"""
+
+    def __init__(self):
+        self.messages: list[tuple[int, bytes]] = []  # [(uid, raw)]
+        self._next_uid = 1
+        self.cond = threading.Condition()
+
+    def deliver(self, raw: bytes) -> int:
+        with self.cond:
+            uid = self._next_uid
+            self._next_uid += 1
+            self.messages.append((uid, raw))
+            self.cond.notify_all()
+            return uid
+
+    def snapshot(self) -> list[tuple[int, bytes]]:
+        with self.cond:
+            return list(self.messages)
+
+    @property
+    def next_uid(self) -> int:
+        with self.cond:
+            return self._next_uid
+
+
+def make_email(code: str | None = None, sender: str = "CordCloud <noreply@cordcloud.one>",
+               subject: str = "CordCloud 登录验证码", date: float | None = None, body: str | None = None) -> bytes:
+    """构造一封纯文本邮件；date 为 Unix 时间戳，默认当前时间"""
+    if body is None:
+        body = f"您的验证码为：{code}，10 分钟内有效。" if code else "这是一封普通通知邮件。"
+    headers = [
+        f"From: {sender}",
+        "To: user@example.com",
+        f"Subject: {Header(subject, 'utf-8').encode()}",
+        f"Date: {formatdate(date if date is not None else time.time())}",
+        "MIME-Version: 1.0",
+        "Content-Type: text/plain; charset=utf-8",
+        "Content-Transfer-Encoding: 8bit",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n" + body + "\r\n").encode("utf-8")
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    mailbox: FakeMailbox
+    routes: dict[str, FakeMailbox]
+
+    def setup(self):
+        super().setup()
+        # 关闭 Nagle，避免小包应答叠加延迟 ACK 造成 ~200ms 的假延迟
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send_line(self, line: str | bytes):
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        self.wfile.write(line + b"\r\n")
+        self.wfile.flush()
+
+    def read_line(self) -> str | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def use_mailbox(self, username: str):
+        self.mailbox = self.routes.get(username.strip('"'), self.mailbox)
+
+
+class _Pop3Handler(_LineHandler):
+    """POP3：USER/PASS/STAT/UIDL/TOP/RETR/NOOP/RSET/QUIT，登录时对邮箱做快照"""
+
+    def _multiline(self, lines: list[bytes]):
+        for line in lines:
+            self.send_line(b"." + line if line.startswith(b".") else line)
+        self.send_line(".")
+
+    def handle(self):
+        snapshot = []
+        self.send_line("+OK fake pop3 ready")
+        while (line := self.read_line()) is not None:
+            cmd, *args = line.split()
+            cmd = cmd.upper()
+            if cmd == "USER":
+                self.use_mailbox(args[0] if args else "")
+                self.send_line("+OK")
+            elif cmd == "PASS":
+                snapshot = self.mailbox.snapshot()
+                self.send_line("+OK logged in")
+            elif cmd == "STAT":
+                self.send_line(f"+OK {len(snapshot)} {sum(len(raw) for _, raw in snapshot)}")
+            elif cmd == "UIDL":
+                self.send_line("+OK")
+                self._multiline([f"{i + 1} uid-{uid}".encode() for i, (uid, _) in enumerate(snapshot)])
+            elif cmd in ("TOP", "RETR"):
+                raw = snapshot[int(args[0]) - 1][1]
+                if cmd == "TOP":
+                    raw = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n"
+                self.send_line("+OK")
+                self._multiline(raw.split(b"\r\n"))
+            elif cmd in ("NOOP", "RSET"):
+                self.send_line("+OK")
+            elif cmd == "QUIT":
+                self.send_line("+OK bye")
+                return
+            else:
+                self.send_line("-ERR unknown command")
+
+
+class _ImapHandler(_LineHandler):
+    """IMAP：CAPABILITY/LOGIN/STATUS/SELECT/EXAMINE/UID SEARCH/UID FETCH/IDLE/LOGOUT"""
+
+    def _fetch(self, tag: str, uid: int, item: str):
+        messages = self.mailbox.snapshot()
+        for seq, (u, raw) in enumerate(messages, 1):
+            if u != uid:
+                continue
+            if "HEADER.FIELDS" in item:
+                fields = item[item.index("(", item.index("HEADER.FIELDS")) + 1:item.index(")")]
+                name = f"BODY[HEADER.FIELDS ({fields})]"
+                wanted = tuple(f"{field.lower()}:".encode() for field in fields.split())
+                head = raw.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+                data = b"\r\n".join(h for h in head if h.lower().startswith(wanted)) + b"\r\n\r\n"
+            else:
+                name = "BODY[]"
+                data = raw
+            self.wfile.write(f"* {seq} FETCH (UID {uid} {name} {{{len(data)}}}\r\n".encode() + data + b")\r\n")
+        self.send_line(f"{tag} OK FETCH completed")
+
+    def _search(self, tag: str, criteria: list[str]):
+        uids = [uid for uid, _ in self.mailbox.snapshot()]
+        if criteria and criteria[0].upper() == "UID":
+            low = int(criteria[1].split(":")[0])
+            matched = [u for u in uids if u >= low] or uids[-1:]
+        else:
+            matched = uids  # SINCE 等日期条件：全部返回，由客户端按 Date 过滤
+        self.send_line("* SEARCH " + " ".join(map(str, matched)))
+        self.send_line(f"{tag} OK SEARCH completed")
+
+    def _idle(self, tag: str):
+        self.send_line("+ idling")
+        known = len(self.mailbox.snapshot())
+        while True:
+            # 客户端发来 DONE 则结束；否则等待新邮件并推送 EXISTS
+            if select.select([self.connection], [], [], 0.01)[0]:
+                self.read_line()
+                self.send_line(f"{tag} OK IDLE terminated")
+                return
+            with self.mailbox.cond:
+                if len(self.mailbox.messages) == known:
+                    self.mailbox.cond.wait(0.05)
+                count = len(self.mailbox.messages)
+            if count != known:
+                known = count
+                self.send_line(f"* {count} EXISTS")
+
+    def handle(self):
+        self.send_line("* OK fake imap ready")
+        while (line := self.read_line()) is not None:
+            tag, cmd, *args = line.split()
+            cmd = cmd.upper()
+            if cmd == "CAPABILITY":
+                self.send_line("* CAPABILITY IMAP4rev1 IDLE")
+                self.send_line(f"{tag} OK CAPABILITY completed")
+            elif cmd == "LOGIN":
+                self.use_mailbox(args[0] if args else "")
+                self.send_line(f"{tag} OK LOGIN completed")
+            elif cmd == "STATUS":
+                self.send_line(f"* STATUS {args[0]} (UIDNEXT {self.mailbox.next_uid})")
+                self.send_line(f"{tag} OK STATUS completed")
+            elif cmd in ("SELECT", "EXAMINE"):
+                self.send_line(f"* {len(self.mailbox.snapshot())} EXISTS")
+                self.send_line(f"{tag} OK [READ-ONLY] {cmd} completed")
+            elif cmd == "UID" and args[0].upper() == "SEARCH":
+                self._search(tag, args[1:])
+            elif cmd == "UID" and args[0].upper() == "FETCH":
+                self._fetch(tag, int(args[1]), " ".join(args[2:]))
+            elif cmd == "IDLE":
+                self._idle(tag)
+            elif cmd == "NOOP":
+                self.send_line(f"{tag} OK NOOP completed")
+            elif cmd == "LOGOUT":
+                self.send_line("* BYE")
+                self.send_line(f"{tag} OK LOGOUT completed")
+                return
+            else:
+                self.send_line(f"{tag} BAD unknown command")
+
+
+class _SmtpHandler(_LineHandler):
+    """SMTP：EHLO/HELO/AUTH/MAIL/RCPT/DATA/RSET/NOOP/QUIT，不支持 STARTTLS，邮件存入 sent 列表"""
+
+    sent: list[bytes]
+
+    def handle(self):
+        self.send_line("220 fake smtp ready")
+        while (line := self.read_line()) is not None:
+            cmd = line.split(" ", 1)[0].upper()
+            if cmd == "EHLO":
+                self.send_line("250-fake")
+                self.send_line("250 AUTH PLAIN LOGIN")
+            elif cmd == "HELO":
+                self.send_line("250 fake")
+            elif cmd == "AUTH":
+                parts = line.split()
+                if parts[1].upper() == "LOGIN":
+                    # 质询 "Username:" / "Password:"；用户名已随 AUTH 命令给出时只问密码
+                    prompts = ["UGFzc3dvcmQ6"] if len(parts) > 2 else ["VXNlcm5hbWU6", "UGFzc3dvcmQ6"]
+                    for prompt in prompts:
+                        self.send_line(f"334 {prompt}")
+                        self.read_line()
+                self.send_line("235 authenticated")
+            elif cmd in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.send_line("250 OK")
+            elif cmd == "DATA":
+                self.send_line("354 end with .")
+                lines = []
+                while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                self.sent.append(b"".join(lines))
+                self.send_line("250 queued")
+            elif cmd == "QUIT":
+                self.send_line("221 bye")
+                return
+            else:
+                self.send_line("502 unknown command")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeMailServer:
+    """在随机端口上同时启动 POP3、IMAP 和 SMTP 服务"""
+
+    def __init__(self, mailbox: FakeMailbox, host: str = "127.0.0.1"):
+        self.mailbox = mailbox
+        self.routes: dict[str, FakeMailbox] = {}
+        self.sent: list[bytes] = []
+        self.host = host
+        self._servers = []
+
+    def _start(self, handler) -> int:
+        cls = type(handler.__name__, (handler,), {"mailbox": self.mailbox, "routes": self.routes, "sent": self.sent})
+        server = _Server((self.host, 0), cls)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+        return server.server_address[1]
+
+    def start(self):
+        self.pop3_port = self._start(_Pop3Handler)
+        self.imap_port = self._start(_ImapHandler)
+        self.smtp_port = self._start(_SmtpHandler)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
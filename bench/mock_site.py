@@ -0,0 +1,421 @@
+"""
+本地假 CordCloud 站点，用于离线跑通完整签到流程。
+按 main.py 中记录的页面行为实现：
+
+    GET  /auth/login         登录表单（#email / #passwd / #login / #msg）+ 假 ALtcha 组件
+    POST /auth/login         ret==1 → 弹窗，500ms 后跳转 /user
+                             ret==2 → 弹窗，500ms 后跳转 /auth/login/2fa?token=...（验证码发到用户邮箱）
+                             其他   → #msg 显示错误，留在当前页
+    GET  /auth/login/2fa     验证码表单（#code / #btn-verify / #msg）
+    POST /auth/login/2fa     ret==1 → 跳转 /user，否则 #msg 显示错误
+    GET  /user               已登录显示签到按钮（#checkin-btn button / 已签到 + 上次签到时间），否则 302 到登录页
+    POST /user/checkin       SSPanel 格式 JSON {"ret": 1, "msg": ...}；今日已签到返回 ret 0
+
+假 ALtcha 与真实组件的流程一致：请求 /altcha/challenge，在页面里用 SHA-256 穷举 number
+使 sha256(salt + number) == challenge，完成后把 .altcha 的 data-state 设为 verified，
+登录请求携带的 payload 由服务器校验。页面还引用若干静态资源（样式、图片、字体、统计脚本），
+支持 ETag / Last-Modified 条件请求。
+
+    site = MockCordCloud(deliver_code=lambda email, code: ...)
+    site.add_user("a@example.com", "pass", two_fa=True)
+    with site:
+        site.url  # http://127.0.0.1:<port>
+"""
+
+import base64
+import hashlib
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+
+SESSION_MAX_AGE = 7 * 24 * 3600
+
+_COMMON_HEAD = """<meta charset="utf-8">
+<link rel="stylesheet" href="/assets/style.css">
+<link rel="preload" href="/assets/font.woff2" as="font" type="font/woff2" crossorigin>
+<script src="/assets/analytics.js" async></script>"""
+
+_SHOW_MSG = """<script>
+function showMsg(text) {
+  var el = document.getElementById('msg');
+  el.textContent = text;
+  el.style.display = 'block';
+}
+function post(url, data) {
+  return fetch(url, {
+    method: 'POST',
+    headers: {'Content-Type': 'application/x-www-form-urlencoded', 'X-Requested-With': 'XMLHttpRequest'},
+    body: new URLSearchParams(data || {}),
+  }).then(function (r) { return r.json(); });
+}
+</script>"""
+
+LOGIN_PAGE = f"""<!doctype html>
+<html><head><title>登录 — CordCloud</title>{_COMMON_HEAD}</head>
+<body>
+<img class="banner" src="/assets/banner.png" alt="">
+<form onsubmit="return false">
+  <input id="email" type="email" autofocus>
+  <input id="passwd" type="password">
+  <div class="altcha" data-state="unverified"></div>
+  <button id="login" type="button">登录</button>
+</form>
+<div id="msg" style="display:none"></div>
+{_SHOW_MSG}
+<script src="/assets/altcha.js"></script>
+<script>
+document.getElementById('login').onclick = function () {{
+  post('/auth/login', {{
+    email: document.getElementById('email').value,
+    passwd: document.getElementById('passwd').value,
+    altcha: document.querySelector('.altcha').dataset.payload || '',
+  }}).then(function (d) {{
+    showMsg(d.msg);
+    if (d.ret == 1) setTimeout(function () {{ location.href = '/user'; }}, 500);
+    else if (d.ret == 2) setTimeout(function () {{ location.href = '/auth/login/2fa?token=' + d.token; }}, 500);
+  }});
+}};
+</script>
+</body></html>"""
+
+TWO_FA_PAGE = f"""<!doctype html>
+<html><head><title>二步验证 — CordCloud</title>{_COMMON_HEAD}</head>
+<body>
+<input id="code" type="text" autofocus>
+<button id="btn-verify" type="button">验证</button>
+<div id="msg" style="display:none"></div>
+{_SHOW_MSG}
+<script>
+document.getElementById('btn-verify').onclick = function () {{
+  post('/auth/login/2fa', {{
+    token: new URLSearchParams(location.search).get('token') || '',
+    code: document.getElementById('code').value,
+  }}).then(function (d) {{
+    showMsg(d.msg);
+    if (d.ret == 1) setTimeout(function () {{ location.href = '/user'; }}, 500);
+  }});
+}};
+</script>
+</body></html>"""
+
+USER_PAGE = f"""<!doctype html>
+<html><head><title>用户中心 — CordCloud</title>{_COMMON_HEAD}</head>
+<body>
+<img class="banner" src="/assets/banner.png" alt="">
+<h2>__EMAIL__</h2>
+<div id="checkin-btn">__BUTTON__</div>
+__LAST__
+<p id="checkin-msg"></p>
+<div id="msg" style="display:none"></div>
+{_SHOW_MSG}
+<script>
+var btn = document.getElementById('checkin');
+if (btn) btn.onclick = function () {{
+  post('/user/checkin').then(function (d) {{
+    document.getElementById('checkin-msg').textContent = d.msg;
+    if (d.ret == 1) {{ btn.textContent = '已签到'; btn.disabled = true; }}
+    showMsg(d.msg);
+  }});
+}};
+</script>
+</body></html>"""
+
+ALTCHA_JS = """(function () {
+  var widget = document.querySelector('.altcha');
+  if (!widget) return;
+  widget.setAttribute('data-state', 'verifying');
+  function hex(buf) {
+    return Array.from(new Uint8Array(buf)).map(function (b) { return b.toString(16).padStart(2, '0'); }).join('');
+  }
+  fetch('/altcha/challenge').then(function (r) { return r.json(); }).then(async function (c) {
+    var enc = new TextEncoder();
+    for (var n = 0; n <= c.maxnumber; n++) {
+      if (hex(await crypto.subtle.digest('SHA-256', enc.encode(c.salt + n))) === c.challenge) {
+        widget.dataset.payload = btoa(JSON.stringify({salt: c.salt, number: n, challenge: c.challenge}));
+        widget.setAttribute('data-state', 'verified');
+        return;
+      }
+    }
+    widget.setAttribute('data-state', 'error');
+  });
+})();"""
+
+# 静态资源：(Content-Type, 内容)。图片、字体用随机字节模拟体积
+_ASSETS = {
+    "/assets/altcha.js": ("application/javascript", ALTCHA_JS.encode()),
+    "/assets/style.css": ("text/css", (".banner{width:100%}#msg{position:fixed;top:0}\n" * 400).encode()),
+    "/assets/analytics.js": ("application/javascript", b"/* analytics */" + b" " * 40_000),
+    "/assets/banner.png": ("image/png", random.Random(1).randbytes(300_000)),
+    "/assets/font.woff2": ("font/woff2", random.Random(2).randbytes(120_000)),
+}
+
+
+@dataclass
+class MockUser:
+    email: str
+    password: str
+    two_fa: bool = True
+    last_checkin: float | None = None
+
+
+@dataclass
+class SiteStats:
+    requests: int = 0
+    bytes_sent: int = 0
+    logins: int = 0
+    checkins: int = 0
+    not_modified: int = 0
+    paths: dict[str, int] = field(default_factory=dict)
+
+
+class MockCordCloud:
+    def __init__(self, deliver_code: Callable[[str, str], None], latency_ms: float = 0,
+                 altcha_max: int = 5000, host: str = "127.0.0.1"):
+        """
+        deliver_code(email, code): 需要二步验证时调用，由调用方把验证码邮件投递到该用户的邮箱
+        latency_ms: 每个请求的模拟网络延迟
+        altcha_max: ALtcha 穷举上限，越大验证越慢
+        """
+        self.deliver_code = deliver_code
+        self.latency = latency_ms / 1000
+        self.altcha_max = altcha_max
+        self.host = host
+        self.users: dict[str, MockUser] = {}
+        self.sessions: dict[str, str] = {}      # key cookie → email
+        self.pending: dict[str, tuple[str, str]] = {}  # 2fa token → (email, code)
+        self.stats = SiteStats()
+        self.lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def add_user(self, email: str, password: str, two_fa: bool = True, checked_in: bool = False) -> MockUser:
+        user = MockUser(email, password, two_fa, time.time() if checked_in else None)
+        self.users[email] = user
+        return user
+
+    def logout_all(self):
+        with self.lock:
+            self.sessions.clear()
+            self.pending.clear()
+
+    def checked_in_today(self, email: str) -> bool:
+        user = self.users.get(email)
+        return bool(user and user.last_checkin
+                    and time.strftime("%Y%m%d", time.localtime(user.last_checkin)) == time.strftime("%Y%m%d"))
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"site": self})
+        self._server = ThreadingHTTPServer((self.host, 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _altcha_payload_ok(payload: str) -> bool:
+    try:
+        data = json.loads(base64.b64decode(payload))
+        digest = hashlib.sha256(f"{data['salt']}{data['number']}".encode()).hexdigest()
+        return digest == data["challenge"]
+    except (ValueError, KeyError, TypeError):
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    site: MockCordCloud
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ── 响应工具 ──
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8",
+              headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            if isinstance(v, list):
+                for item in v:
+                    self.send_header(k, item)
+            else:
+                self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        with self.site.lock:
+            self.site.stats.bytes_sent += len(body)
+
+    def _json(self, data: dict, headers: dict | None = None):
+        self._send(200, json.dumps(data, ensure_ascii=False).encode(), "application/json; charset=utf-8", headers)
+
+    def _redirect(self, location: str):
+        self._send(302, headers={"Location": location})
+
+    def _form(self) -> dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8", errors="replace") if length else ""
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    def _session_email(self) -> str | None:
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "key":
+                return self.site.sessions.get(value)
+        return None
+
+    def _login_cookies(self, email: str) -> dict:
+        key = secrets.token_hex(16)
+        with self.site.lock:
+            self.site.sessions[key] = email
+        expires = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + SESSION_MAX_AGE))
+        return {"Set-Cookie": [
+            f"key={key}; Path=/; Expires={expires}; HttpOnly",
+            f"email={email}; Path=/; Expires={expires}",
+            f"expire_in={int(time.time()) + SESSION_MAX_AGE}; Path=/; Expires={expires}",
+        ]}
+
+    def _count(self, path: str):
+        with self.site.lock:
+            self.site.stats.requests += 1
+            self.site.stats.paths[path] = self.site.stats.paths.get(path, 0) + 1
+
+    # ── 路由 ──
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        self._count(path)
+        if self.site.latency:
+            time.sleep(self.site.latency)
+
+        if path in _ASSETS:
+            self._asset(path)
+        elif path == "/altcha/challenge":
+            salt = secrets.token_hex(12)
+            number = random.randint(0, self.site.altcha_max)
+            challenge = hashlib.sha256(f"{salt}{number}".encode()).hexdigest()
+            self._json({"algorithm": "SHA-256", "salt": salt, "challenge": challenge,
+                        "maxnumber": self.site.altcha_max}, {"Cache-Control": "no-store"})
+        elif path == "/auth/login":
+            self._send(200, LOGIN_PAGE.encode())
+        elif path == "/auth/login/2fa":
+            self._send(200, TWO_FA_PAGE.encode())
+        elif path in ("/user", "/user/"):
+            email = self._session_email()
+            if email is None:
+                self._redirect("/auth/login")
+                return
+            self._send(200, self._user_page(email).encode())
+        elif path == "/":
+            self._redirect("/user")
+        else:
+            self._send(404, b"not found")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        self._count(path)
+        if self.site.latency:
+            time.sleep(self.site.latency)
+        form = self._form()
+
+        if path == "/auth/login":
+            self._login(form)
+        elif path == "/auth/login/2fa":
+            self._verify_2fa(form)
+        elif path == "/user/checkin":
+            self._checkin()
+        else:
+            self._send(404, b"not found")
+
+    def _asset(self, path: str):
+        content_type, body = _ASSETS[path]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+        headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+        if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == last_modified:
+            with self.site.lock:
+                self.site.stats.not_modified += 1
+            self._send(304, headers=headers)
+            return
+        self._send(200, body, content_type, headers)
+
+    def _user_page(self, email: str) -> str:
+        user = self.site.users[email]
+        if self.site.checked_in_today(email):
+            button = '<button class="btn" disabled>已签到</button>'
+        else:
+            button = '<button id="checkin" class="btn">每日签到</button>'
+        last = ""
+        if user.last_checkin:
+            last = f"<p>上次签到时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(user.last_checkin))}</p>"
+        return USER_PAGE.replace("__EMAIL__", html.escape(email)).replace("__BUTTON__", button).replace("__LAST__", last)
+
+    def _login(self, form: dict):
+        with self.site.lock:
+            self.site.stats.logins += 1
+        if not _altcha_payload_ok(form.get("altcha", "")):
+            self._json({"ret": 0, "msg": "请先完成人机验证"})
+            return
+        user = self.site.users.get(form.get("email", ""))
+        if user is None or user.password != form.get("passwd"):
+            self._json({"ret": 0, "msg": "邮箱或者密码错误"})
+            return
+        if user.two_fa:
+            token = secrets.token_hex(8)
+            code = f"{random.randint(0, 999999):06d}"
+            with self.site.lock:
+                self.site.pending[token] = (user.email, code)
+            # 和真实站点一样，邮件在响应之后才到达
+            threading.Timer(0.2, self.site.deliver_code, (user.email, code)).start()
+            self._json({"ret": 2, "msg": "请输入邮箱验证码", "token": token})
+            return
+        self._json({"ret": 1, "msg": "登录成功"}, self._login_cookies(user.email))
+
+    def _verify_2fa(self, form: dict):
+        with self.site.lock:
+            pending = self.site.pending.get(form.get("token", ""))
+        if pending is None:
+            self._json({"ret": 0, "msg": "验证已过期，请重新登录"})
+            return
+        email, code = pending
+        if form.get("code", "").strip() != code:
+            self._json({"ret": 0, "msg": "验证码错误"})
+            return
+        with self.site.lock:
+            self.site.pending.pop(form["token"], None)
+        self._json({"ret": 1, "msg": "验证成功"}, self._login_cookies(email))
+
+    def _checkin(self):
+        email = self._session_email()
+        if email is None:
+            self._redirect("/auth/login")
+            return
+        if self.site.checked_in_today(email):
+            self._json({"ret": 0, "msg": "您似乎已经签到过了..."})
+            return
+        with self.site.lock:
+            self.site.users[email].last_checkin = time.time()
+            self.site.stats.checkins += 1
+        self._json({"ret": 1, "msg": f"获得了 {random.randint(100, 500)}MB 流量."})
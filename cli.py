@@ -0,0 +1,176 @@
+"""
+命令行入口
+每个子命令只导入自己需要的模块：notify 只加载配置和 SMTP，doctor 只加载配置（--network 时才建立连接），
+fetch-code 加载邮箱客户端，只有 checkin 才导入 asyncio 和 CloakBrowser。
+
+    uv run python cli.py checkin [--force] [--no-wait]      # 与 python main.py 相同
+    uv run python cli.py fetch-code [--since-minutes 10] [--timeout 60]
+    uv run python cli.py notify "主题" [--body 文本 | --body -] [--image 截图] [--to 收件人]
+    uv run python cli.py doctor [--network]
+
+导入耗时可用 python -m bench.bench_startup 检查。
+"""
+
+import argparse
+import sys
+
+# Windows 中文环境终端默认 GBK，无法输出 emoji，强制 UTF-8
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+
+def cmd_checkin(args) -> int:
+    import asyncio
+    import main
+    return asyncio.run(main.amain(force=args.force, wait=not args.no_wait)) or 0
+
+
+def cmd_fetch_code(args) -> int:
+    """从当前验证码来源（CODE_SOURCE）收取 since 之后到达的验证码"""
+    import time
+    from main import create_code_source
+    from code_extractor import mask_code
+
+    source = create_code_source()
+    try:
+        source.open()
+        code, error = source.wait_for_code(time.time() - args.since_minutes * 60, args.timeout)
+    finally:
+        source.close()
+    if error or not code:
+        print(f"[Code] ❌ {error or '未收到验证码'}")
+        return 1
+    print(code if args.show else f"[Code] ✅ 验证码: {mask_code(code)}（--show 显示完整验证码）")
+    return 0
+
+
+def cmd_notify(args) -> int:
+    """用 SMTP 配置发送一封邮件"""
+    import config
+    from notifier import SmtpNotifier
+
+    if not config.SMTP_PASSWORD:
+        print("[SMTP] 未配置 SMTP_PASSWORD")
+        return 1
+    body = sys.stdin.read() if args.body == "-" else args.body
+    to_addr = args.to or config.CORDCLOUD_EMAIL or config.SMTP_USERNAME
+    notifier = SmtpNotifier(config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USE_SSL, config.SMTP_STARTTLS,
+                            config.SMTP_USERNAME, config.SMTP_PASSWORD)
+    try:
+        notifier.send(to_addr, args.subject, body, args.image or [])
+    except Exception as e:
+        print(f"[SMTP] ❌ 邮件发送失败: {e}")
+        return 1
+    finally:
+        notifier.close()
+    print(f"[SMTP] ✅ 邮件已发送至 {to_addr}")
+    return 0
+
+
+def _check_tcp(host: str, port: int, timeout: float = 5) -> tuple[bool, str]:
+    import socket
+    import time
+    start = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True, f"{(time.perf_counter() - start) * 1000:.0f}ms"
+    except OSError as e:
+        return False, str(e)
+
+
+def cmd_doctor(args) -> int:
+    """检查配置、依赖、Profile 和签到台账；--network 时并发测试各服务器能否连通"""
+    import importlib.util
+    from urllib.parse import urlsplit
+
+    import config
+    from ledger import CheckinLedger, site_timezone
+
+    checks: list[tuple[bool | None, str]] = []  # None 表示仅提示
+
+    def add(ok, text):
+        checks.append((ok, text))
+
+    add(config._env_loaded or None, ".env 已加载" if config._env_loaded else "未找到 .env，使用系统环境变量")
+    add(bool(config.CORDCLOUD_EMAIL and config.CORDCLOUD_PASSWORD), f"CordCloud 账号: {config.CORDCLOUD_EMAIL or '未配置'}")
+    if config.CODE_SOURCE == "imap":
+        mailbox = (config.IMAP_HOST, config.IMAP_PORT, config.IMAP_USERNAME, config.IMAP_PASSWORD)
+    else:
+        mailbox = (config.POP3_HOST, config.POP3_PORT, config.POP3_USERNAME, config.POP3_PASSWORD)
+    add(bool(mailbox[2] and mailbox[3]) and not mailbox[0].endswith("example.com"),
+        f"验证码来源 {config.CODE_SOURCE}: {mailbox[2] or '未配置用户名'}@{mailbox[0]}:{mailbox[1]}")
+    add(bool(config.SMTP_PASSWORD) or None,
+        f"SMTP: {config.SMTP_USERNAME}@{config.SMTP_HOST}:{config.SMTP_PORT}" if config.SMTP_PASSWORD else "SMTP 未配置，不发送结果邮件")
+    for module in ("cloakbrowser", "dotenv"):
+        add(importlib.util.find_spec(module) is not None, f"依赖 {module}")
+
+    if config.PROFILE_DIR.exists():
+        from profile_tool import dir_size
+        add(None, f"Profile {config.PROFILE_DIR}: {dir_size(config.PROFILE_DIR) / 1024 / 1024:.1f}MB")
+    else:
+        add(None, f"Profile {config.PROFILE_DIR} 不存在（首次运行会创建）")
+
+    if config.CORDCLOUD_EMAIL:
+        ledger = CheckinLedger(config.PROFILE_DIR / "checkin_ledger.json", site_timezone(config.SITE_TIMEZONE))
+        entry = ledger.entry(config.CORDCLOUD_EMAIL)
+        if ledger.checked_today(config.CORDCLOUD_EMAIL):
+            add(None, f"台账: 今日（{ledger.today()}）已签到，{entry.get('at', '')}")
+        else:
+            add(None, f"台账: 今日（{ledger.today()}）未签到，上次 {(entry or {}).get('at', '无记录')}")
+
+    if args.network:
+        import threading
+        site = urlsplit(config.CORDCLOUD_URL)
+        targets = [
+            ("站点", site.hostname or "", site.port or (443 if site.scheme == "https" else 80)),
+            (f"邮箱 {config.CODE_SOURCE}", mailbox[0], mailbox[1]),
+        ]
+        if config.SMTP_PASSWORD:
+            targets.append(("SMTP", config.SMTP_HOST, config.SMTP_PORT))
+        outcomes = {}
+        threads = [threading.Thread(target=lambda t=t: outcomes.__setitem__(t, _check_tcp(t[1], t[2]))) for t in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for target in targets:
+            ok, detail = outcomes[target]
+            add(ok, f"连接 {target[0]} {target[1]}:{target[2]}: {detail}")
+
+    for ok, text in checks:
+        print(f"{'ℹ️ ' if ok is None else '✅' if ok else '❌'} {text}")
+    return 1 if any(ok is False for ok, _ in checks) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CordCloud 签到命令行")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("checkin", help="登录并签到（与 python main.py 相同）")
+    p.add_argument("--force", action="store_true", help="忽略签到台账")
+    p.add_argument("--no-wait", action="store_true", help="忽略签到时段，立即开始")
+    p.set_defaults(func=cmd_checkin)
+
+    p = sub.add_parser("fetch-code", help="从邮箱收取最近的验证码")
+    p.add_argument("--since-minutes", type=float, default=10, help="只接受最近多少分钟内的邮件")
+    p.add_argument("--timeout", type=float, default=60, help="等待新邮件的秒数")
+    p.add_argument("--show", action="store_true", help="输出完整验证码（默认打码）")
+    p.set_defaults(func=cmd_fetch_code)
+
+    p = sub.add_parser("notify", help="用 SMTP 配置发送一封邮件")
+    p.add_argument("subject")
+    p.add_argument("--body", default="", help="正文；- 表示从标准输入读取")
+    p.add_argument("--image", action="append", help="附件图片（可重复）")
+    p.add_argument("--to", help="收件人，默认 CORDCLOUD_EMAIL")
+    p.set_defaults(func=cmd_notify)
+
+    p = sub.add_parser("doctor", help="检查配置、依赖和连通性")
+    p.add_argument("--network", action="store_true", help="测试站点、邮箱、SMTP 服务器能否连通")
+    p.set_defaults(func=cmd_doctor)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
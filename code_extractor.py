@@ -0,0 +1,263 @@
+"""
+验证码提取
+所有模式在导入时预编译并合并为一个正则，按命名分组区分优先级，每段文本只扫描一次；
+先搜纯文本部分，只有纯文本中找不到时才把 HTML 部分转为文本再搜。
+
+邮件不解析为完整的 Message 树：只解析邮件头和各部分的头，按 boundary 在原始字节中定位各部分，
+图片、附件等非文本部分直接跳过、不解码；文本部分逐个解码扫描，找到最高优先级的验证码即停止，
+后面的部分（以及纯文本中已有验证码时的 HTML 部分）不再解码。
+"""
+
+import binascii
+import html
+import re
+from email.header import decode_header
+from email.message import Message
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
+
+# 按优先级排列：(分组名, 模式, 说明)。数字验证码优先（站点要求6位数字），字母数字作为兜底
+_PATTERNS = [
+    # 紧邻 "验证码" 的 6 位数字（最精确）
+    ("digit_label", r"验证码[：:\s]*(?:是|为)?[：:\s]*(?P<digit_label>\d{6})", "6位数字紧邻验证码"),
+    # "code:" 后 6 位数字
+    ("digit_code", r"(?:code|Code|CODE)[：:\s]*(?P<digit_code>\d{6})", "6位数字紧邻code"),
+    # 正文中任意 6 位数字（大概率是验证码）
+    ("digit_any", r"(?<!\d)(?P<digit_any>\d{6})(?!\d)", "独立6位数字"),
+    # "验证码" 后 4-8 位字母数字（兜底）
+    ("alnum_label", r"验证码[：:\s]*(?:是|为)?[：:\s]*(?P<alnum_label>[A-Za-z0-9]{4,8})", "4-8位字母数字紧邻验证码"),
+    # "code:" 后 4-8 位字母数字
+    ("alnum_code", r"(?:code|Code|CODE)[：:\s]*(?P<alnum_code>[A-Za-z0-9]{4,8})", "4-8位字母数字紧邻code"),
+]
+
+_COMBINED = re.compile("|".join(f"(?:{pattern})" for _, pattern, _ in _PATTERNS))
+_PRIORITY = {name: i for i, (name, _, _) in enumerate(_PATTERNS)}
+_DESC = {name: desc for name, _, desc in _PATTERNS}
+
+_HTML_DROP = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.S | re.I)
+_HTML_BREAK = re.compile(r"<\s*(br|/p|/div|/tr|/li|/h\d)\b[^>]*>", re.I)
+_HTML_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def mask_code(code: str) -> str:
+    """脱敏验证码，仅保留首尾字符"""
+    if len(code) <= 2:
+        return "*" * len(code)
+    return code[0] + "*" * (len(code) - 2) + code[-1]
+
+
+def decode_mime_header(header_value):
+    """解码 MIME 编码的邮件头"""
+    if header_value is None:
+        return ""
+    parts = decode_header(header_value)
+    result = []
+    for part, charset in parts:
+        if isinstance(part, bytes):
+            try:
+                result.append(part.decode(charset or "utf-8", errors="replace"))
+            except LookupError:  # 未知字符集（如 unknown-8bit）
+                result.append(part.decode("utf-8", errors="replace"))
+        else:
+            result.append(str(part))
+    return "".join(result)
+
+
+def html_to_text(markup: str) -> str:
+    """粗略的 HTML 转文本：去掉 script/style/head、标签和实体，避免 CSS 颜色值等被当成验证码"""
+    text = _HTML_DROP.sub(" ", markup)
+    text = _HTML_BREAK.sub("\n", text)
+    text = _HTML_TAG.sub(" ", text)
+    return _BLANK_LINES.sub("\n", html.unescape(text))
+
+
+def find_code(text: str) -> tuple[str, str, re.Match] | None:
+    """
+    单次扫描文本，返回优先级最高的匹配 (code, 说明, match)；同优先级取最靠前的。
+    扫描到最高优先级的匹配即提前结束。
+    """
+    best = None
+    best_rank = len(_PATTERNS)
+    for match in _COMBINED.finditer(text):
+        rank = _PRIORITY[match.lastgroup]
+        if rank < best_rank:
+            best, best_rank = match, rank
+            if rank == 0:
+                break
+    if best is None:
+        return None
+    return best.group(best.lastgroup), _DESC[best.lastgroup], best
+
+
+# ── 原始字节中的 MIME 结构 ──
+
+_header_parser = BytesHeaderParser()
+
+
+def parse_headers(block: bytes) -> Message:
+    """只解析邮件头（或某个部分的头），不读取正文"""
+    return _header_parser.parsebytes(block)
+
+
+def header_matches(headers: Message, from_filter: str = "", subject_filter: str = "") -> bool:
+    """发件人 / 主题包含过滤字符串（小写）；过滤字符串为空表示不过滤"""
+    if from_filter and from_filter not in str(headers.get("From", "")).lower():
+        return False
+    if subject_filter and subject_filter not in decode_mime_header(headers.get("Subject")).lower():
+        return False
+    return True
+
+
+# Date 头只精确到秒，发件服务器与本机的时钟也可能差几秒：判断历史邮件时留出的余量
+DATE_SKEW_SECONDS = 5
+
+
+def sent_before(date_header: str, since_time: float, skew: float = DATE_SKEW_SECONDS) -> bool:
+    """
+    邮件 Date 明确早于 since_time：since_time 先取整到秒再减去 skew 秒，
+    与触发时刻同一秒（或只差几秒）发出的验证码邮件不会被当成历史邮件。日期缺失或解析失败时返回 False
+    """
+    if not date_header:
+        return False
+    try:
+        return parsedate_to_datetime(date_header).timestamp() < int(since_time) - skew
+    except Exception:
+        return False
+
+
+def split_headers(raw: bytes, start: int = 0, end: int | None = None) -> tuple[int, int]:
+    """返回 (头部结束偏移, 正文开始偏移)；找不到空行时整段都是头部"""
+    end = len(raw) if end is None else end
+    for blank in (b"\r\n", b"\n"):
+        if raw.startswith(blank, start):
+            return start, start + len(blank)
+    candidates = [(i, i + len(sep)) for sep in (b"\r\n\r\n", b"\n\n") if (i := raw.find(sep, start, end)) >= 0]
+    return min(candidates) if candidates else (end, end)
+
+
+def _find_delimiter(raw: bytes, start: int, end: int, delimiter: bytes) -> int:
+    """从 start 开始查找位于行首的 "--boundary" 行，返回行首偏移，找不到返回 -1"""
+    pos = start
+    while pos < end:
+        if raw.startswith(delimiter, pos) and (pos == start or raw[pos - 1] == 0x0A):
+            at = pos
+        else:
+            at = raw.find(b"\n" + delimiter, pos, end)
+            if at < 0:
+                return -1
+            at += 1
+        # boundary 后只能是结束标记 "--"、空白或换行，排除以它为前缀的其他 boundary
+        after = raw[at + len(delimiter):at + len(delimiter) + 1]
+        if after in (b"", b"-", b"\r", b"\n", b" ", b"\t"):
+            return at
+        pos = at + len(delimiter)
+    return -1
+
+
+def _parts(raw: bytes, start: int, end: int, boundary: str):
+    """产生 multipart 正文中各部分的 (开始偏移, 结束偏移)，不复制内容"""
+    delimiter = b"--" + boundary.encode("ascii", errors="replace")
+    at = _find_delimiter(raw, start, end, delimiter)
+    while at >= 0 and not raw.startswith(delimiter + b"--", at):
+        line_end = raw.find(b"\n", at, end)
+        part_start = end if line_end < 0 else line_end + 1
+        at = _find_delimiter(raw, part_start, end, delimiter)
+        part_end = end if at < 0 else at
+        # 分隔符前的换行属于分隔符
+        if part_end > part_start and raw[part_end - 1] == 0x0A:
+            part_end -= 1
+            if part_end > part_start and raw[part_end - 1] == 0x0D:
+                part_end -= 1
+        yield part_start, part_end
+
+
+def text_parts(raw: bytes, start: int, end: int, headers: Message):
+    """按出现顺序产生文本部分 (content_type, 部分头, 正文开始, 正文结束)；非文本部分不解析正文"""
+    content_type = headers.get_content_type()
+    if content_type.startswith("multipart/"):
+        boundary = headers.get_boundary()
+        if not boundary:
+            return
+        for part_start, part_end in _parts(raw, start, end, boundary):
+            header_end, body_start = split_headers(raw, part_start, part_end)
+            yield from text_parts(raw, min(body_start, part_end), part_end, parse_headers(raw[part_start:header_end]))
+    elif content_type in ("text/plain", "text/html"):
+        yield content_type, headers, start, end
+
+
+def decode_body(raw: bytes, start: int, end: int, headers: Message) -> str:
+    """按 Content-Transfer-Encoding 和 charset 解码一个部分的正文"""
+    payload = raw[start:end]
+    encoding = str(headers.get("Content-Transfer-Encoding", "")).strip().lower()
+    try:
+        if encoding == "base64":
+            payload = binascii.a2b_base64(payload)
+        elif encoding == "quoted-printable":
+            payload = binascii.a2b_qp(payload)
+    except (binascii.Error, ValueError):
+        pass  # 编码损坏时按原始字节处理
+    charset = headers.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def _scan(texts) -> tuple[tuple[str, str, re.Match] | None, str]:
+    """
+    依次扫描各部分文本（可以是惰性解码的生成器），返回 (优先级最高的匹配, 所在文本)；
+    遇到最高优先级的匹配即停止，后面的部分不再解码。没有匹配时文本为最后扫描的部分
+    """
+    found, body = None, ""
+    for text in texts:
+        hit = find_code(text)
+        if hit is not None and (found is None or _PRIORITY[hit[2].lastgroup] < _PRIORITY[found[2].lastgroup]):
+            found, body = hit, text
+            if _PRIORITY[hit[2].lastgroup] == 0:
+                break
+        elif found is None:
+            body = text
+    return found, body
+
+
+def extract_code_from_email(raw_email: bytes, verbose: bool = True) -> str | None:
+    """从一封完整邮件中提取验证码，未找到返回 None"""
+    header_end, body_start = split_headers(raw_email)
+    headers = parse_headers(raw_email[:header_end])
+    if verbose:
+        subject = decode_mime_header(headers["Subject"] or "")
+        sender = decode_mime_header(headers["From"] or "")
+        print(f"[POP3] 候选邮件: 发件人={sender}, 主题={subject}, 时间={headers.get('Date', '')}")
+
+    # 纯文本部分逐个解码扫描；HTML 部分只记下位置，纯文本中找不到验证码时才解码
+    html_spans = []
+
+    def plain_texts():
+        for content_type, part_headers, start, end in text_parts(raw_email, body_start, len(raw_email), headers):
+            if content_type == "text/html":
+                html_spans.append((start, end, part_headers))
+            else:
+                yield decode_body(raw_email, start, end, part_headers)
+
+    found, body = _scan(plain_texts())
+    label = "纯文本"
+    if found is None and html_spans:
+        found, body = _scan(html_to_text(decode_body(raw_email, *span)) for span in html_spans)
+        label = "HTML"
+
+    if found is not None:
+        code, desc, match = found
+        if verbose:
+            # 打印匹配上下文便于调试
+            start = max(0, match.start() - 20)
+            end = min(len(body), match.end() + 20)
+            ctx = body[start:end].replace("\n", " ")
+            print(f"[POP3] ✅ [{label}] {desc}: {mask_code(code)} (上下文: ...{ctx}...)")
+        return code
+
+    if verbose:
+        # 降级：打印正文前 500 字符供人工判断
+        print(f"[POP3] ⚠️ 未能自动提取验证码，正文前500字符:")
+        print(body[:500])
+    return None
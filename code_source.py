@@ -0,0 +1,217 @@
+"""
+验证码来源
+CodeSource 定义统一接口，提供 POP3 轮询和 IMAP IDLE 推送两种实现，由 CODE_SOURCE 环境变量选择。
+"""
+
+import imaplib
+import select
+import ssl
+import time
+from typing import Callable
+
+from code_extractor import header_matches, parse_headers, sent_before
+from pop3_poller import Pop3Poller
+
+# 从一封完整邮件中提取验证码，未找到返回 None
+Extractor = Callable[[bytes], "str | None"]
+
+
+class CodeSource:
+    """验证码来源接口：open() 建立连接（可提前调用以预热），wait_for_code() 等待验证码，close() 释放连接"""
+
+    name = "base"
+
+    def open(self):
+        pass
+
+    def wait_for_code(self, since_time: float | None, timeout_seconds: float) -> tuple[str | None, str | None]:
+        """等待 since_time 之后到达的验证码邮件，返回 (code, error)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Pop3CodeSource(CodeSource):
+    """按固定间隔轮询 POP3 邮箱"""
+
+    name = "pop3"
+
+    def __init__(self, poller: Pop3Poller, extract: Extractor, poll_interval: float = 3):
+        self.poller = poller
+        self.extract = extract
+        self.poll_interval = poll_interval
+
+    def open(self):
+        # 预热：登录并记录现有邮件，必须在触发验证码邮件之前完成
+        self.poller.index()
+
+    def wait_for_code(self, since_time, timeout_seconds):
+        deadline = time.time() + timeout_seconds
+        while time.time() < deadline:
+            try:
+                # 新到旧依次尝试，避免验证码邮件之后又到达其他邮件时漏读
+                for raw_email in self.poller.poll(since_time):
+                    code = self.extract(raw_email)
+                    if code is not None:
+                        return code, None
+            except Exception as e:
+                print(f"[POP3] 连接错误: {e}")
+                self.poller.close()
+
+            time.sleep(self.poll_interval)
+
+        return None, f"超时 {timeout_seconds}s 未获取到验证码"
+
+    def close(self):
+        self.poller.close()
+
+
+class ImapIdleCodeSource(CodeSource):
+    """
+    通过 IMAP IDLE 等待服务器推送新邮件，邮件到达后立即读取，无需轮询间隔。
+    只用 BODY.PEEK 读取，不改变邮件的已读状态。
+    """
+
+    name = "imap"
+
+    # IDLE 最长保持时间，RFC 2177 建议不超过 29 分钟
+    MAX_IDLE_SECONDS = 25 * 60
+
+    def __init__(self, host: str, port: int, username: str, password: str, extract: Extractor,
+                 use_ssl: bool = True, folder: str = "INBOX", timeout: int = 10, from_filter: str = "",
+                 subject_filter: str = "", rate_limit=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.extract = extract
+        self.use_ssl = use_ssl
+        self.folder = folder
+        self.timeout = timeout
+        self.from_filter = from_filter.lower()
+        self.subject_filter = subject_filter.lower()
+        self.rate_limit = rate_limit  # scheduler.RateLimiter，每次登录前取得放行
+        self._conn = None
+        self._next_uid = None  # 下一封新邮件的 UID 下限
+
+    # ── 连接管理 ──
+
+    def open(self):
+        if self._conn is not None:
+            return
+        if self.rate_limit is not None:
+            self.rate_limit.acquire()
+        if self.use_ssl:
+            conn = imaplib.IMAP4_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = imaplib.IMAP4(self.host, self.port, timeout=self.timeout)
+        conn.login(self.username, self.password)
+        typ, data = conn.status(self.folder, "(UIDNEXT)")
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"STATUS 失败: {data}")
+        conn.select(self.folder, readonly=True)
+        self._conn = conn
+        self._next_uid = int(data[0].decode().split("UIDNEXT")[1].strip(" )"))
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.logout()
+        except Exception:
+            pass
+        self._conn = None
+
+    # ── IDLE ──
+
+    def _readable(self, wait: float) -> bool:
+        sock = self._conn.sock
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        return bool(select.select([sock], [], [], wait)[0])
+
+    def _idle(self, wait: float) -> bool:
+        """
+        进入 IDLE，直到服务器通知新邮件（EXISTS）或等待超时。返回是否有新邮件。
+        imaplib 在 3.14 之前没有 IDLE，这里直接收发协议行；
+        用 select 判断可读而不是 socket 超时，避免超时后 makefile 对象不可再读。
+        """
+        conn = self._conn
+        tag = conn._new_tag()
+        conn.send(tag + b" IDLE\r\n")
+        line = conn.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"服务器不支持 IDLE: {line!r}")
+
+        notified = False
+        deadline = time.monotonic() + wait
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._readable(remaining):
+                    break
+                line = conn.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("IDLE 期间连接被关闭")
+                if b"EXISTS" in line:
+                    notified = True
+                    break
+        finally:
+            conn.send(b"DONE\r\n")
+            while True:
+                line = conn.readline()
+                if not line or line.startswith(tag):
+                    break
+        return notified
+
+    # ── 读取邮件 ──
+
+    def _fetch(self, uid: bytes, item: str) -> bytes:
+        typ, data = self._conn.uid("FETCH", uid, f"({item})")
+        for part in data:
+            if isinstance(part, tuple):
+                return part[1]
+        return b""
+
+    def _search_since(self, since_time: float | None) -> list[bytes]:
+        """返回 UID >= _next_uid 的邮件；首次检查时还包括 since_time 当天的邮件（防止连接前已到达的邮件被漏掉）"""
+        if since_time is not None:
+            day = time.strftime("%d-%b-%Y", time.gmtime(since_time - 86400))
+            typ, data = self._conn.uid("SEARCH", None, "SINCE", day)
+        else:
+            typ, data = self._conn.uid("SEARCH", None, f"UID {self._next_uid}:*")
+        return data[0].split() if data and data[0] else []
+
+    def _check(self, uids: list[bytes], since_time: float | None) -> str | None:
+        """新到旧检查邮件头，通过 Date / From / Subject 过滤后下载完整邮件并提取验证码"""
+        for uid in sorted(uids, key=int, reverse=True):
+            headers = parse_headers(self._fetch(uid, "BODY.PEEK[HEADER.FIELDS (FROM DATE SUBJECT)]"))
+            if since_time is not None and sent_before(headers.get("Date", ""), since_time):
+                break
+            self._next_uid = max(self._next_uid, int(uid) + 1)
+            if not header_matches(headers, self.from_filter, self.subject_filter):
+                continue
+            code = self.extract(self._fetch(uid, "BODY.PEEK[]"))
+            if code is not None:
+                return code
+        return None
+
+    def wait_for_code(self, since_time, timeout_seconds):
+        deadline = time.time() + timeout_seconds
+        try:
+            self.open()
+            # 先检查连接建立前已到达的邮件
+            code = self._check(self._search_since(since_time), since_time)
+            while code is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None, f"超时 {timeout_seconds}s 未获取到验证码"
+                if self._idle(min(remaining, self.MAX_IDLE_SECONDS)):
+                    typ, data = self._conn.uid("SEARCH", None, f"UID {self._next_uid}:*")
+                    # "n:*" 在没有更大 UID 时会返回最后一封，需要再过滤一次
+                    uids = [u for u in (data[0].split() if data and data[0] else []) if int(u) >= self._next_uid]
+                    code = self._check(uids, since_time)
+            return code, None
+        except Exception as e:
+            return None, f"IMAP 错误: {e}"
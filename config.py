@@ -0,0 +1,137 @@
+"""
+配置
+从 .env / 环境变量读取全部配置。只依赖标准库和 python-dotenv，导入开销很小：
+只发通知、只收验证码、doctor 等轻量命令只导入本模块和各自需要的客户端。
+main.py 重新导出这里的全部名称，其他模块仍可 from main import ...
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+_env_loaded = load_dotenv()
+if not _env_loaded:
+    print("[Config] 未找到 .env 文件，使用系统环境变量")
+
+def _env(key: str, default: str = "") -> str:
+    """读取环境变量，空字符串视为未设置，返回默认值"""
+    val = os.getenv(key)
+    return val if val else default
+
+CORDCLOUD_EMAIL = _env("CORDCLOUD_EMAIL")
+CORDCLOUD_PASSWORD = _env("CORDCLOUD_PASSWORD")
+
+
+# POP3 配置
+POP3_HOST = _env("POP3_HOST", "pop.example.com")
+POP3_PORT = int(_env("POP3_PORT", "995"))
+POP3_USE_SSL = _env("POP3_USE_SSL", "true").lower() == "true"
+POP3_USERNAME = _env("POP3_USERNAME", CORDCLOUD_EMAIL)
+POP3_PASSWORD = _env("POP3_PASSWORD")
+POP3_FROM_FILTER = _env("POP3_FROM_FILTER")  # 发件人包含该字符串才读取正文，留空不过滤
+POP3_SUBJECT_FILTER = _env("POP3_SUBJECT_FILTER")  # 主题包含该字符串才读取正文，留空不过滤
+# 保持 POP3 会话不断开（仅适用于会话内可见新邮件的服务器）
+POP3_KEEP_SESSION = _env("POP3_KEEP_SESSION", "false").lower() == "true"
+POP3_POLL_INTERVAL = float(_env("POP3_POLL_INTERVAL", "3"))
+
+# 验证码来源：pop3（轮询）或 imap（IDLE 推送）
+CODE_SOURCE = _env("CODE_SOURCE", "pop3").lower()
+
+# IMAP 配置（CODE_SOURCE=imap 时使用，凭据默认同 POP3）
+IMAP_HOST = _env("IMAP_HOST", "imap.example.com")
+IMAP_PORT = int(_env("IMAP_PORT", "993"))
+IMAP_USE_SSL = _env("IMAP_USE_SSL", "true").lower() == "true"
+IMAP_USERNAME = _env("IMAP_USERNAME", POP3_USERNAME)
+IMAP_PASSWORD = _env("IMAP_PASSWORD", POP3_PASSWORD)
+IMAP_FOLDER = _env("IMAP_FOLDER", "INBOX")
+
+# SMTP 配置（发送签到结果通知）
+SMTP_HOST = _env("SMTP_HOST", "smtp.qq.com")
+SMTP_PORT = int(_env("SMTP_PORT", "465"))
+SMTP_USE_SSL = _env("SMTP_USE_SSL", "true").lower() == "true"
+SMTP_STARTTLS = _env("SMTP_STARTTLS", "true").lower() == "true"  # 仅 SMTP_USE_SSL=false 时生效
+SMTP_USERNAME = _env("SMTP_USERNAME", CORDCLOUD_EMAIL)
+SMTP_PASSWORD = _env("SMTP_PASSWORD")
+# 汇总模式：一次运行只发一封邮件，列出所有账号的结果（默认每个账号单独发送）
+NOTIFY_DIGEST = _env("NOTIFY_DIGEST", "false").lower() == "true"
+NOTIFY_DIGEST_TO = _env("NOTIFY_DIGEST_TO", SMTP_USERNAME)
+# 结果邮件截图：按 CSS 像素截取视口并保存为 JPEG，数值为 JPEG 质量（1-100）
+SCREENSHOT_QUALITY = int(_env("SCREENSHOT_QUALITY", "60"))
+
+# 持久化配置
+USE_PERSISTENT = _env("USE_PERSISTENT_CONTEXT", "true").lower() == "true"
+PROFILE_DIR = Path(_env("PERSISTENT_PROFILE_DIR", "./cloak_profile"))
+HEADLESS = _env("HEADLESS", "false").lower() == "true"
+# 结束后保持浏览器打开的秒数，便于人工查看（默认立即关闭）
+KEEP_BROWSER_OPEN_SECONDS = float(_env("KEEP_BROWSER_OPEN_SECONDS", "0"))
+
+CORDCLOUD_URL = _env("CORDCLOUD_URL", "https://www.cordcloud.one").rstrip("/")
+LOGIN_URL = f"{CORDCLOUD_URL}/auth/login"
+USER_URL = f"{CORDCLOUD_URL}/user"
+CHECKIN_URL = f"{CORDCLOUD_URL}/user/checkin"
+
+# 签到台账：按站点时区的自然日记录，当天已签到则不启动浏览器
+SITE_TIMEZONE = _env("SITE_TIMEZONE", "Asia/Shanghai")
+# 签到结果消息包含这些词视为签到成功（SSPanel："获得了 xxx 流量" / "您似乎已经签到过了"）
+CHECKIN_OK_WORDS = ("获得", "流量", "成功", "签到过", "已签到")
+
+# 会话在该时长内确认过有效时，Step 1 不再单独探测登录状态
+SESSION_FRESH_HOURS = float(_env("SESSION_FRESH_HOURS", "24"))
+
+# 已有会话时直接用 HTTP 请求签到，会话失效才启动浏览器
+HTTP_FAST_PATH = _env("HTTP_FAST_PATH", "false").lower() == "true"
+
+# 重试：一次签到的总截止时间；打开页面、ALtcha、验证码等待失败时只重试该阶段（指数退避 + 随机抖动）
+RUN_DEADLINE_SECONDS = float(_env("RUN_DEADLINE_SECONDS", "300"))
+# 覆盖阶段预算，如 "login_page=90,code_wait=180/2"（秒数 / 最多尝试次数）
+STAGE_BUDGETS = _env("STAGE_BUDGETS")
+RETRY_BASE_DELAY = float(_env("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(_env("RETRY_MAX_DELAY", "8"))
+
+# 签到时段：账号按固定偏移分散在定时任务触发后的 CHECKIN_WINDOW_MINUTES 分钟内（0 表示立即开始）
+CHECKIN_WINDOW_MINUTES = float(_env("CHECKIN_WINDOW_MINUTES", "0"))
+# 偏移 = sha256(种子:邮箱)；换一个种子即可整体改变各账号的时段
+CHECKIN_JITTER_SEED = _env("CHECKIN_JITTER_SEED")
+# 运行报告中时段占用的统计粒度（秒）
+SCHEDULE_SLOT_SECONDS = int(_env("SCHEDULE_SLOT_SECONDS", "60"))
+# 全局限流（每分钟次数，默认 0 不限）：登录、邮箱（POP3 / IMAP）连接、SMTP 连接；RATE_BURST 为允许的突发次数
+LOGIN_RATE_PER_MINUTE = float(_env("LOGIN_RATE_PER_MINUTE", "0"))
+MAILBOX_RATE_PER_MINUTE = float(_env("MAILBOX_RATE_PER_MINUTE", "0"))
+SMTP_RATE_PER_MINUTE = float(_env("SMTP_RATE_PER_MINUTE", "0"))
+RATE_BURST = int(_env("RATE_BURST", "3"))
+
+# 资源拦截（默认关闭，注册路由会停用浏览器 HTTP 缓存）：on（拦截图片/字体/统计脚本）/ report（只统计可节省的流量）/ off
+RESOURCE_BLOCKING = _env("RESOURCE_BLOCKING", "off").lower()
+# 默认值与 resource_filter.DEFAULT_* 相同；这里直接写出，不为几个字符串导入拦截模块
+RESOURCE_BLOCK_TYPES = _env("RESOURCE_BLOCK_TYPES", "image,media,font")
+RESOURCE_BLOCK_URLS = _env("RESOURCE_BLOCK_URLS", (
+    "google-analytics.com,googletagmanager.com,doubleclick.net,hm.baidu.com,cnzz.com,51.la,"
+    "clarity.ms,hotjar.com,/analytics.js,/gtag/"
+))
+RESOURCE_ALLOW_URLS = _env("RESOURCE_ALLOW_URLS", "altcha")
+
+# 静态资源缓存（默认关闭）：on（脚本、样式存到本地，命中时条件请求验证后复用；未命中照常由浏览器请求）/ off
+RESPONSE_CACHE = _env("RESPONSE_CACHE", "off").lower()
+RESPONSE_CACHE_DIR = Path(_env("RESPONSE_CACHE_DIR", str(PROFILE_DIR / "response_cache")))
+RESPONSE_CACHE_TYPES = _env("RESPONSE_CACHE_TYPES", "script,stylesheet")  # 同 response_cache.DEFAULT_CACHE_TYPES
+# 距上次验证不到这么多秒时直接使用本地内容、不发条件请求（0 表示每次都验证）
+RESPONSE_CACHE_FRESH_SECONDS = float(_env("RESPONSE_CACHE_FRESH_SECONDS", "0"))
+RESPONSE_CACHE_MB = float(_env("RESPONSE_CACHE_MB", "50"))
+
+# 调试文件：none / on-failure / html-only / full（兼容旧配置 SAVE_HTML=false → none）
+DEBUG_HTML_DIR = Path(_env("DEBUG_HTML_DIR", "./debug_html"))
+DEBUG_ARTIFACTS = _env("DEBUG_ARTIFACTS", "none" if _env("SAVE_HTML", "true").lower() == "false" else "on-failure")
+# 调试文件保留策略（0 表示不限制）
+DEBUG_KEEP_FILES = int(_env("DEBUG_KEEP_FILES", "200"))
+DEBUG_KEEP_DAYS = float(_env("DEBUG_KEEP_DAYS", "7"))
+DEBUG_KEEP_MB = float(_env("DEBUG_KEEP_MB", "100"))
+
+# 运行报告：每次运行写出一份 JSON（各步骤耗时与结果）
+RUN_REPORT = _env("RUN_REPORT", "true").lower() == "true"
+RUN_REPORT_DIR = Path(_env("RUN_REPORT_DIR", "./reports"))
+# 资源采样：进程树内存、Python 堆、socket 数、写盘量，按步骤记录峰值并写入运行报告
+PROFILE_RESOURCES = _env("PROFILE_RESOURCES", "false").lower() == "true"
+PROFILE_INTERVAL = float(_env("PROFILE_INTERVAL", "0.5"))
+# 资源预算，如 "tree_rss_mb=1500,python_heap_mb=100,sockets=10,disk_mb=50"；超出时退出码为 1
+PROFILE_BUDGETS = _env("PROFILE_BUDGETS")
@@ -0,0 +1,326 @@
+"""
+CordCloud 常驻模式
+守护进程启动一次 CloakBrowser 并保持运行，为每个账号保留一个已载入会话的浏览器上下文（warm pool），
+按 DAEMON_SCHEDULE 定时签到，也可以通过本地端口随时提交签到任务。
+上下文执行 DAEMON_RECYCLE_JOBS 次任务后关闭重建；进程树内存比所有上下文预热后增长超过 DAEMON_RECYCLE_MB 时，
+等当前任务结束后重启整个浏览器。
+定时签到时各账号按 CHECKIN_WINDOW_MINUTES 分散在签到时段内；手动提交的任务立即执行。
+
+    uv run python daemon.py serve                              # 启动守护进程
+    uv run python daemon.py checkin [--account EMAIL] [--force] # 提交签到任务并等待结果
+    uv run python daemon.py status
+    uv run python daemon.py stop
+
+协议：每个连接发送一行 JSON 命令，收到一行 JSON 响应。只监听 127.0.0.1。
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+from datetime import datetime, timedelta
+
+from main import (
+    Account, try_http_checkin, notify_result, finish_run, publish_report,
+    already_checked_in, ledger, new_window, start_profiler, _env, HEADLESS, HTTP_FAST_PATH,
+)
+from batch import load_accounts, open_context, run_in_context, print_report, BATCH_CONCURRENCY
+from procstats import process_tree_rss
+from scheduler import Window
+from timing import start_report, set_account, step
+
+# ── 配置 ────────────────────────────────────────────
+DAEMON_PORT = int(_env("DAEMON_PORT", "8765"))
+# 每天自动签到的时间（站点时区），逗号分隔；off 则只接受手动提交
+DAEMON_SCHEDULE = _env("DAEMON_SCHEDULE", "08:00")
+# 上下文执行多少次任务后重建（0 表示不限制）
+DAEMON_RECYCLE_JOBS = int(_env("DAEMON_RECYCLE_JOBS", "20"))
+# 进程树内存比浏览器启动时增长超过多少 MB 时重启浏览器（0 表示不限制）
+DAEMON_RECYCLE_MB = float(_env("DAEMON_RECYCLE_MB", "500"))
+
+
+class WarmPool:
+    """共享一个浏览器，每个账号保留一个上下文；同一账号的任务串行执行"""
+
+    def __init__(self, recycle_jobs: int = DAEMON_RECYCLE_JOBS, recycle_mb: float = DAEMON_RECYCLE_MB):
+        self.recycle_jobs = recycle_jobs
+        self.recycle_mb = recycle_mb
+        self.browser = None
+        self.contexts: dict[str, object] = {}
+        self.context_jobs: dict[str, int] = {}
+        self.account_locks: dict[str, asyncio.Lock] = {}
+        self.baseline_rss = 0
+        self.total_jobs = 0
+        self.recycles = 0
+        self.busy = 0
+        self._recycle_pending = False
+        self._lock = asyncio.Lock()
+
+    async def _ensure_browser(self):
+        if self.browser is None:
+            from cloakbrowser import launch_async
+            print("[Pool] 启动 CloakBrowser...")
+            with step("browser_launch"):
+                self.browser = await launch_async(headless=HEADLESS, humanize=True)
+            self.baseline_rss = process_tree_rss()
+
+    async def run(self, account: Account) -> dict:
+        """在账号的常驻上下文中执行一次签到"""
+        lock = self.account_locks.setdefault(account.email, asyncio.Lock())
+        async with lock:
+            async with self._lock:
+                await self._ensure_browser()
+                context = self.contexts.get(account.email)
+                fresh = context is None
+                if fresh:
+                    context = await open_context(self.browser, account)
+                    self.contexts[account.email] = context
+                    self.context_jobs[account.email] = 0
+                self.busy += 1
+            try:
+                return await run_in_context(context, account)
+            finally:
+                self.busy -= 1
+                await self._after_job(account, fresh)
+
+    async def _after_job(self, account: Account, fresh: bool = False):
+        async with self._lock:
+            if fresh:
+                # 新上下文的第一次任务结束后，它的常驻内存属于正常开销：把基准抬高到当前值，
+                # 之后只有已预热上下文的持续增长才算作需要重启的内存增长
+                self.baseline_rss = max(self.baseline_rss, process_tree_rss())
+            self.total_jobs += 1
+            self.context_jobs[account.email] = self.context_jobs.get(account.email, 0) + 1
+            if self.recycle_jobs and self.context_jobs[account.email] >= self.recycle_jobs:
+                print(f"[Pool] {account.email} 的上下文已执行 {self.context_jobs[account.email]} 次任务，重建")
+                await self._close_context(account.email)
+
+            growth_mb = (process_tree_rss() - self.baseline_rss) / 1024 / 1024
+            if self.recycle_mb and self.browser is not None and growth_mb > self.recycle_mb:
+                self._recycle_pending = True
+            if self._recycle_pending and self.busy == 0:
+                print(f"[Pool] 内存增长 {growth_mb:.0f}MB，超过 {self.recycle_mb:g}MB，重启浏览器")
+                await self._close_all()
+                self.recycles += 1
+                self._recycle_pending = False
+
+    async def _close_context(self, email_addr: str):
+        context = self.contexts.pop(email_addr, None)
+        self.context_jobs.pop(email_addr, None)
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"[Pool] 关闭上下文失败: {e}")
+
+    async def _close_all(self):
+        for email_addr in list(self.contexts):
+            await self._close_context(email_addr)
+        if self.browser is not None:
+            with step("browser_close"):
+                await self.browser.close()
+            self.browser = None
+
+    async def close(self):
+        async with self._lock:
+            await self._close_all()
+
+    def status(self) -> dict:
+        return {
+            "browser": self.browser is not None,
+            "contexts": dict(self.context_jobs),
+            "busy": self.busy,
+            "total_jobs": self.total_jobs,
+            "recycles": self.recycles,
+            "rss_mb": round(process_tree_rss() / 1024 / 1024, 1),
+        }
+
+
+async def run_job(pool: WarmPool, slots: asyncio.Semaphore, account: Account, force: bool,
+                  window: Window | None = None) -> dict:
+    """单账号任务：等待签到时段 → 台账检查 → HTTP 快速签到 → 常驻上下文中的浏览器流程"""
+    set_account(account.email)
+    if window is not None:
+        await window.wait_turn(account.email)
+    if not force and already_checked_in(account):
+        return {"email": account.email, "ok": True, "seconds": 0.0, "results": ["[Ledger] 今日已签到，跳过"]}
+
+    async with slots:
+        start = time.perf_counter()
+        results = []
+        if HTTP_FAST_PATH and await try_http_checkin(account, results):
+            notify_result(account, True, results, to_addr=account.email)
+            record = {"email": account.email, "ok": True, "seconds": time.perf_counter() - start, "results": results}
+        else:
+            record = await pool.run(account)
+        return record
+
+
+class Daemon:
+    def __init__(self):
+        self.pool = WarmPool()
+        self.slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+        self.stopping = asyncio.Event()
+        # 同一时间只进行一次签到：并发的两次运行会各自通过台账检查而重复签到，
+        # 先结束的一次 finish_run() 还会关闭共用的 SMTP 连接、提前发出汇总邮件
+        self.run_lock = asyncio.Lock()
+        self.started_at = time.time()
+        self.next_run: datetime | None = None
+
+    async def run_accounts(self, emails: list[str] | None = None, force: bool = False,
+                           spread: bool = False) -> list[dict]:
+        """
+        对指定账号（默认全部）执行签到；每次重新读取账号列表，修改 accounts.json 无需重启。
+        spread=True（定时签到）时各账号等到自己的签到时段。已有签到在进行时排队等它结束
+        """
+        if self.run_lock.locked():
+            print("[Daemon] 已有签到正在进行，等待其结束")
+        async with self.run_lock:
+            return await self._run_accounts(emails, force, spread)
+
+    async def _run_accounts(self, emails: list[str] | None, force: bool, spread: bool) -> list[dict]:
+        accounts = load_accounts()
+        if emails:
+            accounts = [a for a in accounts if a.email in emails]
+        window = new_window() if spread else None
+        # 一次提交一份运行报告：各账号任务继承当前上下文中的报告，全部结束后统一写出
+        report = start_report()
+        start_profiler(report)
+        start = time.perf_counter()
+        records = await asyncio.gather(*(run_job(self.pool, self.slots, a, force, window) for a in accounts))
+        await finish_run()
+        for r in records:
+            report.set_result(r["email"], r["ok"], r["results"])
+        print_report(list(records), time.perf_counter() - start)
+        publish_report(report)
+        return list(records)
+
+    async def schedule_loop(self, times: list[tuple[int, int]]):
+        while not self.stopping.is_set():
+            self.next_run = next_run_time(times, datetime.now(ledger.tz))
+            print(f"[Daemon] 下次自动签到: {self.next_run:%Y-%m-%d %H:%M}")
+            delay = (self.next_run - datetime.now(ledger.tz)).total_seconds()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=max(0.0, delay))
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.run_accounts(spread=True)
+            except Exception as e:
+                # accounts.json 改坏等错误只影响这一次，调度继续
+                print(f"[Daemon] ❌ 自动签到失败: {e}")
+                import traceback
+                traceback.print_exc()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await reader.readline() or b"{}")
+            cmd = request.get("cmd")
+            if cmd == "checkin":
+                response = {"records": await self.run_accounts(request.get("accounts"), bool(request.get("force")))}
+            elif cmd == "status":
+                response = {
+                    "uptime": round(time.time() - self.started_at),
+                    "next_run": self.next_run.isoformat(timespec="minutes") if self.next_run else None,
+                    "running": self.run_lock.locked(),
+                    "pool": self.pool.status(),
+                }
+            elif cmd == "stop":
+                response = {"stopping": True}
+                self.stopping.set()
+            else:
+                response = {"error": f"未知命令: {cmd}"}
+        except Exception as e:
+            response = {"error": str(e)}
+        writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, port: int = DAEMON_PORT):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+        print(f"[Daemon] 监听 127.0.0.1:{port}")
+        times = parse_schedule(DAEMON_SCHEDULE)
+        scheduler = asyncio.create_task(self.schedule_loop(times)) if times else None
+        try:
+            await self.stopping.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if scheduler:
+                scheduler.cancel()
+            await self.pool.close()
+            await finish_run()
+            print("[Daemon] 已停止")
+
+
+def parse_schedule(spec: str) -> list[tuple[int, int]]:
+    """"08:00,20:30" → [(8, 0), (20, 30)]；"off" → []"""
+    times = []
+    if spec.strip().lower() in ("off", "none"):
+        return times
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        hour, _, minute = item.partition(":")
+        times.append((int(hour), int(minute or 0)))
+    return sorted(times)
+
+
+def next_run_time(times: list[tuple[int, int]], now: datetime) -> datetime:
+    for day in (0, 1):
+        for hour, minute in times:
+            at = (now + timedelta(days=day)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if at > now:
+                return at
+    raise ValueError("DAEMON_SCHEDULE 为空")
+
+
+def send_command(request: dict, port: int = DAEMON_PORT, timeout: float | None = None) -> dict:
+    """向守护进程发送一条命令并等待响应"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data or b"{}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CordCloud 常驻模式")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="启动守护进程")
+    checkin = sub.add_parser("checkin", help="提交签到任务并等待结果")
+    checkin.add_argument("--account", action="append", help="只签到指定账号（可重复），默认全部")
+    checkin.add_argument("--force", action="store_true", help="忽略签到台账")
+    sub.add_parser("status", help="查看守护进程状态")
+    sub.add_parser("stop", help="停止守护进程")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(Daemon().serve(args.port))
+        return
+
+    request = {"cmd": args.command}
+    if args.command == "checkin":
+        request.update(accounts=args.account, force=args.force)
+    try:
+        response = send_command(request, args.port)
+    except OSError as e:
+        print(f"[ERROR] 无法连接守护进程 127.0.0.1:{args.port}: {e}")
+        return
+    if "records" in response:
+        print_report(response["records"], sum(r["seconds"] for r in response["records"]))
+    else:
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
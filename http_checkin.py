@@ -0,0 +1,109 @@
+"""
+HTTP 快速签到
+浏览器流程结束后把会话（cookies + User-Agent）导出到 session.json；
+下次运行直接用标准库 HTTP 请求 POST /user/checkin，无需启动浏览器。
+会话被拒绝（跳转登录页 / 非 JSON 响应）时返回 "rejected"，由调用方回退到浏览器流程。
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+async def save_session(context, page, path: Path):
+    """从浏览器上下文导出 cookies 和 User-Agent（cf_clearance 等 cookie 与 UA 绑定）"""
+    try:
+        data = {
+            "user_agent": await page.evaluate("() => navigator.userAgent"),
+            "cookies": await context.cookies(),
+            "saved_at": time.time(),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    except Exception as e:
+        print(f"[HTTP] 会话导出失败: {e}")
+
+
+def load_session(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def cookie_header(cookies: list[dict], url: str) -> str:
+    """按 Playwright cookie 格式筛选适用于 url 的未过期 cookie，拼成 Cookie 请求头"""
+    parts = urlsplit(url)
+    host, path = parts.hostname or "", parts.path or "/"
+    now = time.time()
+    pairs = []
+    for c in cookies:
+        domain = c.get("domain", "").lstrip(".")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        if not path.startswith(c.get("path", "/")):
+            continue
+        expires = c.get("expires", -1)
+        if expires not in (-1, None) and expires < now:
+            continue
+        if c.get("secure") and parts.scheme != "https":
+            continue
+        pairs.append(f"{c['name']}={c['value']}")
+    return "; ".join(pairs)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """不跟随跳转：会话失效时站点会 302 到登录页"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def http_checkin(session: dict, checkin_url: str, referer: str, timeout: float = 15) -> tuple[str, str]:
+    """
+    直接请求签到接口。
+    返回 (status, message)，status 为 ok / already（今日已签到）/ rejected（会话无效）/ error
+    """
+    cookies = cookie_header(session.get("cookies", []), checkin_url)
+    if not cookies:
+        return "rejected", "没有可用的 cookie"
+
+    origin = "{0.scheme}://{0.netloc}".format(urlsplit(checkin_url))
+    req = urllib.request.Request(checkin_url, data=b"", method="POST", headers={
+        "Cookie": cookies,
+        "User-Agent": session.get("user_agent", "Mozilla/5.0"),
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "X-Requested-With": "XMLHttpRequest",
+        "Origin": origin,
+        "Referer": referer,
+    })
+    try:
+        with _opener.open(req, timeout=timeout) as resp:
+            body = resp.read().decode("utf-8", errors="replace")
+    except urllib.error.HTTPError as e:
+        if e.code in (301, 302, 303, 307, 308, 401, 403):
+            return "rejected", f"HTTP {e.code}"
+        return "error", f"HTTP {e.code}"
+    except (urllib.error.URLError, OSError) as e:
+        return "error", str(e)
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        # 返回了 HTML（登录页或验证页），说明会话不可用
+        return "rejected", "响应不是 JSON"
+
+    msg = str(data.get("msg", ""))
+    if data.get("ret") == 1:
+        return "ok", msg
+    if "签到过" in msg or "已签到" in msg:
+        return "already", msg
+    return "error", msg or json.dumps(data, ensure_ascii=False)
@@ -0,0 +1,94 @@
+"""
+签到台账
+按账号记录最近一次确认签到成功的日期（站点时区的自然日）。
+当天已有记录时直接退出，不启动浏览器；--force 跳过检查。
+Step 3 看到"已签到"时，把页面上的"上次签到时间"文本解析后写入台账。
+"""
+
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_LAST_TIME = re.compile(r"(\d{4})[-/年.](\d{1,2})[-/月.](\d{1,2})日?(?:\s*(\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+
+
+def site_timezone(name: str):
+    """站点时区；系统缺少时区数据库时退回 UTC+8"""
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        print(f"[Ledger] 无法加载时区 {name}，使用 UTC+8")
+        return timezone(timedelta(hours=8))
+
+
+def parse_last_checkin(text: str, tz) -> datetime | None:
+    """解析"上次签到时间：2026-10-17 08:00:00"一类文本（按站点时区解释）"""
+    match = _LAST_TIME.search(text or "")
+    if not match:
+        return None
+    year, month, day, hour, minute, second = (int(g) if g else 0 for g in match.groups())
+    try:
+        return datetime(year, month, day, hour, minute, second, tzinfo=tz)
+    except ValueError:
+        return None
+
+
+class CheckinLedger:
+    def __init__(self, path: Path, tz):
+        self.path = path
+        self.tz = tz
+
+    def today(self) -> str:
+        return datetime.now(self.tz).date().isoformat()
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def entry(self, account: str) -> dict | None:
+        return self._load().get(account)
+
+    def checked_today(self, account: str) -> bool:
+        entry = self.entry(account)
+        return bool(entry and entry.get("date") == self.today())
+
+    def record(self, account: str, when: datetime | None = None, source: str = ""):
+        """记录账号在 when（默认现在）所在的站点自然日已签到；不会用更早的日期覆盖较新的记录"""
+        when = (when or datetime.now(self.tz)).astimezone(self.tz)
+        data = self._load()
+        old = data.get(account)
+        if old and old.get("date", "") > when.date().isoformat():
+            return
+        data[account] = {"date": when.date().isoformat(), "at": when.isoformat(timespec="seconds"), "source": source}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Ledger] 台账保存失败: {e}")
+
+    def merge(self, path: Path):
+        """并入另一份台账文件（如分片子进程各自写的台账），同样不会用更早的日期覆盖较新的记录"""
+        try:
+            other = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for account, entry in other.items():
+            try:
+                when = datetime.fromisoformat(entry["at"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.record(account, when, source=entry.get("source", ""))
+
+    def import_last_text(self, account: str, text: str) -> datetime | None:
+        """导入页面上的"上次签到"文本，返回解析出的时间；解析失败返回 None"""
+        when = parse_last_checkin(text, self.tz)
+        if when is not None:
+            self.record(account, when, source="上次签到")
+        return when
@@ -1,612 +1,758 @@
 """
 CordCloud Auto Login + Daily Check-in
 使用 CloakBrowser (Playwright兼容) + POP3 邮箱验证码
+
+CloakBrowser、邮箱客户端（poplib / imaplib）、SMTP 与 HTTP 客户端只在用到时才导入：
+导入本模块只读取配置，只发通知、只收验证码或台账显示今日已签到直接退出时不加载浏览器。
 """
 
-import os
 import sys
-import re
 import time
-import poplib
-import smtplib
-import email
+import asyncio
+import argparse
+from dataclasses import dataclass
 
 # Windows 中文环境终端默认 GBK，无法输出 emoji，强制 UTF-8
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-from email.header import decode_header
-from email.utils import parsedate_to_datetime, formatdate
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
 from pathlib import Path
-from dotenv import load_dotenv
-
-# CloakBrowser 提供 Playwright 兼容 API
-from cloakbrowser import launch, launch_persistent_context
+from urllib.parse import urlsplit
+
+import session_cache
+from ledger import CheckinLedger, site_timezone
+from waits import wait_any, url_contains, visible, focused, button_with_text, click_for_json
+from background import BackgroundTasks
+from artifacts import ArtifactWriter
+from selector_cache import SelectorCache
+from resource_filter import ResourceFilter
+from response_cache import CacheStore, ResponseCache, page_cache
+from retry import Deadline, StageError, StageFailed, DEFAULT_STAGE_BUDGETS, parse_budgets
+from scheduler import RateLimiter, Window
+from timing import RunReport, start_report, set_account, step, timed
 
 # ── 配置 ────────────────────────────────────────────
-_env_loaded = load_dotenv()
-if not _env_loaded:
-    print("[Config] 未找到 .env 文件，使用系统环境变量")
-
-def _env(key: str, default: str = "") -> str:
-    """读取环境变量，空字符串视为未设置，返回默认值"""
-    val = os.getenv(key)
-    return val if val else default
-
-def _mask_code(code: str) -> str:
-    """脱敏验证码，仅保留首尾字符"""
-    if len(code) <= 2:
-        return "*" * len(code)
-    return code[0] + "*" * (len(code) - 2) + code[-1]
-
-CORDCLOUD_EMAIL = _env("CORDCLOUD_EMAIL")
-CORDCLOUD_PASSWORD = _env("CORDCLOUD_PASSWORD")
-
-# POP3 配置
-POP3_HOST = _env("POP3_HOST", "pop.example.com")
-POP3_PORT = int(_env("POP3_PORT", "995"))
-POP3_USE_SSL = _env("POP3_USE_SSL", "true").lower() == "true"
-POP3_USERNAME = _env("POP3_USERNAME", CORDCLOUD_EMAIL)
-POP3_PASSWORD = _env("POP3_PASSWORD")
-
-# SMTP 配置（发送签到结果通知）
-SMTP_HOST = _env("SMTP_HOST", "smtp.qq.com")
-SMTP_PORT = int(_env("SMTP_PORT", "465"))
-SMTP_USE_SSL = _env("SMTP_USE_SSL", "true").lower() == "true"
-SMTP_USERNAME = _env("SMTP_USERNAME", CORDCLOUD_EMAIL)
-SMTP_PASSWORD = _env("SMTP_PASSWORD")
-
-# 持久化配置
-USE_PERSISTENT = _env("USE_PERSISTENT_CONTEXT", "true").lower() == "true"
-PROFILE_DIR = Path(_env("PERSISTENT_PROFILE_DIR", "./cloak_profile"))
-HEADLESS = _env("HEADLESS", "false").lower() == "true"
-
-LOGIN_URL = "https://www.cordcloud.one/auth/login"
-USER_URL = "https://www.cordcloud.one/user"
-
-# 调试：保存每步 HTML
-DEBUG_HTML_DIR = Path("./debug_html")
-SAVE_HTML = _env("SAVE_HTML", "true").lower() == "true"
+from config import *  # noqa: F401,F403  全部配置名称，供 batch / daemon 等模块 from main import
+from config import _env
+
+
+@dataclass
+class Account:
+    """单个签到账号；POP3 凭据留空时使用全局 POP3 配置"""
+    email: str
+    password: str
+    pop3_username: str = ""
+    pop3_password: str = ""
+    tag: str = ""  # 调试文件名前缀，批量模式下用于区分账号
+
+
+ledger = CheckinLedger(PROFILE_DIR / "checkin_ledger.json", site_timezone(SITE_TIMEZONE))
+
+# 后台任务：结果邮件、关闭邮箱连接
+background = BackgroundTasks()
+# 调试文件后台写入
+artifacts = ArtifactWriter(
+    DEBUG_HTML_DIR, DEBUG_ARTIFACTS, max_files=DEBUG_KEEP_FILES,
+    max_age_days=DEBUG_KEEP_DAYS, max_bytes=int(DEBUG_KEEP_MB * 1024 * 1024),
+)
+# Step 2 / Step 3 各元素上次命中的选择器
+selector_cache = SelectorCache(PROFILE_DIR / "selector_cache.json")
+# 结果邮件：一次运行共用一个 SMTP 连接（第一次发送时创建）
+_notifier = None
+# 静态资源缓存：所有页面共用一个磁盘缓存
+response_store = CacheStore(RESPONSE_CACHE_DIR, int(RESPONSE_CACHE_MB * 1024 * 1024))
+# 资源采样（PROFILE_RESOURCES=true 时由 start_profiler 创建，publish_report 时停止）
+_profiler = None
+# 各可重试阶段的预算（STAGE_BUDGETS 覆盖默认值）
+stage_budgets = parse_budgets(STAGE_BUDGETS, DEFAULT_STAGE_BUDGETS)
+# 全局限流：本进程内所有账号、后台线程共用（分片子进程按子进程数分摊，见 scale_rate_limits）
+login_limit = RateLimiter("login", LOGIN_RATE_PER_MINUTE, RATE_BURST, SCHEDULE_SLOT_SECONDS)
+mailbox_limit = RateLimiter("mailbox", MAILBOX_RATE_PER_MINUTE, RATE_BURST, SCHEDULE_SLOT_SECONDS)
+smtp_limit = RateLimiter("smtp", SMTP_RATE_PER_MINUTE, RATE_BURST, SCHEDULE_SLOT_SECONDS)
+
+
+def get_notifier():
+    global _notifier
+    if _notifier is None:
+        from notifier import SmtpNotifier
+        _notifier = SmtpNotifier(SMTP_HOST, SMTP_PORT, SMTP_USE_SSL, SMTP_STARTTLS, SMTP_USERNAME, SMTP_PASSWORD,
+                                 rate_limit=smtp_limit)
+    return _notifier
+
+def new_resource_filter() -> ResourceFilter:
+    """每个页面一个拦截器，统计按账号、按次计入运行报告"""
+    return ResourceFilter(RESOURCE_BLOCKING, RESOURCE_BLOCK_TYPES, RESOURCE_BLOCK_URLS, RESOURCE_ALLOW_URLS,
+                          sizes_path=PROFILE_DIR / "resource_sizes.json")
+
+def new_response_cache() -> ResponseCache:
+    """每个页面一个缓存路由（共用 response_store），需在资源拦截之前安装"""
+    return ResponseCache(response_store, RESPONSE_CACHE, RESPONSE_CACHE_TYPES, RESPONSE_CACHE_FRESH_SECONDS)
+
+def new_deadline() -> Deadline:
+    """每次签到一个截止时间，从打开页面开始计算"""
+    return Deadline(RUN_DEADLINE_SECONDS, stage_budgets, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+
+def new_window(started_at: float | None = None) -> Window:
+    """本次运行的签到时段窗口，默认从现在开始"""
+    return Window(CHECKIN_WINDOW_MINUTES, CHECKIN_JITTER_SEED, SCHEDULE_SLOT_SECONDS, started_at)
+
+def scale_rate_limits(share: float):
+    """只使用限流额度的 share 份（分片模式下各子进程平分）"""
+    for limiter in (login_limit, mailbox_limit, smtp_limit):
+        limiter.scale(share)
+
 
 # ── 调试工具 ─────────────────────────────────────
 
-def save_page_state(page, step_name: str) -> str | None:
-    """保存当前页面的 HTML 和截图，用于分析页面结构。返回截图路径。"""
-    if not SAVE_HTML:
-        return None
-    DEBUG_HTML_DIR.mkdir(parents=True, exist_ok=True)
-    timestamp = time.strftime("%H%M%S")
-    html_path = DEBUG_HTML_DIR / f"{timestamp}_{step_name}.html"
-    png_path = DEBUG_HTML_DIR / f"{timestamp}_{step_name}.png"
-    try:
-        html_path.write_text(page.content(), encoding="utf-8")
-        print(f"[DEBUG] HTML 已保存: {html_path}")
-    except Exception as e:
-        print(f"[DEBUG] HTML 保存失败: {e}")
-    try:
-        page.screenshot(path=str(png_path), full_page=False)
-        print(f"[DEBUG] 截图已保存: {png_path}")
-        return str(png_path)
-    except Exception as e:
-        print(f"[DEBUG] 截图保存失败: {e}")
-        return None
+async def save_page_state(page, step_name: str, failed: bool = False, for_email: bool = False) -> str | None:
+    """
+    按 DEBUG_ARTIFACTS 级别保存当前页面的 HTML / 截图，写盘在后台进行。
+    for_email=True 时（且配置了 SMTP）总是截图并返回路径，用作结果邮件附件
+    """
+    screenshot_path = None
+    if for_email and SMTP_PASSWORD:
+        screenshot_path = DEBUG_HTML_DIR / f"{time.strftime('%H%M%S')}_{step_name}.jpg"
+    return await artifacts.capture(page, step_name, failed=failed, screenshot_path=screenshot_path,
+                                   screenshot_quality=SCREENSHOT_QUALITY)
 
 
 # ── SMTP 发送工具 ─────────────────────────────────────
 
-def send_result_email(subject: str, body: str, image_path: str | None = None):
-    """通过 SMTP 发送签到结果邮件（自己发给自己），可选附带截图"""
+def send_result_email(subject: str, body: str, image_path: str | None = None, to_addr: str | None = None):
+    """通过共享的 SMTP 连接发送签到结果邮件（默认自己发给自己），可选附带截图"""
     if not SMTP_PASSWORD:
         print("[SMTP] 未配置 SMTP_PASSWORD，跳过邮件发送")
         return
+    to_addr = to_addr or CORDCLOUD_EMAIL
 
-    try:
-        if image_path:
-            msg = MIMEMultipart("related")
-            msg["From"] = SMTP_USERNAME
-            msg["To"] = CORDCLOUD_EMAIL
-            msg["Subject"] = subject
-            msg["Date"] = formatdate(localtime=True)
-
-            # 文本部分
-            text_part = MIMEText(body, "plain", "utf-8")
-            msg.attach(text_part)
-
-            # 图片附件
-            with open(image_path, "rb") as f:
-                img = MIMEImage(f.read(), _subtype="png")
-                img.add_header("Content-Disposition", "attachment", filename=Path(image_path).name)
-                msg.attach(img)
-        else:
-            msg = MIMEText(body, "plain", "utf-8")
-            msg["From"] = SMTP_USERNAME
-            msg["To"] = CORDCLOUD_EMAIL
-            msg["Subject"] = subject
-            msg["Date"] = formatdate(localtime=True)
-
-        if SMTP_USE_SSL:
-            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=15)
-        else:
-            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=15)
-            server.starttls()
-
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.sendmail(SMTP_USERNAME, [CORDCLOUD_EMAIL], msg.as_string())
-        server.quit()
-        print(f"[SMTP] ✅ 结果邮件已发送至 {CORDCLOUD_EMAIL}")
-    except Exception as e:
-        print(f"[SMTP] ❌ 邮件发送失败: {e}")
+    with step("smtp_send") as s:
+        try:
+            get_notifier().send(to_addr, subject, body, [image_path] if image_path else [])
+            print(f"[SMTP] ✅ 结果邮件已发送至 {to_addr}")
+        except Exception as e:
+            s.outcome = "error"
+            s.detail = str(e)
+            print(f"[SMTP] ❌ 邮件发送失败: {e}")
 
 
 # ── POP3 邮箱工具 ─────────────────────────────────────
 
-def decode_mime_header(header_value):
-    """解码 MIME 编码的邮件头"""
-    if header_value is None:
-        return ""
-    parts = decode_header(header_value)
-    result = []
-    for part, charset in parts:
-        if isinstance(part, bytes):
-            result.append(part.decode(charset or "utf-8", errors="replace"))
-        else:
-            result.append(str(part))
-    return "".join(result)
+def create_code_source(account: Account | None = None):
+    """按 CODE_SOURCE 创建验证码来源（CodeSource）；账号未单独配置邮箱凭据时使用全局配置"""
+    from code_source import Pop3CodeSource, ImapIdleCodeSource
+    from code_extractor import extract_code_from_email
+    from pop3_poller import Pop3Poller
+
+    username = (account and account.pop3_username) or None
+    password = (account and account.pop3_password) or None
+    if CODE_SOURCE == "imap":
+        return ImapIdleCodeSource(
+            IMAP_HOST, IMAP_PORT, username or IMAP_USERNAME, password or IMAP_PASSWORD,
+            extract_code_from_email, use_ssl=IMAP_USE_SSL, folder=IMAP_FOLDER, from_filter=POP3_FROM_FILTER,
+            subject_filter=POP3_SUBJECT_FILTER, rate_limit=mailbox_limit,
+        )
+    poller = Pop3Poller(
+        POP3_HOST, POP3_PORT, username or POP3_USERNAME, password or POP3_PASSWORD,
+        use_ssl=POP3_USE_SSL, from_filter=POP3_FROM_FILTER, keep_session=POP3_KEEP_SESSION,
+        subject_filter=POP3_SUBJECT_FILTER, rate_limit=mailbox_limit,
+    )
+    return Pop3CodeSource(poller, extract_code_from_email, poll_interval=POP3_POLL_INTERVAL)
 
 
-def fetch_latest_verification_code(timeout_seconds=60, poll_interval=3, since_time=None):
+def fetch_latest_verification_code(timeout_seconds=60, poll_interval=3, since_time=None,
+                                   username=None, password=None):
     """
     通过 POP3 收取最新邮件中的验证码。
     since_time: Unix 时间戳，只接受该时间之后的邮件（防止读取历史验证码）
+    username/password: POP3 凭据，默认使用全局 POP3_USERNAME/POP3_PASSWORD
     返回 (code: str | None, error: str | None)
     """
-    deadline = time.time() + timeout_seconds
-    last_check_count = None
+    from code_source import Pop3CodeSource
+    from code_extractor import extract_code_from_email
+    from pop3_poller import Pop3Poller
+
+    poller = Pop3Poller(
+        POP3_HOST, POP3_PORT, username or POP3_USERNAME, password or POP3_PASSWORD,
+        use_ssl=POP3_USE_SSL, from_filter=POP3_FROM_FILTER, keep_session=POP3_KEEP_SESSION,
+        subject_filter=POP3_SUBJECT_FILTER, rate_limit=mailbox_limit,
+    )
+    source = Pop3CodeSource(poller, extract_code_from_email, poll_interval=poll_interval)
+    try:
+        return source.wait_for_code(since_time, timeout_seconds)
+    finally:
+        source.close()
 
-    while time.time() < deadline:
-        try:
-            if POP3_USE_SSL:
-                conn = poplib.POP3_SSL(POP3_HOST, POP3_PORT, timeout=10)
-            else:
-                conn = poplib.POP3(POP3_HOST, POP3_PORT, timeout=10)
 
-            conn.user(POP3_USERNAME)
-            conn.pass_(POP3_PASSWORD)
+# ── HTTP 快速签到 ─────────────────────────────────────
+
+def account_session_path(account: Account) -> Path:
+    """账号导出的会话文件（cookies + UA），批量模式下按账号分目录"""
+    if account.tag:
+        return PROFILE_DIR / account.tag / "session.json"
+    return PROFILE_DIR / "session.json"
+
 
-            msg_count, _ = conn.stat()
-            print(f"[POP3] 邮箱共 {msg_count} 封邮件")
+def account_cache_path(account: Account) -> Path:
+    """账号的会话有效性缓存，与 session.json 放在同一目录"""
+    return account_session_path(account).with_name("session_cache.json")
 
-            if msg_count == 0:
-                conn.quit()
-                time.sleep(poll_interval)
-                continue
 
-            # 增量检测：无新邮件则等待
-            if last_check_count is not None and msg_count == last_check_count:
-                conn.quit()
-                time.sleep(poll_interval)
-                continue
+async def try_http_checkin(account: Account, results: list[str]) -> bool:
+    """
+    使用上次导出的会话直接请求签到接口。
+    成功签到或今日已签到返回 True；会话无效或请求失败返回 False，由调用方回退到浏览器流程
+    """
+    from http_checkin import load_session, http_checkin
+
+    session = load_session(account_session_path(account))
+    if session is None:
+        print("[HTTP] 没有已保存的会话，使用浏览器流程")
+        return False
+
+    with step("http_checkin") as s:
+        status, msg = await asyncio.to_thread(http_checkin, session, CHECKIN_URL, USER_URL)
+        s.outcome = status
+    if status in ("ok", "already"):
+        ledger.record(account.email, source=f"HTTP {status}")
+    if status == "ok":
+        print(f"[HTTP] ✅ 签到成功: {msg}")
+        results.append(f"[HTTP] 签到完成: {msg}")
+        return True
+    if status == "already":
+        print(f"[HTTP] 今日已签到: {msg}")
+        results.append(f"[HTTP] 今日已签到: {msg}")
+        return True
+    if status == "rejected":
+        print(f"[HTTP] ⚠️ 会话已失效 ({msg})，回退到浏览器流程")
+    else:
+        print(f"[HTTP] ⚠️ 签到请求失败 ({msg})，回退到浏览器流程")
+    return False
+
 
-            last_check_count = msg_count
+# ── CloakBrowser 主流程 ─────────────────────────────
 
-            # 取最后一封
-            resp, lines, octets = conn.retr(msg_count)
-            raw_email = b"\r\n".join(lines)
-            conn.quit()
+async def check_login(page, results: list[str], snap, deadline: Deadline, fresh: bool = False) -> bool:
+    """
+    Step 1: 访问 /user，仍停留在 /user 说明已有有效会话。
+    同时等待签到按钮渲染，登录有效时 Step 3 直接使用这次打开的页面，不再重复加载 /user。
+    fresh=True（会话缓存新鲜）时不等待 networkidle、不保存探测快照，页面可用即进入签到
+    """
+    if fresh:
+        print("\n[Step 1] 会话缓存有效，直接打开用户页...")
+    else:
+        print("\n[Step 1] 检查登录状态...")
 
-            msg = email.message_from_bytes(raw_email)
-            subject = decode_mime_header(msg["Subject"] or "")
-            sender = decode_mime_header(msg["From"] or "")
-            date = msg.get("Date", "")
+    async def open_user_page(timeout_ms: int):
+        with step("check_login") as s:
+            await page.goto(USER_URL, wait_until="domcontentloaded" if fresh else "networkidle", timeout=timeout_ms)
+            s.outcome = await wait_any(page, [
+                ("签到按钮", button_with_text("签到", "checkin", "Checkin")),
+                ("#checkin", visible("#checkin")),
+                ("登录页", url_contains("/auth/login")),
+            ], 5000, "Step 1") or "timeout"
+
+    await deadline.run("check_login", open_user_page)
+    if not fresh:
+        await snap("step1_check_login")
+
+    # 如果跳转到 /user 则已登录
+    current_url = page.url
+    if "/user" in current_url or "/user/" in current_url:
+        print("[Step 1] ✅ 已有有效会话，跳过登录")
+        results.append("[Step 1] 已有有效会话，跳过登录")
+        return True
+    return False
+
+
+async def login(page, account: Account, results: list[str], snap, deadline: Deadline) -> bool:
+    """Step 2: 填写表单登录，需要时通过邮箱验证码完成 2FA。登录失败返回 False"""
+    from code_extractor import mask_code
+
+    print("\n[Step 2] 开始登录...")
+    # 登录限流：等待时间不计入本次签到的截止时间
+    deadline.extend(await login_limit.wait())
+    # 登录页加载期间预热邮箱连接（登录 + 建立索引 / 进入 IMAP 会话）
+    source = create_code_source(account)
+    prewarm = asyncio.create_task(asyncio.to_thread(timed, "mailbox_prewarm", source.open))
+    try:
+        async def open_login_page(timeout_ms: int):
+            # altcha_ready：从打开登录页到 ALtcha 验证完成，按是否用到了本地缓存的脚本 / 样式记为 _cached / _uncached
+            cache = page_cache(page)
+            served_before = cache.served() if cache else 0
+            with step("altcha_ready") as ready:
+                try:
+                    await load_login_page(timeout_ms)
+                finally:
+                    used = cache is not None and cache.served() > served_before
+                    ready.name = "altcha_ready_cached" if used else "altcha_ready_uncached"
 
-            print(f"[POP3] 最新邮件: 发件人={sender}, 主题={subject}, 时间={date}")
+        async def load_login_page(timeout_ms: int):
+            with step("login_page"):
+                await page.goto(LOGIN_URL, wait_until="networkidle", timeout=timeout_ms)
 
-            # 时间过滤：跳过登录触发前收到的邮件，防止读取历史验证码
-            if since_time is not None and date:
+            # 等待 ALtcha 验证码自动验证完成（auto="onload"）；超时则重新打开登录页，换一道题
+            print("[Step 2] 等待 ALtcha 验证码...")
+            with step("altcha") as s:
                 try:
-                    email_dt = parsedate_to_datetime(date)
-                    if email_dt.timestamp() < since_time:
-                        print(f"[POP3] ⏭ 邮件时间早于登录触发时间，等待新邮件...")
-                        time.sleep(poll_interval)
-                        continue
+                    await page.wait_for_function(
+                        """() => {
+                            const altcha = document.querySelector('.altcha');
+                            return altcha && altcha.getAttribute('data-state') === 'verified';
+                        }""",
+                        timeout=timeout_ms
+                    )
+                    print("[Step 2] ✅ ALtcha 验证完成")
                 except Exception:
-                    pass  # 日期解析失败不阻塞
-
-            # 提取正文（优先纯文本，避免 HTML 噪声干扰）
-            text_parts = []
-            html_parts = []
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    if content_type not in ("text/plain", "text/html"):
-                        continue
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        charset = part.get_content_charset() or "utf-8"
-                        decoded = payload.decode(charset, errors="replace")
-                        if content_type == "text/plain":
-                            text_parts.append(decoded)
-                        else:
-                            html_parts.append(decoded)
+                    s.outcome = "timeout"
+            if s.outcome == "timeout":
+                raise StageError("ALtcha 验证超时")
+
+        await deadline.run("login_page", open_login_page)
+
+        await snap("step2_login_page")
+
+        # 等待表单就绪，避免页面 JS 尚未初始化完成导致 fill 竞态
+        email_input = page.locator("#email")
+        passwd_input = page.locator("#passwd")
+        await email_input.wait_for(state="visible", timeout=10000)
+        await passwd_input.wait_for(state="visible", timeout=10000)
+
+        # 先点击聚焦，确保页面 JS 的 autofocus/select-all 已完成
+        # force=True 绕过 pointer-events 检查（输入框中心可能被 <I> 图标覆盖）
+        await email_input.click(force=True)
+        await wait_any(page, [("聚焦", focused("#email"))], 500, "Step 2")
+        await email_input.fill(account.email, force=True)
+
+        await passwd_input.click(force=True)
+        await wait_any(page, [("聚焦", focused("#passwd"))], 500, "Step 2")
+        await passwd_input.fill(account.password, force=True)
+
+        # 验证填入的值是否正确（防止全选/清空导致填入失败）
+        filled_email = await email_input.input_value()
+        if filled_email != account.email:
+            print(f"[Step 2] ⚠️ 邮箱填入不匹配 (期望={account.email}, 实际={filled_email})，重试...")
+            await email_input.click(force=True)
+            await wait_any(page, [("聚焦", focused("#email"))], 300, "Step 2")
+            await email_input.fill(account.email, force=True)
+            filled_email = await email_input.input_value()
+            if filled_email != account.email:
+                print(f"[Step 2] ❌ 邮箱重试仍失败: {filled_email}")
             else:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    charset = msg.get_content_charset() or "utf-8"
-                    text_parts.append(payload.decode(charset, errors="replace"))
-
-            # 纯文本优先（噪声少），再拼接 HTML
-            plain_body = "\n".join(text_parts)
-            full_body = plain_body + "\n" + "\n".join(html_parts)
-
-            # 从正文中提取验证码
-            # 策略：优先匹配数字验证码（站点要求6位数字），字母数字作为兜底
-            digit_patterns = [
-                # 紧邻 "验证码" 的 6 位数字（最精确）
-                (r"验证码[：:\s]*(?:是|为)?[：:\s]*(\d{6})", "6位数字紧邻验证码"),
-                # "code:" 后 6 位数字
-                (r"(?:code|Code|CODE)[：:\s]*(\d{6})", "6位数字紧邻code"),
-                # 正文中任意 6 位数字（大概率是验证码）
-                (r"(?<!\d)(\d{6})(?!\d)", "独立6位数字"),
-            ]
-            alphanum_patterns = [
-                # "验证码" 后 4-8 位字母数字（兜底）
-                (r"验证码[：:\s]*(?:是|为)?[：:\s]*([A-Za-z0-9]{4,8})", "4-8位字母数字紧邻验证码"),
-                # "code:" 后 4-8 位字母数字
-                (r"(?:code|Code|CODE)[：:\s]*([A-Za-z0-9]{4,8})", "4-8位字母数字紧邻code"),
-            ]
-
-            def try_extract(body: str, label: str) -> str | None:
-                """在给定文本中尝试提取验证码，优先数字模式"""
-                for pattern, desc in digit_patterns + alphanum_patterns:
-                    match = re.search(pattern, body)
-                    if match:
-                        code = match.group(1)
-                        # 打印匹配上下文便于调试
-                        start = max(0, match.start() - 20)
-                        end = min(len(body), match.end() + 20)
-                        ctx = body[start:end].replace("\n", " ")
-                        print(f"[POP3] ✅ [{label}] {desc}: {_mask_code(code)} (上下文: ...{ctx}...)")
-                        return code
-                return None
-
-            # 先搜纯文本，再搜全文
-            code = try_extract(plain_body, "纯文本")
-            if code is None:
-                code = try_extract(full_body, "全文")
-            if code is not None:
-                return code, None
-
-            # 降级：打印正文前 500 字符供人工判断
-            print(f"[POP3] ⚠️ 未能自动提取验证码，纯文本前500字符:")
-            print(plain_body[:500])
-            if html_parts:
-                print(f"[POP3] HTML 前300字符:")
-                print(html_parts[0][:300])
+                print(f"[Step 2] ✅ 邮箱重试成功")
 
-        except Exception as e:
-            print(f"[POP3] 连接错误: {e}")
-            time.sleep(poll_interval)
-            continue
+        print(f"[Step 2] 已填写: {account.email}")
+        results.append(f"[Step 2] 填写登录表单: {account.email}")
 
-        time.sleep(poll_interval)
+        # 点击登录按钮（触发 AJAX login() 函数），直接读取 AJAX 返回：
+        #   ret==1 → 弹窗 → 500ms后 location.href='/user'
+        #   ret==2 → 弹窗 → 500ms后 location.href='/auth/login/2fa?token=...'
+        #   其他   → 弹窗显示错误，留在当前页
+        # 邮箱预热须在点击前完成：之后到达的邮件才会被当作新邮件
+        try:
+            await prewarm
+        except Exception as e:
+            print(f"[Step 2] ⚠️ 邮箱预热失败，收取时重连: {e}")
+        login_click_time = time.time()
+        redirects = [("登录成功→/user", url_contains("/user")), ("二步验证→/2fa", url_contains("/2fa"))]
+        with step("login_submit") as s:
+            print(f"[Step 2] 点击登录 (触发时间: {time.strftime('%H:%M:%S', time.localtime(login_click_time))})，等待 AJAX 响应...")
+            login_ret = await click_for_json(page, lambda: page.click("#login"), urlsplit(LOGIN_URL).path, 25000, "Step 2")
+            if login_ret is not None:
+                ret = str(login_ret.get("ret"))  # 页面 JS 用 == 比较，兼容字符串
+                if ret == "2":
+                    # 不等待页面跳转，立即开始收取验证码；跳转在此期间完成
+                    outcome = "二步验证→/2fa"
+                elif ret == "1":
+                    outcome = await wait_any(page, redirects[:1], 5000, "Step 2") or "登录成功→/user"
+                else:
+                    outcome = "错误"
+            else:
+                # 没有拿到 JSON（接口变化等）：退回从页面变化判断，响应等待已用去大部分时间
+                # 同时等待：跳转到 /user（登录成功）、跳转到 /2fa（需要二步验证）、#msg 弹窗
+                outcome = await wait_any(page, redirects + [("弹窗", visible("#msg", with_text=True))], 5000, "Step 2")
+                if outcome == "弹窗":
+                    # 成功和 2FA 也会先弹窗、500ms 后才跳转，再短暂等待跳转以区分错误提示
+                    outcome = await wait_any(page, redirects, 2000, "Step 2") or outcome
+            s.outcome = outcome or "timeout"
+
+        if outcome == "错误":
+            error_msg = str(login_ret.get("msg") or f"ret={login_ret.get('ret')}")
+            print(f"[Step 2] ❌ 登录错误: {error_msg}")
+            results.append(f"[Step 2] 登录错误: {error_msg}")
+            await snap("step3_after_login_click", failed=True)
+            return False
 
-    return None, f"超时 {timeout_seconds}s 未获取到验证码"
+        current_url = page.url
+        print(f"[Step 2] 当前 URL: {current_url}")
+        await snap("step3_after_login_click")
+
+        # ── 检测 2FA ──
+        in_2fa = outcome == "二步验证→/2fa" or "/2fa" in current_url
+
+        if in_2fa:
+            print(f"[Step 2] 🔐 检测到 2FA 页面")
+            await snap("step3_2fa_page")
+            print(f"[Step 2] 正在从邮箱 ({CODE_SOURCE}) 收取验证码...")
+
+            async def wait_code(timeout_ms: int) -> str:
+                with step("code_wait") as s:
+                    s.detail = source.name
+                    code, error = await asyncio.to_thread(source.wait_for_code, login_click_time, timeout_ms / 1000)
+                    if error or not code:
+                        s.outcome = "failed"
+                if error or not code:
+                    print(f"[Step 2] ⚠️ {error or '未获取到验证码'}")
+                    # 下次尝试重新连接邮箱；起始时间不变，迟到的验证码邮件仍会被接受
+                    await asyncio.to_thread(source.close)
+                    raise StageError(error or "未获取到验证码")
+                return code
 
+            code = await deadline.run("code_wait", wait_code)
 
-# ── CloakBrowser 主流程 ─────────────────────────────
+            # 登录响应后立即开始收取验证码，此时页面可能还没跳转到 2FA 页
+            if "/2fa" not in page.url:
+                await wait_any(page, [("2FA 页面", url_contains("/2fa"))], 5000, "Step 2")
 
-def main():
-    print("=" * 60)
-    print("CordCloud Auto Login + Daily Check-in")
-    print(f"CloakBrowser + POP3 ({POP3_HOST}:{POP3_PORT})")
-    print("=" * 60)
+            # 填写验证码：候选选择器一次检查（页面结构可能变化）
+            code_input = await selector_cache.find(page, "2fa_code", ["#code", "input[name='code']", "input[type='text']"])
+            if code_input:
+                try:
+                    await code_input.locator.fill(code, force=True)
+                    print(f"[Step 2] 已填写验证码 (selector={code_input.selector}): {mask_code(code)}")
+                except Exception as e:
+                    print(f"[Step 2] ⚠️ 验证码填写失败: {e}")
+            else:
+                print(f"[Step 2] ⚠️ 未找到验证码输入框，尝试继续...")
+
+            # 提交 2FA，直接读取 AJAX 返回（ret==1 成功，500ms 后跳转 /user；其他为错误）
+            verify_btn = await selector_cache.find(
+                page, "2fa_verify",
+                ["#btn-verify", "button:has-text('验证')", "button:has-text('确认')", "button[type='submit']"],
+            )
+            if not verify_btn:
+                print("[Step 2] ⚠️ 未找到验证按钮，尝试继续...")
+            to_user = [("跳转→/user", url_contains("/user"))]
+            with step("2fa_verify") as s:
+                verify_ret = None
+                if verify_btn:
+                    print(f"[Step 2] 点击验证按钮 (selector={verify_btn.selector})，等待响应...")
+                    verify_ret = await click_for_json(page, verify_btn.locator.click, urlsplit(page.url).path, 10000, "Step 2")
+                if verify_ret is not None and str(verify_ret.get("ret")) != "1":
+                    verify_outcome = "错误"
+                elif verify_ret is not None:
+                    verify_outcome = await wait_any(page, to_user, 5000, "Step 2")
+                    if verify_outcome is None:
+                        # 服务器已确认 ret==1，只是页面没有按时跳转：直接打开 /user
+                        print("[Step 2] 2FA 已通过但页面未跳转，直接打开 /user")
+                        try:
+                            await page.goto(USER_URL, wait_until="domcontentloaded", timeout=15000)
+                            verify_outcome = "跳转→/user"
+                        except Exception as e:
+                            print(f"[Step 2] ⚠️ 打开 /user 失败: {e}")
+                else:
+                    # 等待结果：成功则跳转到 /user，失败则弹窗 #msg
+                    verify_outcome = await wait_any(page, to_user + [("弹窗", visible("#msg", with_text=True))], 5000, "Step 2")
+                    if verify_outcome == "弹窗":
+                        verify_outcome = await wait_any(page, to_user, 2000, "Step 2") or verify_outcome
+                s.outcome = verify_outcome or "timeout"
+            if verify_outcome == "错误":
+                error_text = str(verify_ret.get("msg") or f"ret={verify_ret.get('ret')}")
+                print(f"[Step 2] ❌ 2FA 验证失败: {error_text}")
+                results.append(f"[Step 2] 2FA 验证失败: {error_text}")
+                return False
+            if verify_outcome == "跳转→/user":
+                print("[Step 2] ✅ 2FA 验证成功，已跳转到用户页面")
+                results.append("[Step 2] 2FA 验证成功")
+                # 验证码填进去了、按钮也点对了：记住这两个选择器
+                selector_cache.confirm(code_input)
+                selector_cache.confirm(verify_btn)
+            else:
+                # 未跳转，检查 #msg 弹窗错误信息
+                try:
+                    msg_el = page.locator("#msg")
+                    if await msg_el.is_visible():
+                        error_text = ((await msg_el.text_content()) or "").strip()
+                        print(f"[Step 2] ❌ 2FA 验证失败: {error_text}")
+                        results.append(f"[Step 2] 2FA 验证失败: {error_text}")
+                        return False
+                except Exception:
+                    pass
+                print("[Step 2] ⚠️ 2FA 提交后未跳转，状态未知")
 
-    # 校验配置
-    if not CORDCLOUD_EMAIL or not CORDCLOUD_PASSWORD:
-        print("[ERROR] 请先配置 .env 文件中的 CORDCLOUD_EMAIL 和 CORDCLOUD_PASSWORD")
-        return
+            await snap("step4_after_2fa")
+        else:
+            # 不在 2FA 页面 → 检查是否有错误弹窗（登录失败）
+            try:
+                msg_el = page.locator("#msg")
+                if outcome != "登录成功→/user" and await msg_el.is_visible():
+                    error_msg = ((await msg_el.text_content()) or "").strip()
+                    if error_msg:
+                        print(f"[Step 2] ❌ 登录错误: {error_msg}")
+                        results.append(f"[Step 2] 登录错误: {error_msg}")
+                        return False
+            except Exception:
+                pass
 
-    # 启动 CloakBrowser（Playwright 兼容）
-    print("\n[Browser] 启动 CloakBrowser...")
-    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            # 也不在 /user → 可能登录异常
+            print(f"[Step 2] ⚠️ 登录后未跳转，当前: {current_url}")
+            results.append(f"[Step 2] 登录后未跳转到 /user，当前: {current_url}")
 
-    if USE_PERSISTENT:
-        context = launch_persistent_context(
-            PROFILE_DIR,
-            headless=HEADLESS,
-            viewport={"width": 1280, "height": 800},
-            humanize=True,
-        )
-        # launch_persistent_context returns BrowserContext (Playwright-compatible)
-        page = context.new_page()
-        real_browser = None  # persistent context manages its own browser
-    else:
-        real_browser = launch(headless=HEADLESS, humanize=True)
-        context = real_browser.new_context(viewport={"width": 1280, "height": 800})
-        page = context.new_page()
+        current_url = page.url
 
-    results = []  # 收集各步骤结果用于邮件汇总
-    checkin_screenshot = None  # 签到页面截图路径
+        if "/user" in current_url or "/user/" in current_url:
+            print("[Step 2] ✅ 登录成功！")
+            results.append("[Step 2] 登录成功")
+        elif "/2fa" not in current_url:
+            print(f"[Step 2] ⚠️ 登录后 URL: {current_url}，继续尝试...")
+            results.append(f"[Step 2] 登录后未跳转到 /user，当前: {current_url}")
+        return True
+    finally:
+        # 预热可能仍在进行，等它结束后在后台关闭连接
+        def close_source(task: asyncio.Task):
+            if not task.cancelled():
+                task.exception()  # 预热失败已在上面处理或无需处理，避免未读取异常的警告
+            background.spawn(source.close)
+        prewarm.add_done_callback(close_source)
 
-    try:
-        # ── Step 1: 检查是否已登录 ──
-        print("\n[Step 1] 检查登录状态...")
-        page.goto(USER_URL, wait_until="networkidle", timeout=30000)
-        page.wait_for_timeout(1000)
-        save_page_state(page, "step1_check_login")
 
-        # 如果跳转到 /user 则已登录
-        current_url = page.url
-        if "/user" in current_url or "/user/" in current_url:
-            print("[Step 1] ✅ 已有有效会话，跳过登录")
-            results.append("[Step 1] 已有有效会话，跳过登录")
+async def daily_checkin(page, account: Account, results: list[str], snap, deadline: Deadline,
+                        navigate: bool = True) -> str | None:
+    """
+    Step 3: 在用户页面点击每日签到，返回签到后的截图路径。
+    navigate=False 表示 Step 1 已打开 /user 并等到签到按钮，直接在当前页面操作
+    """
+    print("\n[Step 3] 查找每日签到...")
+    async def open_user_page(timeout_ms: int):
+        with step("user_page") as s:
+            await page.goto(USER_URL, wait_until="networkidle", timeout=timeout_ms)
+            # 等待用户页面 JS 渲染出签到按钮
+            s.outcome = await wait_any(page, [
+                ("签到按钮", button_with_text("签到", "checkin", "Checkin")),
+                ("#checkin", visible("#checkin")),
+            ], 5000, "Step 3") or "timeout"
+
+    if navigate:
+        await deadline.run("user_page", open_user_page)
+    await snap("step5_user_checkin")
+
+    # 签到按钮：候选选择器一次检查，并过滤掉文字不相关的按钮（如页面导航中的）
+    checkin_btn = await selector_cache.find(page, "checkin_button", [
+        "#checkin-btn button",       # 旧结构：容器内按钮
+        "#checkin",                  # 直接 ID
+        "button:has-text('签到')",    # 文字匹配
+        "button:has-text('每日签到')", # 备选文字
+    ], keywords=("签到", "checkin", "Checkin"))
+    if checkin_btn:
+        print(f"[Step 3] 找到签到按钮 (selector={checkin_btn.selector}): '{checkin_btn.text}'")
+
+    if checkin_btn is None:
+        print("[Step 3] ⚠️ 未找到签到按钮，页面结构可能有变")
+        results.append("[Step 3] 未找到签到按钮")
+        await snap("step5_no_checkin_button", failed=True)
+    else:
+        btn_text = checkin_btn.text
+        if checkin_btn.disabled or "已签到" in btn_text:
+            selector_cache.confirm(checkin_btn)
+            # 提取上次签到时间
+            last_el = await selector_cache.find(
+                page, "last_checkin", ["p:has-text('上次')", "span:has-text('上次')", "*:has-text('上次')"], max_len=200,
+            )
+            last_time_text = last_el.text if last_el else ""
+            # 按钮显示已签到说明站点认为今天已签到；能解析出上次签到时间时以页面为准
+            if last_time_text and ledger.import_last_text(account.email, last_time_text):
+                selector_cache.confirm(last_el)
+            else:
+                ledger.record(account.email, source="已签到")
+            if last_time_text:
+                print(f"[Step 3] 今日已签到，{last_time_text}")
+                results.append(f"[Step 3] 今日已签到，{last_time_text}")
+            else:
+                print(f"[Step 3] 今日已签到")
+                results.append("[Step 3] 今日已签到")
         else:
-            # ── Step 2: 登录 ──
-            print("\n[Step 2] 开始登录...")
-            page.goto(LOGIN_URL, wait_until="networkidle", timeout=30000)
-
-            # 等待 ALtcha 验证码自动验证完成（auto="onload"）
-            print("[Step 2] 等待 ALtcha 验证码...")
-            try:
-                page.wait_for_function(
-                    """() => {
-                        const altcha = document.querySelector('.altcha');
-                        return altcha && altcha.getAttribute('data-state') === 'verified';
-                    }""",
-                    timeout=30000
-                )
-                print("[Step 2] ✅ ALtcha 验证完成")
-            except Exception:
-                print("[Step 2] ⚠️ ALtcha 等待超时，尝试继续...")
-
-            save_page_state(page, "step2_login_page")
-
-            # 等待表单就绪，避免页面 JS 尚未初始化完成导致 fill 竞态
-            email_input = page.locator("#email")
-            passwd_input = page.locator("#passwd")
-            email_input.wait_for(state="visible", timeout=10000)
-            passwd_input.wait_for(state="visible", timeout=10000)
-
-            # 先点击聚焦，确保页面 JS 的 autofocus/select-all 已完成
-            # force=True 绕过 pointer-events 检查（输入框中心可能被 <I> 图标覆盖）
-            email_input.click(force=True)
-            page.wait_for_timeout(500)
-            email_input.fill(CORDCLOUD_EMAIL, force=True)
-
-            passwd_input.click(force=True)
-            page.wait_for_timeout(500)
-            passwd_input.fill(CORDCLOUD_PASSWORD, force=True)
-
-            # 验证填入的值是否正确（防止全选/清空导致填入失败）
-            filled_email = email_input.input_value()
-            if filled_email != CORDCLOUD_EMAIL:
-                print(f"[Step 2] ⚠️ 邮箱填入不匹配 (期望={CORDCLOUD_EMAIL}, 实际={filled_email})，重试...")
-                email_input.click(force=True)
-                page.wait_for_timeout(300)
-                email_input.fill(CORDCLOUD_EMAIL, force=True)
-                filled_email = email_input.input_value()
-                if filled_email != CORDCLOUD_EMAIL:
-                    print(f"[Step 2] ❌ 邮箱重试仍失败: {filled_email}")
-                else:
-                    print(f"[Step 2] ✅ 邮箱重试成功")
-
-            print(f"[Step 2] 已填写: {CORDCLOUD_EMAIL}")
-            results.append(f"[Step 2] 填写登录表单: {CORDCLOUD_EMAIL}")
-
-            # 点击登录按钮（触发 AJAX login() 函数）
-            # AJAX 返回：
-            #   ret==1 → 弹窗 → 500ms后 location.href='/user'
-            #   ret==2 → 弹窗 → 500ms后 location.href='/auth/login/2fa?token=...'
-            #   其他   → 弹窗显示错误，留在当前页
-            login_click_time = time.time()
-            page.click("#login")
-            print(f"[Step 2] 已点击登录 (触发时间: {time.strftime('%H:%M:%S', time.localtime(login_click_time))})，等待 AJAX 响应...")
-
-            # 等待 JS 重定向：优先检测跳转到 /user（登录成功），其次 /2fa（需要二步验证）
-            redirected = False
-            for label, pattern, timeout_s in [
-                ("登录成功→/user", "**/user**", 15),
-                ("二步验证→/2fa", "**/2fa**", 10),
-            ]:
+            print(f"[Step 3] 点击签到按钮: '{btn_text}'")
+            with step("checkin_click") as s:
+                await checkin_btn.locator.click()
+                # 等待签到结果提示或按钮变为已签到（.alert 可能是页面原有公告，不参与等待）
+                s.outcome = await wait_any(page, [
+                    ("#checkin-msg", visible("#checkin-msg", with_text=True)),
+                    (".checkin-msg", visible(".checkin-msg", with_text=True)),
+                    ("#msg", visible("#msg", with_text=True)),
+                    ("已签到", button_with_text("已签到")),
+                ], 2000, "Step 3") or "timeout"
+
+            # 检查签到结果：候选顺序即优先级（.alert 可能是页面原有公告），不记录命中
+            msg_el = await selector_cache.find(
+                page, "checkin_msg", ["#checkin-msg", ".checkin-msg", ".alert", "#msg"], max_len=200, remember=False,
+            )
+            checkin_msg = msg_el.text if msg_el else ""
+            if checkin_msg:
+                print(f"[Step 3] 签到结果 ({msg_el.selector}): {checkin_msg}")
+            if not checkin_msg:
+                # 检查按钮文字是否变化（已签到）
                 try:
-                    page.wait_for_url(pattern, timeout=timeout_s * 1000)
-                    print(f"[Step 2] ✅ 检测到跳转: {label}")
-                    redirected = True
-                    break
+                    new_text = ((await checkin_btn.locator.text_content(timeout=2000)) or "").strip()
+                    if new_text != btn_text:
+                        checkin_msg = f"按钮文字变化: {new_text}"
+                        print(f"[Step 3] {checkin_msg}")
                 except Exception:
-                    continue
+                    pass
+            results.append(f"[Step 3] 签到完成: {checkin_msg or '已执行'}")
+            if any(word in checkin_msg for word in CHECKIN_OK_WORDS):
+                ledger.record(account.email, source="签到")
+                selector_cache.confirm(checkin_btn)
 
-            # 兜底：短暂等待后再次检查 URL（某些情况下 wait_for_url 可能错过）
-            if not redirected:
-                page.wait_for_timeout(2000)
-                if "/user" in page.url or "/2fa" in page.url:
-                    redirected = True
+    print("[Step 3] ✅ 签到操作完成")
+    return await snap("step6_after_checkin", for_email=True)
 
-            current_url = page.url
-            print(f"[Step 2] 当前 URL: {current_url}")
-            save_page_state(page, "step3_after_login_click")
 
-            # ── 检测 2FA ──
-            in_2fa = ("/2fa" in current_url or "/auth/login/2fa" in current_url)
+async def run_checkin(page, account: Account, results: list[str]) -> tuple[bool, str | None]:
+    """
+    在给定页面上完成 登录检查 → 登录(含 2FA) → 每日签到。
+    各步骤结果追加到 results。打开页面、ALtcha、验证码等待失败时按阶段预算重试（见 retry.py）。
+    返回 (是否走完流程, 签到页面截图路径)；登录失败、阶段重试用尽等提前退出时为 (False, None)
+    """
+    async def snap(step_name: str, failed: bool = False, for_email: bool = False) -> str | None:
+        name = f"{account.tag}_{step_name}" if account.tag else step_name
+        return await save_page_state(page, name, failed=failed, for_email=for_email)
 
-            if in_2fa:
-                print(f"[Step 2] 🔐 检测到 2FA 页面")
-                save_page_state(page, "step3_2fa_page")
-                print("[Step 2] 正在从 POP3 收取验证码...")
+    cache_path = account_cache_path(account)
+    fresh, reason = session_cache.is_fresh(cache_path, SESSION_FRESH_HOURS * 3600)
+    print(f"[Session] {reason}")
 
-                code, error = fetch_latest_verification_code(timeout_seconds=90, since_time=login_click_time)
-                if error or not code:
-                    print(f"[Step 2] ❌ {error}")
-                    return
-
-                # 填写验证码：尝试多种选择器（页面结构可能变化）
-                code_filled = False
-                for selector in ["#code", "input[name='code']", "input[type='text']"]:
-                    try:
-                        code_input = page.locator(selector).first
-                        if code_input.is_visible():
-                            code_input.fill(code, force=True)
-                            code_filled = True
-                            print(f"[Step 2] 已填写验证码 (selector={selector}): {_mask_code(code)}")
-                            break
-                    except Exception:
-                        continue
-                if not code_filled:
-                    print(f"[Step 2] ⚠️ 未找到验证码输入框，尝试继续...")
-
-                # 提交 2FA：尝试多种选择器
-                verify_clicked = False
-                for selector in ["#btn-verify", "button:has-text('验证')", "button:has-text('确认')", "button[type='submit']"]:
-                    try:
-                        verify_btn = page.locator(selector).first
-                        if verify_btn.is_visible():
-                            verify_btn.click()
-                            verify_clicked = True
-                            print(f"[Step 2] 已点击验证按钮 (selector={selector})")
-                            break
-                    except Exception:
-                        continue
-                if not verify_clicked:
-                    print("[Step 2] ⚠️ 未找到验证按钮，尝试继续...")
-
-                print("[Step 2] 已提交验证，等待响应...")
-
-                # 等待结果：成功则跳转到 /user，失败则弹窗 #msg
-                try:
-                    page.wait_for_url("**/user**", timeout=10000)
-                    print("[Step 2] ✅ 2FA 验证成功，已跳转到用户页面")
-                    results.append("[Step 2] 2FA 验证成功")
-                except Exception:
-                    # 未跳转，检查 #msg 弹窗错误信息
-                    try:
-                        msg_el = page.locator("#msg")
-                        if msg_el.is_visible():
-                            error_text = (msg_el.text_content() or "").strip()
-                            print(f"[Step 2] ❌ 2FA 验证失败: {error_text}")
-                            results.append(f"[Step 2] 2FA 验证失败: {error_text}")
-                            return
-                    except Exception:
-                        pass
-                    print("[Step 2] ⚠️ 2FA 提交后未跳转，状态未知")
-
-                save_page_state(page, "step4_after_2fa")
-            else:
-                # 不在 2FA 页面 → 检查是否有错误弹窗（登录失败）
-                try:
-                    page.wait_for_timeout(1000)
-                    msg_el = page.locator("#msg")
-                    if msg_el.is_visible():
-                        error_msg = (msg_el.text_content() or "").strip()
-                        if error_msg:
-                            print(f"[Step 2] ❌ 登录错误: {error_msg}")
-                            results.append(f"[Step 2] 登录错误: {error_msg}")
-                            return
-                except Exception:
-                    pass
+    deadline = new_deadline()
+    try:
+        logged_in = await check_login(page, results, snap, deadline, fresh)
+        if not logged_in:
+            session_cache.invalidate(cache_path)
+            if not await login(page, account, results, snap, deadline):
+                await snap("login_failed", failed=True)
+                return False, None
+        screenshot = await daily_checkin(page, account, results, snap, deadline, navigate=not logged_in)
+        session_cache.confirm(cache_path, await page.context.cookies(), urlsplit(USER_URL).hostname or "")
+        return True, screenshot
+    except StageFailed as e:
+        print(f"[Retry] ❌ {e}")
+        results.append(f"[Retry] {e}")
+        await snap(f"{e.stage}_failed", failed=True)
+        return False, None
+    except Exception:
+        await snap("error", failed=True)
+        raise
+
+
+def send_result_in_background(results: list[str], image_path: str | None = None, to_addr: str | None = None):
+    """在后台线程发送结果邮件，不阻塞关闭浏览器或处理下一个账号"""
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    background.spawn(send_result_email, f"CordCloud 签到结果 - {now}", "\n".join(results), image_path, to_addr)
+
+
+def notify_result(account: Account, ok: bool, results: list[str], image_path: str | None = None,
+                  to_addr: str | None = None):
+    """结果通知：汇总模式下记入本次运行的汇总邮件（包括失败的账号），否则成功时单独发送"""
+    if NOTIFY_DIGEST:
+        if SMTP_PASSWORD:
+            get_notifier().collect(account.email, ok, results, image_path)
+    elif ok:
+        send_result_in_background(results, image_path, to_addr)
+
+
+async def finish_run(send_digest: bool = True):
+    """
+    运行结束：等待调试文件和后台任务完成，发送汇总邮件（如有）并关闭 SMTP 连接。
+    send_digest=False 时丢弃汇总（分片子进程的汇总由主进程统一发送）
+    """
+    await artifacts.close()
+    await background.drain()
+    if _notifier is None:
+        return
+    if NOTIFY_DIGEST and SMTP_PASSWORD and send_digest:
+        await asyncio.to_thread(_notifier.flush, NOTIFY_DIGEST_TO or CORDCLOUD_EMAIL)
+    else:
+        await asyncio.to_thread(_notifier.close)
+
+
+def start_profiler(report: RunReport):
+    """PROFILE_RESOURCES=true 时开始资源采样，结果在 publish_report 时写入报告"""
+    global _profiler
+    if not PROFILE_RESOURCES or _profiler is not None:
+        return
+    from profiler import ResourceProfiler, parse_resource_budgets
+    _profiler = ResourceProfiler(report, PROFILE_INTERVAL, parse_resource_budgets(PROFILE_BUDGETS))
+    _profiler.start()
 
-                # 也不在 /user → 可能登录异常
-                print(f"[Step 2] ⚠️ 登录后未跳转，当前: {current_url}")
-                results.append(f"[Step 2] 登录后未跳转到 /user，当前: {current_url}")
-
-            current_url = page.url
-
-            if "/user" in current_url or "/user/" in current_url:
-                print("[Step 2] ✅ 登录成功！")
-                results.append("[Step 2] 登录成功")
-            elif "/2fa" not in current_url:
-                print(f"[Step 2] ⚠️ 登录后 URL: {current_url}，继续尝试...")
-                results.append(f"[Step 2] 登录后未跳转到 /user，当前: {current_url}")
-
-        # ── Step 3: 每日签到 ──
-        print("\n[Step 3] 查找每日签到...")
-        page.goto(USER_URL, wait_until="networkidle", timeout=30000)
-        page.wait_for_timeout(2000)  # 多等一会让用户页面 JS 初始化
-        save_page_state(page, "step5_user_checkin")
-
-        # 签到按钮：尝试多种选择器（页面结构可能变化）
-        checkin_selectors = [
-            "#checkin-btn button",       # 旧结构：容器内按钮
-            "#checkin",                  # 直接 ID
-            "button:has-text('签到')",    # 文字匹配
-            "button:has-text('每日签到')", # 备选文字
-        ]
-        checkin_btn = None
-        for selector in checkin_selectors:
-            try:
-                btn = page.locator(selector).first
-                if btn.is_visible():
-                    # 过滤掉不相关的按钮（如页面导航中的）
-                    btn_text = (btn.text_content() or "").strip()
-                    if any(kw in btn_text for kw in ("签到", "checkin", "Checkin")):
-                        checkin_btn = btn
-                        print(f"[Step 3] 找到签到按钮 (selector={selector}): '{btn_text}'")
-                        break
-            except Exception:
-                continue
 
-        if checkin_btn is None:
-            print("[Step 3] ⚠️ 未找到签到按钮，页面结构可能有变")
-            results.append("[Step 3] 未找到签到按钮")
+def publish_report(report: RunReport) -> bool:
+    """
+    停止资源采样，打印步骤耗时汇总表，并写出 JSON 运行报告。
+    返回 False 表示资源超出 PROFILE_BUDGETS（调用方以退出码 1 结束）
+    """
+    global _profiler
+    violations = []
+    if _profiler is not None:
+        violations = _profiler.stop()
+        _profiler = None
+    print("\n" + report.summary_table())
+    if RUN_REPORT:
+        try:
+            print(f"[Report] 运行报告已保存: {report.write(RUN_REPORT_DIR)}")
+        except OSError as e:
+            print(f"[Report] 运行报告保存失败: {e}")
+    if violations:
+        print("\n" + "!" * 60)
+        print("[Profile] ❌ 资源超出预算:")
+        for v in violations:
+            print(f"  - {v}")
+        print("!" * 60)
+    return not violations
+
+
+async def run_single(account: Account, results: list[str]) -> bool:
+    """单账号：先尝试 HTTP 快速签到，失败再启动浏览器。返回是否走完流程"""
+    if HTTP_FAST_PATH and await try_http_checkin(account, results):
+        notify_result(account, True, results)
+        print("\n" + "=" * 60)
+        print("✅ 任务完成（HTTP）")
+        print("=" * 60)
+        return True
+
+    # 启动 CloakBrowser（Playwright 兼容）
+    from cloakbrowser import launch_async, launch_persistent_context_async
+    from http_checkin import save_session
+
+    print("\n[Browser] 启动 CloakBrowser...")
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+
+    with step("browser_launch"):
+        if USE_PERSISTENT:
+            context = await launch_persistent_context_async(
+                PROFILE_DIR,
+                headless=HEADLESS,
+                viewport={"width": 1280, "height": 800},
+                humanize=True,
+            )
+            # launch_persistent_context returns BrowserContext (Playwright-compatible)
+            page = await context.new_page()
+            real_browser = None  # persistent context manages its own browser
         else:
-            is_disabled = checkin_btn.is_disabled()
-            btn_text = (checkin_btn.text_content() or "").strip()
-            if is_disabled or "已签到" in btn_text:
-                # 提取上次签到时间
-                last_time_text = ""
-                for last_sel in ["p:has-text('上次')", "span:has-text('上次')", "*:has-text('上次')"]:
-                    try:
-                        last_el = page.locator(last_sel).first
-                        if last_el.is_visible():
-                            last_time_text = (last_el.text_content() or "").strip()
-                            if last_time_text:
-                                break
-                    except Exception:
-                        continue
-                if last_time_text:
-                    print(f"[Step 3] 今日已签到，{last_time_text}")
-                    results.append(f"[Step 3] 今日已签到，{last_time_text}")
-                else:
-                    print(f"[Step 3] 今日已签到")
-                    results.append("[Step 3] 今日已签到")
-            else:
-                print(f"[Step 3] 点击签到按钮: '{btn_text}'")
-                checkin_btn.click()
-                page.wait_for_timeout(2000)
-
-                # 检查签到结果：尝试多种选择器
-                checkin_msg = ""
-                for msg_sel in ["#checkin-msg", ".checkin-msg", ".alert", "#msg"]:
-                    try:
-                        msg_el = page.locator(msg_sel).first
-                        if msg_el.is_visible():
-                            txt = (msg_el.text_content() or "").strip()
-                            if txt and len(txt) < 200:  # 合理长度的消息
-                                checkin_msg = txt
-                                print(f"[Step 3] 签到结果 ({msg_sel}): {checkin_msg}")
-                                break
-                    except Exception:
-                        continue
-                if not checkin_msg:
-                    # 检查按钮文字是否变化（已签到）
-                    try:
-                        new_text = (checkin_btn.text_content() or "").strip()
-                        if new_text != btn_text:
-                            checkin_msg = f"按钮文字变化: {new_text}"
-                            print(f"[Step 3] {checkin_msg}")
-                    except Exception:
-                        pass
-                results.append(f"[Step 3] 签到完成: {checkin_msg or '已执行'}")
-
-        print("[Step 3] ✅ 签到操作完成")
-        checkin_screenshot = save_page_state(page, "step6_after_checkin")
-
-        # ── 发送结果邮件 ──
-        now = time.strftime("%Y-%m-%d %H:%M:%S")
-        email_subject = f"CordCloud 签到结果 - {now}"
-        email_body = "\n".join(results)
-        send_result_email(email_subject, email_body, checkin_screenshot)
+            real_browser = await launch_async(headless=HEADLESS, humanize=True)
+            context = await real_browser.new_context(viewport={"width": 1280, "height": 800})
+            page = await context.new_page()
+    cached = new_response_cache()
+    await cached.install(page)
+    resources = new_resource_filter()
+    await resources.install(page)
+
+    ok = False
+    try:
+        ok, checkin_screenshot = await run_checkin(page, account, results)
+        if not ok:
+            return False
+        # 导出会话供下次 HTTP 快速签到使用
+        with step("save_session"):
+            await save_session(context, page, account_session_path(account))
+
+        # ── 发送结果邮件（后台进行，同时关闭浏览器） ──
+        notify_result(account, True, results, checkin_screenshot)
 
         print("\n" + "=" * 60)
         print("✅ 任务完成")
@@ -619,13 +765,71 @@ def main():
         results.append(f"[ERROR] {e}")
 
     finally:
-        print("\n[Browser] 保持浏览器打开（5秒后自动关闭）...")
-        time.sleep(5)
-        if USE_PERSISTENT:
-            context.close()
-        else:
-            if real_browser:
-                real_browser.close()
+        if not ok:
+            notify_result(account, False, results)
+        resources.publish()
+        cached.publish()
+        if KEEP_BROWSER_OPEN_SECONDS > 0:
+            print(f"\n[Browser] 保持浏览器打开（{KEEP_BROWSER_OPEN_SECONDS:g}秒后自动关闭）...")
+            await asyncio.sleep(KEEP_BROWSER_OPEN_SECONDS)
+        with step("browser_close"):
+            if USE_PERSISTENT:
+                await context.close()
+            else:
+                if real_browser:
+                    await real_browser.close()
+    return ok
+
+
+def already_checked_in(account: Account) -> bool:
+    """台账中今天（站点时区）已有签到记录"""
+    if not ledger.checked_today(account.email):
+        return False
+    entry = ledger.entry(account.email) or {}
+    print(f"[Ledger] {account.email} 今日已签到（{entry.get('at', '')}，来源: {entry.get('source', '')}），跳过。使用 --force 强制运行")
+    return True
+
+
+async def amain(force: bool = False, wait: bool = True) -> int | None:
+    """单账号签到入口；资源超出 PROFILE_BUDGETS 时返回退出码 1"""
+    print("=" * 60)
+    print("CordCloud Auto Login + Daily Check-in")
+    if CODE_SOURCE == "imap":
+        print(f"CloakBrowser + IMAP IDLE ({IMAP_HOST}:{IMAP_PORT})")
+    else:
+        print(f"CloakBrowser + POP3 ({POP3_HOST}:{POP3_PORT})")
+    print("=" * 60)
+
+    # 校验配置
+    if not CORDCLOUD_EMAIL or not CORDCLOUD_PASSWORD:
+        print("[ERROR] 请先配置 .env 文件中的 CORDCLOUD_EMAIL 和 CORDCLOUD_PASSWORD")
+        return
+    account = Account(CORDCLOUD_EMAIL, CORDCLOUD_PASSWORD)
+    if not force and already_checked_in(account):
+        return
+
+    report = start_report()
+    start_profiler(report)
+    set_account(account.email)
+    if wait:
+        await new_window().wait_turn(account.email)
+    results = []  # 收集各步骤结果用于邮件汇总
+    ok = False
+    try:
+        ok = await run_single(account, results)
+    finally:
+        await finish_run()
+        report.set_result(account.email, ok, results)
+        within_budget = publish_report(report)
+    return 0 if within_budget else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CordCloud 自动登录 + 每日签到")
+    parser.add_argument("--force", action="store_true", help="忽略签到台账，今天已签到也照常运行")
+    parser.add_argument("--no-wait", action="store_true", help="忽略签到时段（CHECKIN_WINDOW_MINUTES），立即开始")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(amain(force=args.force, wait=not args.no_wait)))
 
 
 if __name__ == "__main__":
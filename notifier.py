@@ -0,0 +1,155 @@
+"""
+结果通知
+一次运行中的所有结果邮件共用同一个已登录的 SMTP 连接：第一封邮件时建立连接，之后发送前用 NOOP 确认连接仍可用，
+断开则重连一次，运行结束时 close()。批量 / 常驻模式下不再为每个账号重复 TLS 握手和登录，也减少被 QQ SMTP 限流。
+汇总模式下 collect() 只记录结果，flush() 把本次运行所有账号的结果合成一封邮件发送。
+"""
+
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate
+from pathlib import Path
+
+from timing import step
+
+
+@dataclass
+class DigestEntry:
+    email: str
+    ok: bool
+    results: list[str]
+    image_path: str | None = None
+
+
+def build_message(sender: str, to_addr: str, subject: str, body: str, image_paths: list[str] = ()):
+    """纯文本正文 + 截图附件（JPEG / PNG 按扩展名）"""
+    text = MIMEText(body, "plain", "utf-8")
+    if image_paths:
+        msg = MIMEMultipart("mixed")
+        msg.attach(text)
+        for image_path in image_paths:
+            path = Path(image_path)
+            subtype = "jpeg" if path.suffix.lower() in (".jpg", ".jpeg") else "png"
+            try:
+                img = MIMEImage(path.read_bytes(), _subtype=subtype)
+            except OSError as e:
+                print(f"[SMTP] 附件读取失败，跳过: {e}")
+                continue
+            img.add_header("Content-Disposition", "attachment", filename=path.name)
+            msg.attach(img)
+    else:
+        msg = text
+    msg["From"] = sender
+    msg["To"] = to_addr
+    msg["Subject"] = subject
+    msg["Date"] = formatdate(localtime=True)
+    return msg
+
+
+class SmtpNotifier:
+    """复用单个 SMTP 连接发送结果邮件；可在多个后台线程中同时调用，发送按顺序进行"""
+
+    def __init__(self, host: str, port: int, use_ssl: bool, starttls: bool, username: str, password: str,
+                 timeout: float = 15, rate_limit=None):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.rate_limit = rate_limit  # scheduler.RateLimiter，每次建立连接前取得放行
+        self.sent = 0
+        self.connects = 0
+        self._server: smtplib.SMTP | None = None
+        self._lock = threading.Lock()
+        self._digest: list[DigestEntry] = []
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.rate_limit is not None:
+            self.rate_limit.acquire()
+        with step("smtp_connect"):
+            if self.use_ssl:
+                server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            else:
+                server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+                if self.starttls:
+                    server.starttls()
+            server.login(self.username, self.password)
+        self.connects += 1
+        return server
+
+    def _connection(self) -> smtplib.SMTP:
+        """已有连接先 NOOP 确认仍然可用，否则重新连接"""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._drop()
+        self._server = self._connect()
+        return self._server
+
+    def _drop(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def send(self, to_addr: str, subject: str, body: str, image_paths: list[str] = ()):
+        """发送一封邮件；连接在发送中途断开时重连重试一次。失败抛出异常"""
+        msg = build_message(self.username, to_addr, subject, body, list(image_paths)).as_string()
+        with self._lock:
+            try:
+                self._connection().sendmail(self.username, [to_addr], msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._drop()
+                self._connection().sendmail(self.username, [to_addr], msg)
+            self.sent += 1
+
+    def collect(self, email_addr: str, ok: bool, results: list[str], image_path: str | None = None):
+        """汇总模式：记录一个账号的结果，flush() 时统一发送"""
+        with self._lock:
+            self._digest.append(DigestEntry(email_addr, ok, list(results), image_path))
+
+    def digest_body(self, entries: list[DigestEntry]) -> str:
+        lines = []
+        for entry in entries:
+            lines.append(f"{'✅' if entry.ok else '❌'} {entry.email}")
+            lines.extend(f"    {line}" for line in entry.results)
+            lines.append("")
+        return "\n".join(lines)
+
+    def flush(self, to_addr: str):
+        """发送汇总邮件（如有）并关闭连接"""
+        with self._lock:
+            entries, self._digest = self._digest, []
+        if entries:
+            ok = sum(e.ok for e in entries)
+            subject = f"CordCloud 签到汇总 - {time.strftime('%Y-%m-%d %H:%M:%S')}（成功 {ok}/{len(entries)}）"
+            with step("smtp_send") as s:
+                try:
+                    self.send(to_addr, subject, self.digest_body(entries), [e.image_path for e in entries if e.image_path])
+                    print(f"[SMTP] ✅ 汇总邮件已发送至 {to_addr}（{len(entries)} 个账号）")
+                except Exception as e:
+                    s.outcome = "error"
+                    s.detail = str(e)
+                    print(f"[SMTP] ❌ 汇总邮件发送失败: {e}")
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except Exception:
+                    pass
+                self._server = None
@@ -0,0 +1,151 @@
+"""
+POP3 增量轮询
+在多次轮询之间保留 UIDL 索引，只处理未见过的邮件；
+先用 TOP 读取邮件头判断 Date / From / Subject，命中后才下载完整正文。
+"""
+
+import poplib
+from email.message import Message
+
+from code_extractor import header_matches, parse_headers, sent_before, split_headers
+from timing import step
+
+
+class Pop3Poller:
+    """
+    基于 UIDL 的 POP3 增量轮询器。
+
+    POP3 会话在登录时对邮箱做快照，多数服务器在同一会话内看不到新邮件，
+    因此默认每次轮询后断开、下次轮询重新登录；此时 UIDL 索引保证只取新邮件的头部。
+    keep_session=True 时保持会话，仅在服务器断开或报错时重连（适用于会话内可见新邮件的服务器）。
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 use_ssl: bool = True, timeout: int = 10,
+                 from_filter: str = "", keep_session: bool = False, subject_filter: str = "",
+                 rate_limit=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.from_filter = from_filter.lower()
+        self.subject_filter = subject_filter.lower()
+        self.keep_session = keep_session
+        self.rate_limit = rate_limit  # scheduler.RateLimiter，每次登录前取得放行
+        self.seen: set[str] = set()  # 已处理过的 UIDL
+        self.logins = 0  # 登录次数，便于观察重连频率
+        self._conn = None
+        self._top_supported = True
+
+    # ── 连接管理 ──
+
+    def _connect(self):
+        if self.rate_limit is not None:
+            self.rate_limit.acquire()
+        if self.use_ssl:
+            conn = poplib.POP3_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = poplib.POP3(self.host, self.port, timeout=self.timeout)
+        conn.user(self.username)
+        conn.pass_(self.password)
+        self._conn = conn
+        self.logins += 1
+
+    def close(self):
+        """结束会话（QUIT），忽略已断开的连接"""
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _uidl(self) -> list[tuple[int, str]]:
+        """返回 [(邮件序号, UIDL)]，按序号升序（即到达顺序）"""
+        _, lines, _ = self._conn.uidl()
+        listing = []
+        for line in lines:
+            num, uid = line.decode("ascii", errors="replace").split(None, 1)
+            listing.append((int(num), uid.strip()))
+        return listing
+
+    def _headers(self, num: int) -> tuple[Message, bytes | None]:
+        """
+        读取邮件头。支持 TOP 时只下载头部，返回 (头部, None)；
+        服务器不支持 TOP 时退回 RETR，返回 (完整邮件, 原始字节) 避免重复下载。
+        """
+        if self._top_supported:
+            try:
+                _, lines, _ = self._conn.top(num, 0)
+                return parse_headers(b"\r\n".join(lines)), None
+            except poplib.error_proto:
+                self._top_supported = False
+        raw = self._retr(num)
+        # 只解析头部，正文留给提取验证码时按需解码
+        return parse_headers(raw[:split_headers(raw)[0]]), raw
+
+    def _retr(self, num: int) -> bytes:
+        _, lines, _ = self._conn.retr(num)
+        return b"\r\n".join(lines)
+
+    # ── 轮询 ──
+
+    def index(self):
+        """记录邮箱中现有邮件的 UIDL，之后的 poll 只处理新到达的邮件（不下载任何邮件头）"""
+        with step("pop3_index"):
+            if self._conn is None:
+                self._connect()
+            try:
+                self.seen.update(uid for _, uid in self._uidl())
+            finally:
+                if not self.keep_session:
+                    self.close()
+
+    def poll(self, since_time: float | None = None) -> list[bytes]:
+        """
+        处理自上次轮询以来的新邮件，返回通过 Date / From 过滤的完整邮件（新到旧）。
+        since_time: Unix 时间戳，早于该时间的邮件视为历史邮件，不下载正文
+        """
+        with step("pop3_poll") as s:
+            candidates = self._poll(since_time)
+            s.detail = f"{len(candidates)} 封候选"
+            return candidates
+
+    def _poll(self, since_time: float | None) -> list[bytes]:
+        if self._conn is None:
+            self._connect()
+        try:
+            listing = self._uidl()
+        except (poplib.error_proto, OSError):
+            # 服务器主动断开或会话超时，重新登录
+            self.close()
+            self._connect()
+            listing = self._uidl()
+
+        new = [(num, uid) for num, uid in listing if uid not in self.seen]
+        print(f"[POP3] 邮箱共 {len(listing)} 封邮件，新邮件 {len(new)} 封")
+
+        candidates = []
+        processed = []
+        try:
+            # 从最新一封开始，遇到早于 since_time 的邮件即停止（更早的邮件都是历史邮件）；
+            # 停止处的邮件不记为已处理，日期判断有误时下次轮询还能再看到它
+            for i in range(len(new) - 1, -1, -1):
+                num, uid = new[i]
+                headers, raw = self._headers(num)
+
+                if since_time is not None and sent_before(headers.get("Date", ""), since_time):
+                    break
+
+                if header_matches(headers, self.from_filter, self.subject_filter):
+                    candidates.append(raw if raw is not None else self._retr(num))
+                processed.append(uid)
+        finally:
+            if not self.keep_session:
+                self.close()
+        # 整次轮询成功后才记为已处理：中途 TOP / RETR 出错时本次的候选会被丢弃，下次轮询需要重新取回
+        self.seen.update(processed)
+        return candidates
@@ -0,0 +1,89 @@
+"""
+进程资源统计（仅 Linux，读取 /proc；其他平台返回 0）
+浏览器由 Playwright 驱动进程拉起，内存统计按本进程及全部子孙进程汇总。
+open_sockets / write_bytes 供资源采样（profiler.py）使用。
+"""
+
+import os
+
+
+def _children() -> dict[int, list[int]]:
+    tree: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        tree.setdefault(ppid, []).append(int(entry))
+    return tree
+
+
+def process_tree(pid: int | None = None) -> list[int]:
+    """进程及其所有子孙进程的 PID"""
+    if not os.path.isdir("/proc"):
+        return []
+    pid = pid or os.getpid()
+    tree = _children()
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        stack.extend(tree.get(p, []))
+    return pids
+
+
+def process_rss(pid: int) -> int:
+    """单个进程的 RSS（字节），进程已退出时返回 0"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def available_memory() -> int:
+    """系统可用内存（MemAvailable，字节），无法读取时返回 0"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return 0
+
+
+def process_tree_rss(pid: int | None = None) -> int:
+    """进程及其所有子孙进程的 RSS 之和（字节）"""
+    return sum(process_rss(p) for p in process_tree(pid))
+
+
+def open_sockets(pid: int | None = None) -> int:
+    """进程打开的 socket 数，无法读取时返回 0"""
+    fd_dir = f"/proc/{pid or os.getpid()}/fd"
+    sockets = 0
+    try:
+        for fd in os.listdir(fd_dir):
+            try:
+                if os.readlink(f"{fd_dir}/{fd}").startswith("socket:"):
+                    sockets += 1
+            except OSError:
+                continue  # 读取期间已关闭
+    except OSError:
+        pass
+    return sockets
+
+
+def write_bytes(pid: int) -> int:
+    """进程累计写入存储层的字节数（/proc/<pid>/io 的 write_bytes），无法读取时返回 0"""
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    return 0
@@ -0,0 +1,174 @@
+"""
+持久化 Profile 维护
+USE_PERSISTENT_CONTEXT=true 时 PERSISTENT_PROFILE_DIR 会不断变大（HTTP 缓存、Code Cache、Service Worker、历史记录……），
+launch_persistent_context 越来越慢，CI 缓存上传/恢复也越来越贵。签到只需要登录会话：Cookies 和 Local Storage。
+
+    uv run python profile_tool.py size                         # 当前大小
+    uv run python profile_tool.py compact [--dry-run] [--no-launch]
+    uv run python profile_tool.py snapshot [-o profile.tar.gz]  # 只打包会话需要的文件
+    uv run python profile_tool.py restore profile.tar.gz [--force]
+
+保留的内容：
+- 浏览器 Profile 目录（含 Preferences 的目录，如 Default/）中的 Preferences、Cookies、Network/、Local Storage/
+- 顶层的 Local State（Cookies 加密密钥所在）
+- 本项目自己的文件：顶层的 *.json（签到台账、会话缓存、选择器缓存等）和批量模式的账号目录
+其余文件和目录全部删除。compact / restore 前后会报告目录大小和浏览器启动耗时（--no-launch 跳过启动测量）。
+"""
+
+import argparse
+import shutil
+import tarfile
+import time
+from pathlib import Path
+
+from config import PROFILE_DIR
+
+# 浏览器 Profile 目录中保留的条目
+KEEP_IN_BROWSER_PROFILE = {"Preferences", "Secure Preferences", "Cookies", "Cookies-journal", "Network", "Local Storage"}
+# 顶层保留的浏览器文件
+KEEP_TOP_LEVEL = {"Local State"}
+# 含有这些文件的目录是本项目的账号目录（batch.py），整个保留
+ACCOUNT_DIR_MARKERS = ("state.json", "session.json", "session_cache.json")
+
+
+def dir_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file() and not p.is_symlink())
+
+
+def is_browser_profile(path: Path) -> bool:
+    return path.is_dir() and (path / "Preferences").exists()
+
+
+def is_account_dir(path: Path) -> bool:
+    return path.is_dir() and not is_browser_profile(path) and any((path / m).exists() for m in ACCOUNT_DIR_MARKERS)
+
+
+def plan(profile_dir: Path) -> tuple[list[Path], list[Path]]:
+    """返回 (保留的条目, 删除的条目)"""
+    keep, remove = [], []
+    for entry in sorted(profile_dir.iterdir()):
+        if is_browser_profile(entry):
+            for child in sorted(entry.iterdir()):
+                (keep if child.name in KEEP_IN_BROWSER_PROFILE else remove).append(child)
+        elif entry.name in KEEP_TOP_LEVEL or (entry.is_file() and entry.suffix == ".json") or is_account_dir(entry):
+            keep.append(entry)
+        else:
+            remove.append(entry)
+    return keep, remove
+
+
+def browser_running(profile_dir: Path) -> bool:
+    """Chromium 运行时在 Profile 顶层创建 SingletonLock（符号链接）"""
+    return (profile_dir / "SingletonLock").is_symlink() or (profile_dir / "SingletonLock").exists()
+
+
+async def measure_launch(profile_dir: Path) -> float:
+    """启动持久化上下文并打开一个空白页所需的秒数"""
+    from cloakbrowser import launch_persistent_context_async
+    start = time.perf_counter()
+    context = await launch_persistent_context_async(profile_dir, headless=True, viewport={"width": 1280, "height": 800})
+    await context.new_page()
+    elapsed = time.perf_counter() - start
+    await context.close()
+    return elapsed
+
+
+def measure(profile_dir: Path, launch: bool) -> str:
+    size = f"{dir_size(profile_dir) / 1024 / 1024:.1f}MB" if profile_dir.exists() else "不存在"
+    if not launch or not profile_dir.exists():
+        return size
+    import asyncio
+    try:
+        return f"{size}，启动 {asyncio.run(measure_launch(profile_dir)):.2f}s"
+    except Exception as e:
+        return f"{size}，启动测量失败: {e}"
+
+
+def remove_entry(path: Path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def compact(profile_dir: Path, dry_run: bool = False, launch: bool = True):
+    # 先测量再规划：测量时启动浏览器会新建 / 修改缓存等文件，它们也应在删除之列，前后数字才可比
+    before = None if dry_run else measure(profile_dir, launch)
+    keep, remove = plan(profile_dir)
+    freed = sum(dir_size(p) for p in remove)
+    for path in remove:
+        print(f"[Profile] {'将删除' if dry_run else '删除'} {path.relative_to(profile_dir)} ({dir_size(path) / 1024:.0f}KB)")
+    if dry_run:
+        print(f"[Profile] 可释放 {freed / 1024 / 1024:.1f}MB，保留 {len(keep)} 项")
+        return
+    for path in remove:
+        remove_entry(path)
+    print(f"[Profile] 整理前: {before}")
+    print(f"[Profile] 整理后: {measure(profile_dir, launch)}（释放 {freed / 1024 / 1024:.1f}MB）")
+
+
+def snapshot(profile_dir: Path, output: Path):
+    """把保留的条目打包为 tar.gz，不修改 Profile 本身"""
+    keep, _ = plan(profile_dir)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(output, "w:gz", compresslevel=6) as tar:
+        for path in keep:
+            tar.add(path, arcname=str(path.relative_to(profile_dir)))
+    print(f"[Profile] 快照已保存: {output} ({output.stat().st_size / 1024:.0f}KB，"
+          f"Profile 共 {dir_size(profile_dir) / 1024 / 1024:.1f}MB)")
+
+
+def restore(archive: Path, profile_dir: Path, force: bool = False, launch: bool = True):
+    """把快照解压到 Profile 目录；目录非空时需要 --force（先清空）"""
+    if profile_dir.exists() and any(profile_dir.iterdir()):
+        if not force:
+            print(f"[Profile] {profile_dir} 非空，使用 --force 清空后恢复")
+            return
+        print(f"[Profile] 恢复前: {measure(profile_dir, launch)}")
+        shutil.rmtree(profile_dir)
+    start = time.perf_counter()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(archive, "r:gz") as tar:
+        tar.extractall(profile_dir, filter="data")
+    print(f"[Profile] 已从 {archive} 恢复，解压 {time.perf_counter() - start:.2f}s")
+    print(f"[Profile] 恢复后: {measure(profile_dir, launch)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持久化 Profile 维护")
+    parser.add_argument("--profile", type=Path, default=PROFILE_DIR, help="Profile 目录（默认 PERSISTENT_PROFILE_DIR）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("size", help="显示 Profile 大小和启动耗时").add_argument("--no-launch", action="store_true")
+    p = sub.add_parser("compact", help="删除会话不需要的缓存和历史")
+    p.add_argument("--dry-run", action="store_true", help="只列出将删除的内容")
+    p.add_argument("--no-launch", action="store_true", help="不测量浏览器启动耗时")
+    p = sub.add_parser("snapshot", help="打包会话需要的文件")
+    p.add_argument("-o", "--output", type=Path, default=Path("profile_snapshot.tar.gz"))
+    p = sub.add_parser("restore", help="从快照恢复 Profile")
+    p.add_argument("archive", type=Path)
+    p.add_argument("--force", action="store_true", help="Profile 目录非空时先清空")
+    p.add_argument("--no-launch", action="store_true")
+    args = parser.parse_args()
+
+    profile_dir: Path = args.profile
+    if args.command != "restore" and not profile_dir.exists():
+        print(f"[Profile] {profile_dir} 不存在")
+        return
+    if browser_running(profile_dir):
+        print(f"[Profile] ❌ 浏览器正在使用 {profile_dir}，请先结束签到 / 守护进程")
+        return
+
+    if args.command == "size":
+        print(f"[Profile] {profile_dir}: {measure(profile_dir, not args.no_launch)}")
+    elif args.command == "compact":
+        compact(profile_dir, args.dry_run, not args.no_launch)
+    elif args.command == "snapshot":
+        snapshot(profile_dir, args.output)
+    elif args.command == "restore":
+        restore(args.archive, profile_dir, args.force, not args.no_launch)
+
+
+if __name__ == "__main__":
+    main()
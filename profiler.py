@@ -0,0 +1,145 @@
+"""
+资源采样（PROFILE_RESOURCES=true 时启用）
+后台线程每 PROFILE_INTERVAL 秒采样一次：
+- tree_rss_mb：本进程及全部子孙进程（CloakBrowser）的 RSS 之和
+- python_rss_mb：本进程的 RSS
+- python_heap_mb：tracemalloc 统计的 Python 堆，取两次采样之间的峰值（短暂的分配高峰也能看到）
+- sockets：本进程打开的 socket 数（POP3 / IMAP / SMTP / HTTP 快速签到的连接；Playwright 与浏览器之间用管道，不计入）
+- disk_mb：进程树自开始采样以来写入磁盘的字节数（/proc/<pid>/io，已退出的进程保留最后一次读数）
+
+运行结束时按步骤汇总：每个步骤取其执行期间（步骤短于采样间隔时取紧随其后的一次采样）各指标的峰值，
+同名步骤取最大值。多个账号并发时同一时刻的采样会同时计入重叠的步骤。
+结果写入运行报告的 resources；超出 PROFILE_BUDGETS 的指标在运行中立即打印，结束时汇总并以退出码 1 结束。
+"""
+
+import bisect
+import os
+import threading
+import tracemalloc
+
+from procstats import open_sockets, process_rss, process_tree, write_bytes
+from timing import RunReport
+
+METRICS = ("tree_rss_mb", "python_rss_mb", "python_heap_mb", "sockets", "disk_mb")
+
+_MB = 1024 * 1024
+
+
+def parse_resource_budgets(value: str) -> dict[str, float]:
+    """"tree_rss_mb=1500,sockets=10" → {指标: 上限}；未知指标和格式错误的项忽略"""
+    budgets = {}
+    for item in value.split(","):
+        name, _, limit = item.strip().partition("=")
+        if not name:
+            continue
+        if name not in METRICS:
+            print(f"[Profile] 忽略未知的资源指标: {name}（可用: {', '.join(METRICS)}）")
+            continue
+        try:
+            budgets[name] = float(limit)
+        except ValueError:
+            print(f"[Profile] 忽略无法解析的资源预算: {item}")
+    return budgets
+
+
+class ResourceProfiler:
+    """在后台线程中采样资源占用，stop() 时把结果写入 report.resources"""
+
+    def __init__(self, report: RunReport, interval: float = 0.5, budgets: dict[str, float] | None = None):
+        self.report = report
+        self.interval = max(0.05, interval)
+        self.budgets = budgets or {}
+        self.samples: list[list[float]] = []  # [相对运行开始的秒数, *METRICS]
+        self.exceeded: dict[str, float] = {}  # 指标 → 超出预算时的最大值
+        self._pid = os.getpid()
+        self._written: dict[int, int] = {}   # pid → 最近一次读到的 write_bytes
+        self._baseline: dict[int, int] = {}  # pid → 开始采样时的 write_bytes
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._owns_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        for pid in process_tree(self._pid):
+            self._baseline[pid] = write_bytes(pid)
+        self.sample()
+        self._thread = threading.Thread(target=self._loop, name="resource-profiler", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        pids = process_tree(self._pid)
+        tree_rss = sum(process_rss(p) for p in pids)
+        for pid in pids:
+            written = write_bytes(pid)
+            if written:
+                self._written[pid] = written
+        disk = sum(max(0, w - self._baseline.get(pid, 0)) for pid, w in self._written.items())
+        heap = 0
+        if tracemalloc.is_tracing():
+            heap = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        values = [
+            round(tree_rss / _MB, 1),
+            round(process_rss(self._pid) / _MB, 1),
+            round(heap / _MB, 2),
+            open_sockets(self._pid),
+            round(disk / _MB, 2),
+        ]
+        self.samples.append([round(self.report.elapsed(), 3), *values])
+        for name, value in zip(METRICS, values):
+            limit = self.budgets.get(name)
+            if limit is None or value <= limit:
+                continue
+            if name not in self.exceeded:
+                print(f"[Profile] ❌ {name} = {value:g} 超出预算 {limit:g}")
+            self.exceeded[name] = max(self.exceeded.get(name, 0), value)
+
+    def step_peaks(self) -> dict[str, dict[str, float]]:
+        """各步骤执行期间各指标的峰值（同名步骤取最大）"""
+        times = [s[0] for s in self.samples]
+        peaks: dict[str, dict[str, float]] = {}
+        for record in self.report.steps:
+            lo = bisect.bisect_left(times, record.start)
+            hi = bisect.bisect_right(times, record.start + record.seconds)
+            window = self.samples[lo:max(hi, lo + 1)]
+            if not window:
+                continue
+            peak = peaks.setdefault(record.name, dict.fromkeys(METRICS, 0))
+            for sample in window:
+                for name, value in zip(METRICS, sample[1:]):
+                    peak[name] = max(peak[name], value)
+        return peaks
+
+    def stop(self) -> list[str]:
+        """停止采样并写入 report.resources，返回超出预算的说明（空列表表示都在预算内）"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        overall = {name: max((s[i + 1] for s in self.samples), default=0) for i, name in enumerate(METRICS)}
+        steps = self.step_peaks()
+        violations = []
+        for name, value in self.exceeded.items():
+            worst = [step for step, peak in steps.items() if peak[name] > self.budgets[name]]
+            where = f"（步骤: {', '.join(worst)}）" if worst else ""
+            violations.append(f"{name} 峰值 {value:g} 超出预算 {self.budgets[name]:g}{where}")
+        self.report.resources = {
+            "interval": self.interval,
+            "peak": overall,
+            "budgets": self.budgets,
+            "exceeded": self.exceeded,
+            "steps": steps,
+            "columns": ["t", *METRICS],
+            "samples": self.samples,
+        }
+        return violations
@@ -0,0 +1,144 @@
+"""
+资源拦截
+在浏览器上下文上注册路由，签到流程用不到的请求不再下载：
+- 按资源类型拦截（默认图片、媒体、字体），直接 abort
+- 按 URL 片段拦截统计 / 广告脚本，脚本用空响应代替（页面里依赖它们的回调不会报错），其他类型 abort
+- 白名单中的 URL（默认包含 altcha）永远放行，站点自身的页面、样式和脚本不受影响
+
+RESOURCE_BLOCKING=report 时只统计不拦截，并记录"本应拦截"的资源大小，用于估算开启后能节省多少流量；
+大小表保存在磁盘上，开启拦截后按它估算每次运行节省的字节数。
+
+注意：页面上注册路由后浏览器自身的 HTTP 缓存不再生效（report 模式同样如此），持久化 Profile 中已缓存的脚本、样式
+会重新下载，因此默认关闭。估算的节省量只包含被拦截资源的大小，不扣除这部分额外下载。
+"""
+
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from timing import count
+
+DEFAULT_BLOCK_TYPES = "image,media,font"
+DEFAULT_BLOCK_URLS = (
+    "google-analytics.com,googletagmanager.com,doubleclick.net,hm.baidu.com,cnzz.com,51.la,"
+    "clarity.ms,hotjar.com,/analytics.js,/gtag/"
+)
+DEFAULT_ALLOW_URLS = "altcha"
+
+_EMPTY_BODIES = {"script": ("application/javascript", ""), "xhr": ("application/json", "{}"), "fetch": ("application/json", "{}")}
+
+
+def split_list(value: str) -> list[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+class ResourceFilter:
+    """mode: on（拦截）/ report（只统计）/ off"""
+
+    def __init__(self, mode: str, block_types: str = DEFAULT_BLOCK_TYPES, block_urls: str = DEFAULT_BLOCK_URLS,
+                 allow_urls: str = DEFAULT_ALLOW_URLS, sizes_path: Path | None = None):
+        self.mode = mode
+        self.block_types = set(split_list(block_types))
+        self.block_urls = split_list(block_urls)
+        self.allow_urls = split_list(allow_urls)
+        self.sizes_path = sizes_path
+        self.sizes: dict[str, int] = self._load_sizes()
+        self._sizes_dirty = False
+        self.reset()
+
+    def reset(self):
+        self.stats = {"requests": 0, "blocked": 0, "stubbed": 0, "saved_bytes": 0, "unknown_size": 0}
+
+    def _load_sizes(self) -> dict[str, int]:
+        if self.sizes_path is None:
+            return {}
+        try:
+            return json.loads(self.sizes_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def verdict(self, url: str, resource_type: str) -> str:
+        """返回 allow / block / stub"""
+        lowered = url.lower()
+        if any(pattern in lowered for pattern in self.allow_urls):
+            return "allow"
+        if any(pattern in lowered for pattern in self.block_urls):
+            return "stub" if resource_type in _EMPTY_BODIES else "block"
+        if resource_type in self.block_types:
+            return "block"
+        return "allow"
+
+    @staticmethod
+    def size_key(url: str) -> str:
+        """大小表的键：去掉查询串（缓存破坏参数）"""
+        parts = urlsplit(url)
+        return f"{parts.netloc}{parts.path}"
+
+    async def install(self, context):
+        if self.mode == "on":
+            await context.route("**/*", self._handle)
+        elif self.mode == "report":
+            context.on("response", self._measure)
+
+    async def _handle(self, route):
+        request = route.request
+        self.stats["requests"] += 1
+        verdict = self.verdict(request.url, request.resource_type)
+        if verdict == "allow":
+            await route.fallback()
+            return
+        self._count_saved(request.url)
+        if verdict == "stub":
+            self.stats["stubbed"] += 1
+            content_type, body = _EMPTY_BODIES[request.resource_type]
+            await route.fulfill(status=200, content_type=content_type, body=body)
+        else:
+            self.stats["blocked"] += 1
+            await route.abort("blockedbyclient")
+
+    def _count_saved(self, url: str):
+        size = self.sizes.get(self.size_key(url))
+        if size is None:
+            self.stats["unknown_size"] += 1
+        else:
+            self.stats["saved_bytes"] += size
+
+    def _measure(self, response):
+        """report 模式：记录本应拦截的资源大小（Content-Length）"""
+        request = response.request
+        self.stats["requests"] += 1
+        if self.verdict(request.url, request.resource_type) == "allow":
+            return
+        self.stats["blocked"] += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.stats["saved_bytes"] += int(length)
+            self.sizes[self.size_key(request.url)] = int(length)
+            self._sizes_dirty = True
+        else:
+            self.stats["unknown_size"] += 1
+
+    def publish(self):
+        """把本次统计计入当前运行报告，保存大小表并清零"""
+        if self.mode == "off":
+            return
+        prefix = "resources_would_block" if self.mode == "report" else "resources"
+        count(f"{prefix}_requests", self.stats["blocked"] + self.stats["stubbed"])
+        count(f"{prefix}_saved_kb", round(self.stats["saved_bytes"] / 1024, 1))
+        count("resources_total_requests", self.stats["requests"])
+        if self.stats["blocked"] or self.stats["stubbed"]:
+            print(f"[Resources] {'可拦截' if self.mode == 'report' else '已拦截'} "
+                  f"{self.stats['blocked'] + self.stats['stubbed']}/{self.stats['requests']} 个请求，"
+                  f"约 {self.stats['saved_bytes'] / 1024:.0f}KB"
+                  + (f"（{self.stats['unknown_size']} 个大小未知）" if self.stats["unknown_size"] else ""))
+        if self._sizes_dirty and self.sizes_path is not None:
+            try:
+                self.sizes_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.sizes_path.with_suffix(f".{os.getpid()}.tmp")  # 分片模式下多个进程写同一文件
+                tmp.write_text(json.dumps(self.sizes, indent=2), encoding="utf-8")
+                os.replace(tmp, self.sizes_path)
+                self._sizes_dirty = False
+            except OSError as e:
+                print(f"[Resources] 大小表保存失败: {e}")
+        self.reset()
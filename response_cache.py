@@ -0,0 +1,255 @@
+"""
+静态资源缓存
+页面上注册了路由（资源拦截）后，浏览器自身的 HTTP 缓存不再生效；批量、分片、常驻模式使用的非持久化上下文也不保留缓存，
+因此登录页的脚本、样式（包括 ALtcha 组件脚本）每次都要完整下载。RESPONSE_CACHE=on 时在路由中使用一个按内容寻址的磁盘缓存：
+
+- 只缓存 GET 请求中 RESPONSE_CACHE_TYPES 类型（默认 script、stylesheet）的 200 响应，且要求带 ETag 或 Last-Modified、
+  没有 Cache-Control: no-store；页面本身和 XHR（ALtcha 题目、登录接口）不缓存
+- 未命中的请求原样交给浏览器（route.fallback），请求仍由浏览器发出；浏览器收到的响应在 response 事件中写入缓存
+- 内容按 sha256 保存在 <目录>/blobs/，<目录>/index.json 记录 URL → 内容哈希、校验头、响应头和上次验证时间
+- 命中时带 If-None-Match / If-Modified-Since 发出条件请求，304 时直接用本地内容；
+  距上次验证不到 RESPONSE_CACHE_FRESH_SECONDS 秒时不访问网络；网络出错时用本地内容
+- 总大小超过 RESPONSE_CACHE_MB 时按最近使用时间淘汰
+
+CacheStore 由所有页面共用；每个页面一个 ResponseCache 记录统计，publish() 计入运行报告。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import weakref
+from pathlib import Path
+
+from timing import count
+
+DEFAULT_CACHE_TYPES = "script,stylesheet"
+
+# 不随缓存内容保存 / 回放的响应头：正文已解码，长度由 fulfill 重新计算
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive",
+                 "set-cookie", "date", "age"}
+
+# 页面 → 安装在它上面的 ResponseCache，用于在登录流程中判断本次加载是否用到了缓存
+_installed: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def page_cache(page) -> "ResponseCache | None":
+    return _installed.get(page)
+
+
+def _clean(headers: dict[str, str]) -> dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+
+class CacheStore:
+    """按内容寻址的磁盘缓存（索引在第一次使用时载入）"""
+
+    def __init__(self, directory: Path, max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.blobs = directory / "blobs"
+        self.index_path = directory / "index.json"
+        self.max_bytes = max_bytes
+        self._index: dict[str, dict] | None = None
+        self._dirty = False
+
+    def _load(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def get(self, url: str) -> tuple[dict, bytes] | None:
+        entry = self._load().get(url)
+        if entry is None:
+            return None
+        try:
+            body = (self.blobs / entry["sha256"]).read_bytes()
+        except OSError:
+            del self._index[url]  # 内容文件被清理
+            self._dirty = True
+            return None
+        return entry, body
+
+    def put(self, url: str, body: bytes, headers: dict[str, str]) -> bool:
+        """保存响应，返回内容是否与之前缓存的不同"""
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self.blobs / digest
+        if not blob.exists():
+            self.blobs.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, blob)
+        old = self._load().get(url)
+        now = time.time()
+        self._index[url] = {
+            "sha256": digest,
+            "etag": headers.get("etag", ""),
+            "last_modified": headers.get("last-modified", ""),
+            "headers": _clean(headers),
+            "size": len(body),
+            "validated_at": now,
+            "used_at": now,
+        }
+        self._dirty = True
+        return old is not None and old["sha256"] != digest
+
+    def touch(self, url: str, validated: bool):
+        entry = self._load().get(url)
+        if entry is not None:
+            entry["used_at"] = time.time()
+            if validated:
+                entry["validated_at"] = entry["used_at"]
+            self._dirty = True
+
+    def _evict(self):
+        """超过大小上限时按最近使用时间淘汰条目，并删除不再被引用的内容文件"""
+        index = self._load()
+        sizes = {e["sha256"]: e["size"] for e in index.values()}
+        total = sum(sizes.values())
+        for url, entry in sorted(index.items(), key=lambda item: item[1]["used_at"]):
+            if not self.max_bytes or total <= self.max_bytes:
+                break
+            del index[url]
+            if all(e["sha256"] != entry["sha256"] for e in index.values()):
+                total -= entry["size"]
+        referenced = {e["sha256"] for e in index.values()}
+        try:
+            for blob in self.blobs.iterdir():
+                if blob.name not in referenced and not blob.name.endswith(".tmp"):
+                    blob.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def clear(self):
+        """删除全部缓存内容和索引"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._index = {}
+        self._dirty = False
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self._evict()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")  # 分片模式下多个进程共用同一目录
+            tmp.write_text(json.dumps(self._index, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"[Cache] 缓存索引保存失败: {e}")
+
+
+class ResponseCache:
+    """mode: on（命中时用本地内容，未命中交给浏览器并缓存它收到的响应）/ off"""
+
+    def __init__(self, store: CacheStore, mode: str = "off", resource_types: str = DEFAULT_CACHE_TYPES,
+                 fresh_seconds: float = 0):
+        self.store = store
+        self.mode = mode
+        self.resource_types = {t.strip().lower() for t in resource_types.split(",") if t.strip()}
+        self.fresh_seconds = fresh_seconds
+        self._handled: set = set()  # 由这里响应的请求，response 事件中不再写入缓存
+        self.reset()
+
+    def reset(self):
+        self.stats = {"hits": 0, "revalidated": 0, "changed": 0, "stored": 0, "stale": 0, "served_bytes": 0}
+
+    def served(self) -> int:
+        """由本地内容响应的请求数（未过期 + 304 + 网络出错时的旧内容）"""
+        return self.stats["hits"] + self.stats["revalidated"] + self.stats["stale"]
+
+    async def install(self, page):
+        """在页面上注册路由；需在资源拦截之前安装，拦截器放行的请求再交给这里"""
+        if self.mode != "on":
+            return
+        await page.route("**/*", self._handle)
+        page.on("response", self._on_response)
+        _installed[page] = self
+
+    async def _serve(self, route, url: str, entry: dict, body: bytes, kind: str, validated: bool):
+        self.stats[kind] += 1
+        self.stats["served_bytes"] += len(body)
+        self.store.touch(url, validated)
+        self._handled.add(route.request)
+        await route.fulfill(status=200, headers=entry["headers"], body=body)
+
+    def _cacheable(self, request, status: int, headers: dict[str, str]) -> bool:
+        return (request.method == "GET" and request.resource_type in self.resource_types and status == 200
+                and "no-store" not in headers.get("cache-control", "").lower()
+                and bool(headers.get("etag") or headers.get("last-modified")))
+
+    async def _handle(self, route):
+        request = route.request
+        if request.method != "GET" or request.resource_type not in self.resource_types:
+            await route.fallback()
+            return
+        url = request.url
+        cached = self.store.get(url)
+        if cached is None:
+            # 未命中：请求由浏览器自己发出，响应在 _on_response 中写入缓存
+            await route.fallback()
+            return
+        entry, body = cached
+        if time.time() - entry["validated_at"] < self.fresh_seconds:
+            await self._serve(route, url, entry, body, "hits", validated=False)
+            return
+        headers = dict(request.headers)
+        if entry["etag"]:
+            headers["if-none-match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["if-modified-since"] = entry["last_modified"]
+
+        try:
+            response = await route.fetch(headers=headers)
+            payload = b"" if response.status == 304 else await response.body()
+        except Exception as e:
+            print(f"[Cache] {url} 请求失败，使用本地内容: {e}")
+            await self._serve(route, url, entry, body, "stale", validated=False)
+            return
+        if response.status == 304:
+            await self._serve(route, url, entry, body, "revalidated", validated=True)
+            return
+
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
+        if self._cacheable(request, response.status, response_headers):
+            self.stats["changed" if self.store.put(url, payload, response_headers) else "stored"] += 1
+        self._handled.add(request)
+        await route.fulfill(status=response.status, headers=_clean(response_headers), body=payload)
+
+    async def _on_response(self, response):
+        """浏览器自己取回的响应（未命中的请求）写入缓存"""
+        request = response.request
+        if request in self._handled:
+            self._handled.discard(request)
+            return
+        if request.method != "GET" or request.resource_type not in self.resource_types:
+            return
+        try:
+            headers = {k.lower(): v for k, v in (await response.all_headers()).items()}
+            if not self._cacheable(request, response.status, headers):
+                return
+            body = await response.body()
+        except Exception as e:
+            print(f"[Cache] {request.url} 响应内容读取失败，不缓存: {e}")
+            return
+        self.stats["changed" if self.store.put(request.url, body, headers) else "stored"] += 1
+
+    def publish(self):
+        """把本次统计计入当前运行报告，保存缓存索引并清零"""
+        if self.mode != "on":
+            return
+        count("response_cache_hits", self.stats["hits"])
+        count("response_cache_revalidated", self.stats["revalidated"])
+        count("response_cache_stored", self.stats["stored"] + self.stats["changed"])
+        count("response_cache_served_kb", round(self.stats["served_bytes"] / 1024, 1))
+        if self.served() or self.stats["stored"] or self.stats["changed"]:
+            print(f"[Cache] 本地响应 {self.served()} 个（未过期 {self.stats['hits']}，304 {self.stats['revalidated']}"
+                  + (f"，网络出错 {self.stats['stale']}" if self.stats["stale"] else "")
+                  + f"），约 {self.stats['served_bytes'] / 1024:.0f}KB；"
+                  f"新缓存 {self.stats['stored']} 个，内容变化 {self.stats['changed']} 个")
+        self.store.save()
+        self.reset()
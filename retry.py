@@ -0,0 +1,127 @@
+"""
+阶段重试与截止时间
+一次签到（run_checkin）有一个总截止时间，每个可重试的阶段有自己的时间预算和最多尝试次数。
+某个阶段失败时只重试这个阶段：重新打开页面 / 重新连接邮箱，不重启浏览器，也不重复已经成功的登录。
+两次尝试之间指数退避并加随机抖动（多个账号同时失败时错开重试），等待不会超过阶段预算和总截止时间。
+
+只有可以安全重复的阶段才交给 Deadline.run：打开页面、等待 ALtcha、等待验证码邮件。
+提交登录、提交 2FA、点击签到不重试（密码错误等是永久失败，重复提交也可能产生副作用）。
+
+每次尝试仍由阶段内部的 step() 计时；这里额外记录退避等待（step "retry_backoff"，detail 为阶段名），
+并把每个阶段的尝试次数、重试次数、最终失败次数计入报告计数器 attempts_<阶段> / retries_<阶段> / stage_failed_<阶段>，
+据此调整预算。
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+from timing import count, step
+
+
+class StageError(Exception):
+    """阶段内可重试的失败（超时、网络错误、ALtcha 未完成、验证码未到达）"""
+
+
+class StageFailed(Exception):
+    """阶段用完尝试次数或预算，或总截止时间已到"""
+
+    def __init__(self, stage: str, attempts: int, reason: str):
+        super().__init__(f"{stage} 失败（尝试 {attempts} 次）: {reason}")
+        self.stage = stage
+        self.attempts = attempts
+        self.reason = reason
+
+
+@dataclass
+class StageBudget:
+    seconds: float          # 阶段所有尝试加退避的总时长
+    attempt_seconds: float  # 单次尝试的超时上限
+    attempts: int = 3
+
+
+# 单次尝试的上限沿用原来的超时（打开页面 / ALtcha 30s，验证码 90s）
+DEFAULT_STAGE_BUDGETS = {
+    "check_login": StageBudget(75, 30),
+    "login_page": StageBudget(120, 30),
+    "code_wait": StageBudget(150, 90, attempts=2),
+    "user_page": StageBudget(75, 30),
+}
+
+
+def parse_budgets(value: str, defaults: dict[str, StageBudget]) -> dict[str, StageBudget]:
+    """
+    "login_page=90,code_wait=180/2" → 覆盖对应阶段的预算秒数（/ 后为最多尝试次数）。
+    未列出的阶段使用默认值，格式错误的项忽略
+    """
+    budgets = dict(defaults)
+    for item in value.split(","):
+        name, _, spec = item.strip().partition("=")
+        if name not in budgets or not spec:
+            continue
+        seconds, _, attempts = spec.partition("/")
+        try:
+            old = budgets[name]
+            budgets[name] = StageBudget(float(seconds), old.attempt_seconds, int(attempts) if attempts else old.attempts)
+        except ValueError:
+            print(f"[Retry] 忽略无法解析的阶段预算: {item}")
+    return budgets
+
+
+class Deadline:
+    """一次签到的总截止时间和各阶段预算"""
+
+    def __init__(self, total_seconds: float, budgets: dict[str, StageBudget],
+                 base_delay: float = 1.0, max_delay: float = 8.0):
+        self.total_seconds = total_seconds
+        self.budgets = budgets
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._end = time.monotonic() + total_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._end - time.monotonic())
+
+    def extend(self, seconds: float):
+        """顺延截止时间（限流等待不计入签到用时）"""
+        self._end += seconds
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待秒数：指数增长、封顶，在 [一半, 全部] 之间随机"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def run(self, stage: str, attempt):
+        """
+        执行一个可重试的阶段。attempt(timeout_ms) 是一次尝试，超时毫秒数已按阶段预算和总截止时间收紧；
+        抛出异常表示本次失败。成功返回 attempt 的返回值，用完次数 / 预算时抛出 StageFailed
+        """
+        budget = self.budgets[stage]
+        stage_end = time.monotonic() + budget.seconds
+        tries = 0
+        reason = ""
+        while True:
+            left = min(stage_end - time.monotonic(), self.remaining())
+            if left <= 0:
+                reason = reason or "总截止时间已到"
+                break
+            tries += 1
+            count(f"attempts_{stage}")
+            try:
+                return await attempt(int(min(budget.attempt_seconds, left) * 1000))
+            except Exception as e:
+                reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+            if tries >= budget.attempts:
+                break
+            delay = self.backoff(tries)
+            # 等待之后至少还要留出 1 秒给下一次尝试
+            if delay + 1 > min(stage_end - time.monotonic(), self.remaining()):
+                break
+            print(f"[Retry] {stage} 第 {tries} 次失败: {reason}，{delay:.1f}s 后重试")
+            count(f"retries_{stage}")
+            with step("retry_backoff") as s:
+                s.detail = stage
+                await asyncio.sleep(delay)
+        count(f"stage_failed_{stage}")
+        raise StageFailed(stage, tries, reason)
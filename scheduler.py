@@ -0,0 +1,116 @@
+"""
+签到时段调度与限流
+定时任务在同一时刻触发时，所有账号（以及所有使用本项目的人）会同时访问站点和邮箱服务器，
+登录、2FA、POP3 轮询都会因此变慢。这里提供两件工具：
+
+- 时段分散：CHECKIN_WINDOW_MINUTES 分钟的窗口内，每个账号按 sha256(种子 + 邮箱) 得到固定的偏移，
+  到点才开始。偏移对同一账号每天相同，不同账号（不同用户）均匀分布在窗口内。
+- 全局限流：登录、邮箱（POP3 / IMAP）连接、SMTP 连接各一个限流器，按每分钟次数放行，允许少量突发；
+  同一进程中的所有账号、后台线程共用。分片模式下每个子进程分得 1/子进程数 的额度。
+
+每个时段（SCHEDULE_SLOT_SECONDS）内开始的账号数、各类连接次数和限流等待时间记入运行报告的 slots，
+运行结束时与步骤耗时一起打印。
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+
+from timing import mark, step
+
+
+def slot_offset(key: str, window_seconds: float, seed: str = "") -> float:
+    """账号在窗口内的固定偏移（秒），由 sha256(种子:账号) 决定"""
+    if window_seconds <= 0:
+        return 0.0
+    digest = hashlib.sha256(f"{seed}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 * window_seconds
+
+
+class RateLimiter:
+    """
+    每分钟 rate 次、允许 burst 次突发的限流器（GCRA），线程安全。
+    同步调用方（邮箱、SMTP 线程）用 acquire()，事件循环中用 await wait()。rate <= 0 表示不限流
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int = 3, slot_seconds: float = 60):
+        self.name = name
+        self.burst = max(1, burst)
+        self.slot_seconds = slot_seconds
+        self.set_rate(rate_per_minute)
+        self._tat = 0.0  # 理论到达时间
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate_per_minute: float):
+        self.rate = rate_per_minute
+        self.interval = 60 / rate_per_minute if rate_per_minute > 0 else 0.0
+
+    def scale(self, share: float):
+        """只使用 share 份额度（分片模式下每个子进程分得一份）"""
+        if self.rate > 0:
+            self.set_rate(self.rate * share)
+
+    def reserve(self) -> float:
+        """预约一次放行，返回需要等待的秒数"""
+        if self.interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            delay = max(0.0, tat - (self.burst - 1) * self.interval - now)
+            self._tat = tat + self.interval
+        return delay
+
+    def _record(self, delay: float):
+        mark(self.name, self.slot_seconds)
+        if delay > 0:
+            mark(f"{self.name}_wait_s", self.slot_seconds, round(delay, 2))
+
+    def acquire(self) -> float:
+        """阻塞等待放行（在线程中调用），返回等待的秒数"""
+        delay = self.reserve()
+        if delay > 0:
+            with step("rate_wait") as s:
+                s.detail = self.name
+                time.sleep(delay)
+        self._record(delay)
+        return delay
+
+    async def wait(self) -> float:
+        """等待放行（在事件循环中调用），返回等待的秒数"""
+        delay = self.reserve()
+        if delay > 0:
+            print(f"[Schedule] {self.name} 限流，等待 {delay:.1f}s")
+            with step("rate_wait") as s:
+                s.detail = self.name
+                await asyncio.sleep(delay)
+        self._record(delay)
+        return delay
+
+
+class Window:
+    """
+    一次运行的签到窗口：从 started_at（Unix 时间戳，默认现在）开始，每个账号在自己的偏移处开始。
+    分片子进程使用主进程的 started_at，崩溃后重试的子进程不会重新等待已经过去的时段
+    """
+
+    def __init__(self, minutes: float, seed: str = "", slot_seconds: float = 60, started_at: float | None = None):
+        self.seconds = max(0.0, minutes * 60)
+        self.seed = seed
+        self.slot_seconds = slot_seconds
+        self.started_at = time.time() if started_at is None else started_at
+
+    def offset(self, email_addr: str) -> float:
+        return slot_offset(email_addr, self.seconds, self.seed)
+
+    async def wait_turn(self, email_addr: str):
+        """等到账号的时段再开始，并把账号计入该时段"""
+        delay = self.started_at + self.offset(email_addr) - time.time()
+        if delay > 0:
+            at = time.strftime("%H:%M:%S", time.localtime(time.time() + delay))
+            print(f"[Schedule] {email_addr} 的签到时段在 {at}（{delay / 60:.1f} 分钟后）")
+            with step("window_wait") as s:
+                s.detail = f"{delay:.0f}s"
+                await asyncio.sleep(delay)
+        mark("accounts", self.slot_seconds)
@@ -0,0 +1,134 @@
+"""
+选择器解析缓存
+页面结构可能变化，Step 2 / Step 3 的每个元素都有一组候选选择器。原来逐个 locator(...).is_visible()，
+每个候选一次往返；这里把整组候选交给一次 page.evaluate 在页面内检查，返回第一个可见（且满足文字条件）的元素，
+并给它打上 data-cc-sel 标记，之后的 fill / click 直接用标记定位，不再重新匹配。
+
+全部候选在同一次检查里完成，记录只影响"同时有多个候选可见时用哪一个"：例如页面上既有 #code，
+又有搜索框之类的 input[type='text']。因此只记录经过验证的命中——用它完成的操作确实成功了
+（2FA 通过、签到按钮给出签到状态、上次签到时间能够解析），调用方这时调用 confirm()。
+每个站点、每个元素验证过的选择器记在磁盘上，下次排在最前面；页面结构变化、它不再命中时
+同一次检查里自然回退到其他候选，新的命中验证后替换记录。兜底候选只命中而操作没有成功时不会被记住，
+不会因此排到 "#code" 这类精确候选前面。
+
+候选支持 Playwright 的 "css:has-text('文字')" 写法（页面内按 textContent 包含判断）；
+"*:has-text(...)" 取包含该文字的最内层元素。
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from timing import count
+
+_HAS_TEXT = re.compile(r"""^(.*):has-text\((['"])(.*)\2\)$""")
+
+_FIND_JS = """([candidates, keywords, maxLen, key]) => {
+    const shown = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const textOf = el => (el.textContent || el.value || '').trim();
+    for (let i = 0; i < candidates.length; i++) {
+        const [css, text] = candidates[i];
+        let els;
+        try { els = Array.from(document.querySelectorAll(css)); } catch (e) { continue; }
+        if (text) {
+            els = els.filter(el => (el.textContent || '').includes(text));
+            if (css === '*') els = els.filter(el => !Array.from(el.children).some(c => (c.textContent || '').includes(text)));
+        }
+        for (const el of els) {
+            if (!shown(el)) continue;
+            const t = textOf(el);
+            if (keywords.length && !keywords.some(k => t.includes(k))) continue;
+            if (maxLen && !(t && t.length < maxLen)) continue;
+            document.querySelectorAll(`[data-cc-sel="${key}"]`).forEach(e => e.removeAttribute('data-cc-sel'));
+            el.setAttribute('data-cc-sel', key);
+            return {index: i, text: t, disabled: !!el.disabled || el.getAttribute('aria-disabled') === 'true'};
+        }
+    }
+    return null;
+}"""
+
+
+def split_candidate(selector: str) -> tuple[str, str]:
+    """"button:has-text('签到')" → ("button", "签到")；普通 CSS → (css, "")"""
+    match = _HAS_TEXT.match(selector)
+    if match:
+        return match.group(1) or "*", match.group(3)
+    return selector, ""
+
+
+@dataclass
+class Match:
+    selector: str
+    locator: object
+    text: str
+    disabled: bool
+    host: str = ""
+    element: str = ""
+
+
+class SelectorCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self._data: dict[str, dict[str, str]] | None = None
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")  # 分片模式下多个进程共用同一缓存文件
+            tmp.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[Selector] 选择器缓存保存失败: {e}")
+
+    def ordered(self, host: str, element: str, candidates: list[str]) -> list[str]:
+        """验证过的选择器排在最前面"""
+        remembered = self._load().get(host, {}).get(element)
+        if remembered in candidates:
+            return [remembered] + [c for c in candidates if c != remembered]
+        return list(candidates)
+
+    def remember(self, host: str, element: str, selector: str):
+        site = self._load().setdefault(host, {})
+        if site.get(element) != selector:
+            site[element] = selector
+            self._save()
+
+    def confirm(self, match: "Match | None"):
+        """用这次命中的元素完成的操作已经成功，记住它的选择器；remember=False 找到的命中不记录"""
+        if match is not None and match.element:
+            self.remember(match.host, match.element, match.selector)
+
+    async def find(self, page, element: str, candidates: list[str], keywords: tuple[str, ...] = (),
+                   max_len: int = 0, remember: bool = True) -> Match | None:
+        """
+        一次页面内检查找到第一个可见的候选元素；keywords 非空时要求文字包含其一，max_len 非 0 时要求有文字且短于它。
+        remember=True 时验证过的选择器优先，命中后由调用方在操作成功时 confirm()；
+        remember=False 时按给定顺序检查（候选顺序本身表示优先级时使用）。找不到返回 None
+        """
+        host = urlsplit(page.url).netloc
+        ordered = self.ordered(host, element, candidates) if remember else list(candidates)
+        try:
+            found = await page.evaluate(_FIND_JS, [[split_candidate(c) for c in ordered], list(keywords), max_len, element])
+        except Exception as e:
+            print(f"[Selector] {element} 检查失败: {e}")
+            return None
+        if not found:
+            count("selector_miss")
+            return None
+        selector = ordered[found["index"]]
+        locator = page.locator(f'[data-cc-sel="{element}"]')
+        if not remember:
+            return Match(selector, locator, found["text"], found["disabled"])
+        count("selector_cache_hit" if selector == self._load().get(host, {}).get(element) else "selector_resolved")
+        return Match(selector, locator, found["text"], found["disabled"], host, element)
@@ -0,0 +1,74 @@
+"""
+会话有效性缓存
+记录登录 cookie 的最早过期时间和上次确认会话有效（成功打开 /user）的时间。
+缓存新鲜时 Step 1 不再单独探测登录状态，直接打开 /user 签到；
+打开后若被重定向到登录页，说明缓存过期，作废后回退到登录流程。
+"""
+
+import json
+import time
+from pathlib import Path
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+# SSPanel 的登录会话 cookie；统计、CDN 等其他 cookie 的过期时间与登录状态无关
+SESSION_COOKIES = ("uid", "key", "expire_in")
+
+
+def _domain_matches(host: str, domain: str) -> bool:
+    domain = domain.lstrip(".").lower()
+    host = host.lower()
+    return bool(domain) and (host == domain or host.endswith("." + domain))
+
+
+def cookie_expiry(cookies: list[dict], host: str) -> float | None:
+    """站点登录 cookie（uid / key / expire_in）中最早的过期时间；没有带过期时间的登录 cookie 时返回 None"""
+    expiries = [
+        c["expires"] for c in cookies
+        if c.get("name") in SESSION_COOKIES and c.get("expires", -1) not in (-1, None)
+        and _domain_matches(host, c.get("domain", ""))
+    ]
+    return min(expiries) if expiries else None
+
+
+def is_fresh(path: Path, max_age_seconds: float, now: float | None = None) -> tuple[bool, str]:
+    """返回 (是否新鲜, 说明)：在 max_age_seconds 内确认过有效，且登录 cookie 未过期"""
+    cache = load_cache(path)
+    now = now or time.time()
+    confirmed_at = cache.get("confirmed_at")
+    if not confirmed_at:
+        return False, "没有会话缓存"
+    age = now - confirmed_at
+    if age > max_age_seconds:
+        return False, f"上次确认已是 {age / 3600:.1f} 小时前"
+    expires_at = cache.get("expires_at")
+    if expires_at is not None and expires_at <= now + 60:
+        return False, "登录 cookie 已过期"
+    return True, f"{age / 60:.0f} 分钟前确认有效"
+
+
+def confirm(path: Path, cookies: list[dict], host: str):
+    """记录会话刚被确认有效"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "confirmed_at": time.time(),
+            "expires_at": cookie_expiry(cookies, host),
+        }), encoding="utf-8")
+    except OSError as e:
+        print(f"[Session] 会话缓存保存失败: {e}")
+
+
+def invalidate(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"[Session] 会话缓存删除失败: {e}")
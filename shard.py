@@ -0,0 +1,288 @@
+"""
+CordCloud 分片批量签到（多进程）
+账号很多时，单个进程驱动的一个浏览器会受 GIL 和单个浏览器渲染能力的限制。这里把账号列表按轮转分成若干分片，
+每个分片交给一个子进程：子进程启动自己的 CloakBrowser，用 batch.run_batch 完成本分片（HTTP 快速签到、
+并发上下文、会话保存与批量模式相同）。
+
+子进程数和每个子进程的并发上下文数按 CPU 核数与内存预算确定（见 plan_capacity）。
+每个账号完成后，子进程立即把记录追加到 <运行报告目录>/shards/<时间>/shard_<n>.jsonl。
+子进程崩溃或超时不会影响其他分片：已完成的账号从文件中读回，未完成的账号交给新的子进程重试一次，仍失败则记为失败。
+签到台账由各子进程分别写入分片目录，结束后由主进程合并；运行报告和汇总邮件也由主进程统一生成。
+签到时段（CHECKIN_WINDOW_MINUTES）从主进程启动时算起，各子进程共用；登录、邮箱、SMTP 限流额度由各子进程平分。
+
+    uv run python shard.py [--workers 4] [--concurrency 2] [--force] [--no-wait]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from batch import ACCOUNTS_FILE, BATCH_CONCURRENCY, load_accounts, print_report
+from main import (
+    Account, already_checked_in, ledger, publish_report, finish_run, get_notifier, start_profiler, _env,
+    NOTIFY_DIGEST, SMTP_PASSWORD, RUN_DEADLINE_SECONDS, RUN_REPORT_DIR, CHECKIN_WINDOW_MINUTES,
+)
+from procstats import available_memory, process_tree_rss
+from timing import RunReport, StepRecord, start_report
+
+# ── 配置 ────────────────────────────────────────────
+# 子进程数上限，0 表示按 CPU 核数
+SHARD_WORKERS = int(_env("SHARD_WORKERS", "0"))
+# 每个 CPU 核最多同时进行的浏览器上下文数（所有子进程合计）
+SHARD_CONTEXTS_PER_CORE = float(_env("SHARD_CONTEXTS_PER_CORE", "2"))
+# 内存预算（MB），0 表示系统可用内存的 80%
+SHARD_MEMORY_MB = float(_env("SHARD_MEMORY_MB", "0"))
+# 估算用：每个浏览器进程、每个上下文占用的内存（MB），可参考分片汇总表中的峰值内存调整
+SHARD_BROWSER_MB = float(_env("SHARD_BROWSER_MB", "300"))
+SHARD_CONTEXT_MB = float(_env("SHARD_CONTEXT_MB", "150"))
+# 子进程崩溃后，未完成账号重试的次数
+SHARD_CRASH_RETRIES = int(_env("SHARD_CRASH_RETRIES", "1"))
+
+
+def plan_capacity(accounts: int, cores: int, memory_mb: float, workers: int = 0,
+                  concurrency: int = BATCH_CONCURRENCY) -> tuple[int, int, str]:
+    """
+    返回 (子进程数, 每个子进程的并发数, 说明)。
+    上下文总数不超过 CPU 核数 × SHARD_CONTEXTS_PER_CORE；
+    子进程数 × (浏览器内存 + 并发数 × 上下文内存) 不超过内存预算
+    """
+    cpu_contexts = max(1, int(cores * SHARD_CONTEXTS_PER_CORE))
+    concurrency = max(1, min(concurrency, cpu_contexts))
+    # 内存连一个子进程都不够时先降低并发
+    if memory_mb and SHARD_BROWSER_MB + concurrency * SHARD_CONTEXT_MB > memory_mb:
+        concurrency = max(1, int((memory_mb - SHARD_BROWSER_MB) // SHARD_CONTEXT_MB))
+    limits = {
+        "账号数": accounts,
+        "CPU": max(1, cpu_contexts // concurrency),
+        "子进程数上限": workers or cores,
+    }
+    if memory_mb:
+        limits["内存"] = max(1, int(memory_mb // (SHARD_BROWSER_MB + concurrency * SHARD_CONTEXT_MB)))
+    count = max(1, min(limits.values()))
+    bound = min(limits, key=limits.get)
+    budget = f"内存预算 {memory_mb:.0f}MB" if memory_mb else "内存不限"
+    return count, concurrency, f"{count} 个子进程 × 并发 {concurrency}（受{bound}限制；{cores} 核，{budget}）"
+
+
+def split_round_robin(accounts: list[Account], count: int) -> list[list[Account]]:
+    """轮转分片：相邻的账号（往往同一批添加、情况相近）分到不同分片"""
+    return [shard for shard in (accounts[i::count] for i in range(count)) if shard]
+
+
+# ── 子进程 ──────────────────────────────────────────
+
+def _worker(index: int, accounts: list[dict], concurrency: int, shard_dir: str, workers: int,
+            window_start: float | None):
+    """
+    子进程入口：输出写入 shard_<n>.log，每个账号完成后追加到 shard_<n>.jsonl，结束时写出运行报告。
+    window_start 为主进程的签到时段起点（None 表示不等待），限流额度按 workers 平分
+    """
+    shard_dir = Path(shard_dir)
+    log = open(shard_dir / f"shard_{index}.log", "a", encoding="utf-8", buffering=1)
+    sys.stdout = sys.stderr = log
+
+    import main
+    from batch import run_batch
+    from ledger import CheckinLedger
+
+    # 各子进程写自己的台账，避免多个进程同时改写同一个文件；主进程结束时合并
+    main.ledger = CheckinLedger(shard_dir / f"shard_{index}_ledger.json", main.ledger.tz)
+    main.scale_rate_limits(1 / workers)
+    window = main.new_window(window_start) if window_start is not None else None
+
+    async def run():
+        report = start_report()
+        with (shard_dir / f"shard_{index}.jsonl").open("a", encoding="utf-8") as out:
+            def on_record(record: dict):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            try:
+                await run_batch([main.Account(**a) for a in accounts], concurrency, on_record=on_record, window=window)
+            finally:
+                await main.finish_run(send_digest=False)
+                (shard_dir / f"shard_{index}_report.json").write_text(
+                    json.dumps(asdict(report), ensure_ascii=False), encoding="utf-8")
+
+    asyncio.run(run())
+
+
+# ── 主进程 ──────────────────────────────────────────
+
+@dataclass
+class Shard:
+    index: int
+    accounts: list[Account]
+    process: multiprocessing.Process | None = None
+    started: float = 0.0
+    timeout: float = 0.0
+    peak_rss: int = 0
+    records: list[dict] = field(default_factory=list)
+
+    def read_records(self, shard_dir: Path) -> list[dict]:
+        path = shard_dir / f"shard_{self.index}.jsonl"
+        records = []
+        try:
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass  # 崩溃时写了一半的行
+        except OSError:
+            pass
+        return records
+
+
+def _load_report(path: Path) -> RunReport | None:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return RunReport(started_at=data["started_at"], steps=[StepRecord(**s) for s in data["steps"]],
+                     accounts=data["accounts"], counters=data["counters"], slots=data.get("slots", {}))
+
+
+def run_sharded(accounts: list[Account], workers: int, concurrency: int, report: RunReport,
+                wait: bool = True) -> list[dict]:
+    """
+    启动分片子进程并等待全部结束，返回所有账号的记录（包括崩溃分片中未完成、记为失败的账号）。
+    wait=True 时各账号等到自己的签到时段（从现在算起）才开始
+    """
+    shard_dir = RUN_REPORT_DIR / "shards" / time.strftime("%Y%m%d_%H%M%S")
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    context = multiprocessing.get_context("spawn")
+    window_start = time.time() if wait else None
+
+    def launch(shard: Shard):
+        shard.process = context.Process(
+            target=_worker, args=(shard.index, [asdict(a) for a in shard.accounts], concurrency, str(shard_dir),
+                                  workers, window_start),
+            name=f"shard-{shard.index}", daemon=False,
+        )
+        shard.started = time.monotonic()
+        # 超时：每个账号最多占用一次签到截止时间，按并发折算，再留出浏览器启动和收尾的余量；
+        # 有签到时段时再加上时段窗口剩余的时间
+        shard.timeout = RUN_DEADLINE_SECONDS * math.ceil(len(shard.accounts) / concurrency) + 120
+        if window_start is not None:
+            shard.timeout += max(0.0, window_start + CHECKIN_WINDOW_MINUTES * 60 - time.time())
+        shard.process.start()
+        print(f"[Shard] 分片 {shard.index}: {len(shard.accounts)} 个账号，PID {shard.process.pid}")
+
+    running = [Shard(i, part) for i, part in enumerate(split_round_robin(accounts, workers))]
+    next_index = len(running)
+    retries = SHARD_CRASH_RETRIES
+    for shard in running:
+        launch(shard)
+
+    records, summary = [], []
+    while running:
+        time.sleep(1)
+        for shard in list(running):
+            shard.peak_rss = max(shard.peak_rss, process_tree_rss(shard.process.pid))
+            if shard.process.is_alive():
+                if time.monotonic() - shard.started > shard.timeout:
+                    print(f"[Shard] ⚠️ 分片 {shard.index} 超过 {shard.timeout:.0f}s，终止")
+                    shard.process.terminate()
+                continue
+            running.remove(shard)
+            shard.process.join()
+            shard.records = shard.read_records(shard_dir)
+            records.extend(shard.records)
+            worker_report = _load_report(shard_dir / f"shard_{shard.index}_report.json")
+            if worker_report is not None:
+                report.merge(worker_report)
+            ledger.merge(shard_dir / f"shard_{shard.index}_ledger.json")
+            exitcode = shard.process.exitcode
+            seconds = time.monotonic() - shard.started
+            summary.append((shard, exitcode, seconds))
+
+            done = {r["email"] for r in shard.records}
+            missing = [a for a in shard.accounts if a.email not in done]
+            if exitcode == 0 and not missing:
+                print(f"[Shard] 分片 {shard.index} 完成: 成功 {sum(r['ok'] for r in shard.records)}/{len(shard.records)}，"
+                      f"{seconds:.0f}s")
+                continue
+            report.count("shard_crashes")
+            print(f"[Shard] ❌ 分片 {shard.index} 异常退出（exit code {exitcode}），"
+                  f"已完成 {len(shard.records)} 个，未完成 {len(missing)} 个，日志: {shard_dir / f'shard_{shard.index}.log'}")
+            if missing and retries > 0:
+                retries -= 1
+                retry = Shard(next_index, missing)
+                next_index += 1
+                print(f"[Shard] 未完成的 {len(missing)} 个账号交给分片 {retry.index} 重试")
+                launch(retry)
+                running.append(retry)
+                continue
+            for account in missing:
+                records.append({"email": account.email, "ok": False, "seconds": 0.0, "screenshot": None,
+                                "results": [f"[Shard] 分片 {shard.index} 异常退出（exit code {exitcode}），未完成"]})
+
+    print_shard_summary(summary)
+    return records
+
+
+def print_shard_summary(summary: list[tuple[Shard, int | None, float]]):
+    """每个分片的账号数、成功数、退出码、耗时和进程树峰值内存"""
+    print("\n" + "=" * 60)
+    print(f"{'分片':<6}{'账号':>6}{'成功':>6}{'退出码':>8}{'耗时(s)':>10}{'峰值内存(MB)':>16}")
+    print("-" * 60)
+    for shard, exitcode, seconds in sorted(summary, key=lambda item: item[0].index):
+        ok = sum(r["ok"] for r in shard.records)
+        print(f"{shard.index:<6}{len(shard.accounts):>6}{ok:>6}{str(exitcode):>8}{seconds:>10.1f}"
+              f"{shard.peak_rss / 1024 / 1024:>16.0f}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CordCloud 分片批量签到（多进程）")
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS, help="子进程数上限，0 表示按 CPU 核数")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="每个子进程同时进行的账号数")
+    parser.add_argument("--force", action="store_true", help="忽略签到台账，今天已签到的账号也照常运行")
+    parser.add_argument("--no-wait", action="store_true", help="忽略签到时段（CHECKIN_WINDOW_MINUTES），立即开始")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CordCloud Sharded Batch Check-in")
+    print("=" * 60)
+
+    accounts = load_accounts()
+    if not accounts:
+        print(f"[ERROR] 请在 {ACCOUNTS_FILE} 中配置账号列表，或在 .env 中配置 CORDCLOUD_EMAIL/CORDCLOUD_PASSWORD")
+        return
+    if not args.force:
+        accounts = [a for a in accounts if not already_checked_in(a)]
+        if not accounts:
+            print("[Shard] 所有账号今日均已签到")
+            return
+
+    memory_mb = SHARD_MEMORY_MB or available_memory() * 0.8 / 1024 / 1024
+    workers, concurrency, reason = plan_capacity(len(accounts), os.cpu_count() or 1, memory_mb,
+                                                 args.workers, args.concurrency)
+    print(f"[Shard] 共 {len(accounts)} 个账号，{reason}")
+
+    start = time.perf_counter()
+    report = start_report()
+    # 主进程采样整个进程树：内存和写盘量包括所有子进程及其浏览器
+    start_profiler(report)
+    report.count("shard_workers", workers)
+    records = run_sharded(accounts, workers, concurrency, report, wait=not args.no_wait)
+    for r in records:
+        report.set_result(r["email"], r["ok"], r["results"])
+    # 汇总邮件由主进程统一发送（子进程只收集不发送）
+    if NOTIFY_DIGEST and SMTP_PASSWORD:
+        for r in records:
+            get_notifier().collect(r["email"], r["ok"], r["results"], r.get("screenshot"))
+    asyncio.run(finish_run())
+    print_report(records, time.perf_counter() - start)
+    if not publish_report(report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
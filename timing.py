@@ -0,0 +1,182 @@
+"""
+步骤计时与运行报告
+用 with step("名称") as s: 包住一个步骤，记录开始时间、耗时和结果（s.outcome / s.detail 可在块内修改，
+抛出异常时记为 error）。当前报告和账号通过 contextvars 传递：asyncio 任务和 asyncio.to_thread
+会复制上下文，因此后台线程里的 POP3 轮询、SMTP 发送也会记到发起它的账号下。
+mark(类别, 时段秒数) 按时段（墙钟时间取整）累计各类事件，用于查看签到时段是否拥挤。
+没有启用报告时 step() 只是空操作。
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict, replace
+from pathlib import Path
+
+
+@dataclass
+class StepRecord:
+    name: str
+    account: str = ""
+    start: float = 0.0      # 相对运行开始的秒数
+    seconds: float = 0.0
+    outcome: str = "ok"
+    detail: str = ""
+
+
+@dataclass
+class RunReport:
+    started_at: float = field(default_factory=time.time)
+    steps: list[StepRecord] = field(default_factory=list)
+    accounts: dict[str, dict] = field(default_factory=dict)
+    counters: dict[str, float] = field(default_factory=dict)
+    slots: dict[str, dict[str, float]] = field(default_factory=dict)  # 时段 "HH:MM" → 类别 → 数值
+    resources: dict = field(default_factory=dict)  # 资源采样结果（profiler.py），未启用时为空
+
+    def __post_init__(self):
+        self._t0 = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def set_result(self, account: str, ok: bool, results: list[str]):
+        self.accounts[account] = {"ok": ok, "results": list(results)}
+
+    def count(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def mark(self, kind: str, slot_seconds: float = 60, value: float = 1):
+        slot_seconds = max(1, int(slot_seconds))
+        now = time.time()
+        label = time.strftime("%H:%M:%S" if slot_seconds % 60 else "%H:%M", time.localtime(now - now % slot_seconds))
+        slot = self.slots.setdefault(label, {})
+        slot[kind] = slot.get(kind, 0) + value
+
+    def merge(self, other: "RunReport"):
+        """并入另一份报告（如分片子进程的报告）：步骤开始时间换算到本报告的起点，计数器和时段累加"""
+        offset = other.started_at - self.started_at
+        self.steps.extend(replace(s, start=round(s.start + offset, 3)) for s in other.steps)
+        self.accounts.update(other.accounts)
+        for name, value in other.counters.items():
+            self.count(name, value)
+        for label, kinds in other.slots.items():
+            slot = self.slots.setdefault(label, {})
+            for kind, value in kinds.items():
+                slot[kind] = slot.get(kind, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started_at)),
+            "total_seconds": round(self.elapsed(), 3),
+            "accounts": self.accounts,
+            "counters": self.counters,
+            "slots": dict(sorted(self.slots.items())),
+            **({"resources": self.resources} if self.resources else {}),
+            "steps": [asdict(s) for s in sorted(self.steps, key=lambda s: s.start)],
+            "summary": self.summary(),
+        }
+
+    def summary(self) -> dict[str, dict]:
+        """按步骤名汇总：次数、总耗时、平均、最大、各结果计数"""
+        groups: dict[str, dict] = {}
+        for s in self.steps:
+            g = groups.setdefault(s.name, {"count": 0, "total": 0.0, "max": 0.0, "outcomes": {}})
+            g["count"] += 1
+            g["total"] += s.seconds
+            g["max"] = max(g["max"], s.seconds)
+            g["outcomes"][s.outcome] = g["outcomes"].get(s.outcome, 0) + 1
+        for g in groups.values():
+            g["mean"] = g["total"] / g["count"]
+            for k in ("total", "max", "mean"):
+                g[k] = round(g[k], 3)
+        return groups
+
+    def summary_table(self) -> str:
+        lines = [f"{'步骤':<24}{'次数':>6}{'总计(s)':>10}{'平均(s)':>10}{'最大(s)':>10}  结果"]
+        lines.append("-" * 72)
+        for name, g in self.summary().items():
+            outcomes = ", ".join(f"{k}×{v}" for k, v in g["outcomes"].items())
+            lines.append(f"{name:<24}{g['count']:>6}{g['total']:>10.2f}{g['mean']:>10.2f}{g['max']:>10.2f}  {outcomes}")
+        lines.append("-" * 72)
+        if self.counters:
+            lines.append("  ".join(f"{k}={v:g}" for k, v in sorted(self.counters.items())))
+        if self.slots:
+            lines.append("时段占用:")
+            for label, kinds in sorted(self.slots.items()):
+                lines.append(f"  {label}  " + "  ".join(f"{k}={v:g}" for k, v in sorted(kinds.items())))
+        if self.resources:
+            lines.append(self.resource_table())
+        lines.append(f"总耗时 {self.elapsed():.2f}s")
+        return "\n".join(lines)
+
+    def resource_table(self) -> str:
+        """各步骤执行期间的资源峰值（内存、写盘单位 MB）"""
+        columns = ["tree_rss_mb", "python_rss_mb", "python_heap_mb", "sockets", "disk_mb"]
+        lines = [f"{'资源峰值':<22}" + "".join(f"{c:>15}" for c in columns)]
+        rows = list(self.resources.get("steps", {}).items()) + [("(整次运行)", self.resources.get("peak", {}))]
+        for name, peak in rows:
+            lines.append(f"{name:<24}" + "".join(f"{peak.get(c, 0):>15g}" for c in columns))
+        return "\n".join(lines)
+
+    def write(self, directory: Path) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"run_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))}.json"
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+
+_report: ContextVar[RunReport | None] = ContextVar("run_report", default=None)
+_account: ContextVar[str] = ContextVar("run_account", default="")
+
+
+def start_report() -> RunReport:
+    """创建运行报告并设为当前上下文的报告"""
+    report = RunReport()
+    _report.set(report)
+    return report
+
+
+def set_account(account: str):
+    """设置当前上下文的账号（在每个账号各自的 asyncio 任务中调用）"""
+    _account.set(account)
+
+
+@contextmanager
+def step(name: str):
+    report = _report.get()
+    record = StepRecord(name, _account.get())
+    if report is None:
+        yield record
+        return
+    record.start = round(report.elapsed(), 3)
+    t0 = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.outcome = "error"
+        record.detail = record.detail or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record.seconds = round(time.perf_counter() - t0, 3)
+        report.steps.append(record)
+
+
+def count(name: str, value: float = 1):
+    """累加当前报告的计数器（例如拦截的请求数、节省的字节数）；没有报告时忽略"""
+    report = _report.get()
+    if report is not None:
+        report.count(name, value)
+
+
+def mark(kind: str, slot_seconds: float = 60, value: float = 1):
+    """在当前时段累加一类事件（账号开始、登录、邮箱连接、限流等待秒数）；没有报告时忽略"""
+    report = _report.get()
+    if report is not None:
+        report.mark(kind, slot_seconds, value)
+
+
+def timed(name: str, func, *args, **kwargs):
+    """在 step(name) 中调用同步函数，用于 asyncio.to_thread(timed, ...) 包装阻塞调用"""
+    with step(name):
+        return func(*args, **kwargs)
@@ -0,0 +1,81 @@
+"""
+事件驱动等待
+把多个条件写成页面内的 JS 表达式，交给一次 wait_for_function 同时检查，
+哪个条件先成立就立即返回它的标签，代替固定时长的 wait_for_timeout / 串行 wait_for_url。
+wait_for_function 在页面跳转后会在新页面上继续检查，因此可以同时等待 "URL 变化" 和 "元素出现"。
+点击触发 AJAX 的按钮时，click_for_json 直接读取响应 JSON，不必从页面变化推断结果。
+"""
+
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def url_contains(fragment: str) -> str:
+    """当前 URL 包含 fragment"""
+    return f"location.href.includes({json.dumps(fragment)})"
+
+
+def visible(selector: str, with_text: bool = False) -> str:
+    """元素存在且可见（与 jQuery :visible 相同的判断）；with_text=True 时还要求有非空文本"""
+    check = "!!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)"
+    if with_text:
+        check += " && el.textContent.trim().length > 0"
+    return f"(() => {{ const el = document.querySelector({json.dumps(selector)}); return !!el && {check}; }})()"
+
+
+def focused(selector: str) -> str:
+    """元素已获得焦点"""
+    return f"document.activeElement === document.querySelector({json.dumps(selector)})"
+
+
+def button_with_text(*keywords: str) -> str:
+    """页面上存在文字包含任一关键字的可见按钮"""
+    return (
+        "Array.from(document.querySelectorAll('button, a.btn, input[type=button]')).some(el => "
+        "(el.offsetWidth || el.offsetHeight) && "
+        f"{json.dumps(list(keywords))}.some(k => (el.textContent || el.value || '').includes(k)))"
+    )
+
+
+async def wait_any(page, conditions: list[tuple[str, str]], timeout_ms: int, step: str = "Wait") -> str | None:
+    """
+    同时等待多个条件，返回最先成立的条件标签；超时返回 None。
+    conditions: [(标签, JS 表达式)]，按顺序检查，同一时刻多个成立时取靠前的。
+    """
+    checks = "\n".join(
+        f"try {{ if ({expr}) return {json.dumps(label)}; }} catch (e) {{}}" for label, expr in conditions
+    )
+    start = time.perf_counter()
+    try:
+        handle = await page.wait_for_function(f"() => {{ {checks}\n return false; }}", timeout=timeout_ms)
+        winner = await handle.json_value()
+    except Exception:
+        winner = None
+    elapsed = (time.perf_counter() - start) * 1000
+    labels = "/".join(label for label, _ in conditions)
+    print(f"[{step}] 等待 {labels}: {winner or '超时'} ({elapsed:.0f}ms)")
+    return winner
+
+
+async def click_for_json(page, click, path: str, timeout_ms: int, step: str = "Wait") -> dict | None:
+    """
+    执行 click()，同时拦截页面发往 path 的 POST 请求，直接返回其 JSON 响应（AJAX 回调里的 ret / msg）。
+    超时、请求失败或响应不是 JSON 时返回 None，调用方回退到等待页面变化
+    """
+    def matches(response) -> bool:
+        return response.request.method == "POST" and urlsplit(response.url).path.rstrip("/") == path
+
+    start = time.perf_counter()
+    try:
+        async with page.expect_response(matches, timeout=timeout_ms) as info:
+            await click()
+        response = await info.value
+        data = await response.json()
+    except Exception as e:
+        print(f"[{step}] 未取得 {path} 的 JSON 响应: {e}")
+        return None
+    if not isinstance(data, dict):
+        return None
+    print(f"[{step}] {path} 响应: ret={data.get('ret')} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+    return data